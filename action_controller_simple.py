@@ -20,8 +20,11 @@ class SimpleActionController:
         self.last_vertical_action = None
         
     def process_detection(self, detection_result):
-        """处理检测结果并返回控制命令"""
-        current_time = time.time()
+        """处理检测结果并返回控制命令
+        
+        冷却和注视计时使用检测结果中的帧时间（没有则用当前时间），回放录制的会话时命令可复现。
+        """
+        current_time = detection_result.get('timestamp') or time.time()
         
         # 冷却期检查
         if current_time - self.last_action_time < self.action_cooldown:
@@ -0,0 +1,268 @@
+import asyncio
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import metrics
+from metrics import VIEWERS, JPEG_BYTES_SENT
+
+from preview_player import PREVIEW_READ_AHEAD
+from stream_server import (StreamServer, StreamHandler, INDEX_HTML, CONTROL_ROUTES, THUMBNAIL_ROUTE,
+                           handle_control_request, handle_thumbnail_request, current_frame_cache, mjpeg_part_header,
+                           websocket_handshake_response, encode_websocket_frame,
+                           parse_websocket_frames, WebSocketSession, WS_OPCODE_TEXT,
+                           WS_OPCODE_PING, WS_OPCODE_PONG, WS_OPCODE_CLOSE)
+
+
+class AsyncStreamServer(StreamServer):
+    """基于 asyncio 的流媒体服务器：单个事件循环线程服务所有观看者，不再为每个请求创建线程"""
+
+    REQUEST_TIMEOUT = 10  # 读取请求头超时（秒）
+    WRITE_TIMEOUT = 10  # 慢速客户端写入超时（秒）
+    WRITE_BUFFER_HIGH = 256 * 1024  # 每个连接的发送缓冲上限，超过后跳帧
+
+    def __init__(self, port=8080, command_bus=None, preview_read_ahead=PREVIEW_READ_AHEAD):
+        super().__init__(port, command_bus, preview_read_ahead)
+        self.loop = None
+        self._sock = None
+        self._server = None
+        self._frame_event = None  # 当前帧广播事件，新帧到达时替换
+        self.viewer_count = 0
+
+    def start(self):
+        self._reset_state()
+        self._sock = self._bind_socket()
+
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run_loop, args=(ready,),
+                                       name="async-stream-server", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+        # 编码线程完成新帧、预览时钟发布新帧后通知事件循环
+        StreamHandler.jpeg_cache.add_listener(self._on_new_frame_threadsafe)
+        StreamHandler.preview_cache.add_listener(self._on_new_frame_threadsafe)
+        StreamHandler.document_cache.add_listener(self._on_new_frame_threadsafe)
+        print(f"Stream server (asyncio) started on port {self.port}")
+        print(f"Please open http://<device_ip>:{self.port} in browser to view real-time video")
+
+    def _bind_socket(self):
+        """绑定监听端口，如果失败则尝试其他端口"""
+        ports_to_try = [self.port, 8081, 8082, 9000]
+        for port in ports_to_try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(('', port))
+            except OSError as e:
+                sock.close()
+                if e.errno == 98:  # Address already in use
+                    print(f"Port {port} is already in use, trying another port...")
+                    continue
+                raise e
+            sock.listen(128)
+            sock.setblocking(False)
+            self.port = port  # 更新实际使用的端口
+            return sock
+        raise Exception("Unable to find an available port")
+
+    def _run_loop(self, ready):
+        """事件循环线程"""
+        asyncio.set_event_loop(self.loop)
+        self._frame_event = asyncio.Event()
+        self._server = self.loop.run_until_complete(
+            asyncio.start_server(self._handle_client, sock=self._sock))
+        ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # 关闭监听并取消仍在推流的连接
+            self._server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def _on_new_frame_threadsafe(self, seq):
+        """在编码线程中调用，把通知转交给事件循环"""
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._broadcast_new_frame)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def _broadcast_new_frame(self):
+        """唤醒所有等待新帧的连接"""
+        event = self._frame_event
+        self._frame_event = asyncio.Event()
+        event.set()
+
+    async def _handle_client(self, reader, writer):
+        """处理单个HTTP连接（HTTP/1.0，响应后关闭）"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.REQUEST_TIMEOUT)
+            # 读取请求头
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.REQUEST_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != 'GET':
+                await self._send_response(writer, 405, 'text/plain; charset=utf-8', b"Method Not Allowed")
+                return
+            path = parts[1]
+            route = urlsplit(path).path
+
+            if route == '/':
+                await self._send_response(writer, 200, 'text/html; charset=utf-8', INDEX_HTML.encode('utf-8'))
+            elif route.startswith('/stream'):
+                await self._serve_mjpeg_stream(writer)
+            elif route.startswith('/ws'):
+                await self._serve_websocket(reader, writer, headers)
+            elif route.startswith('/video_feed'):
+                await self._serve_snapshot(writer)
+            elif route.startswith('/metrics'):
+                await self._send_response(writer, 200, metrics.CONTENT_TYPE,
+                                          metrics.REGISTRY.render().encode('utf-8'))
+            elif route.startswith(THUMBNAIL_ROUTE):
+                status, content_type, body = handle_thumbnail_request(path)
+                await self._send_response(writer, status, content_type, body,
+                                          extra_headers=("Cache-Control: no-cache",))
+            elif route.startswith(CONTROL_ROUTES):
+                await self._send_response(writer, 200, 'text/plain; charset=utf-8',
+                                          handle_control_request(path))
+            else:
+                await self._send_response(writer, 404, 'text/plain; charset=utf-8', b"Not Found")
+        except (asyncio.TimeoutError, ConnectionError, UnicodeDecodeError):
+            # 客户端超时或断开连接
+            pass
+        except asyncio.CancelledError:
+            # 服务器停止
+            pass
+        finally:
+            writer.close()
+
+    async def _send_response(self, writer, status, content_type, body, extra_headers=()):
+        """发送完整的HTTP响应"""
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                  405: 'Method Not Allowed'}.get(status, '')
+        header = [f"HTTP/1.0 {status} {reason}", f"Content-Type: {content_type}",
+                  f"Content-Length: {len(body)}"]
+        header.extend(extra_headers)
+        writer.write(("\r\n".join(header) + "\r\n\r\n").encode('latin-1'))
+        writer.write(body)
+        await asyncio.wait_for(writer.drain(), self.WRITE_TIMEOUT)
+
+    async def _serve_websocket(self, reader, writer, headers):
+        """/ws：WebSocket 控制与状态通道"""
+        key = headers.get('sec-websocket-key')
+        if not key or 'websocket' not in headers.get('upgrade', '').lower():
+            await self._send_response(writer, 400, 'text/plain; charset=utf-8', b"Bad Request")
+            return
+        writer.write(websocket_handshake_response(key))
+        
+        loop = self.loop
+        
+        def send_text(text):
+            # 确认可能由命令执行线程发送，统一交给事件循环写入
+            if loop.is_closed() or writer.is_closing():
+                raise RuntimeError("connection closed")
+            loop.call_soon_threadsafe(writer.write, encode_websocket_frame(text.encode('utf-8')))
+        
+        session = WebSocketSession(send_text)
+        buffer = bytearray()
+        try:
+            while StreamHandler.streaming and not session.closed:
+                try:
+                    data = await asyncio.wait_for(reader.read(65536), StreamHandler.telemetry_interval)
+                except asyncio.TimeoutError:
+                    data = None
+                if data is not None:
+                    if not data:
+                        break
+                    buffer.extend(data)
+                    for opcode, payload in parse_websocket_frames(buffer):
+                        if opcode == WS_OPCODE_TEXT:
+                            session.handle_message(payload.decode('utf-8', 'replace'))
+                        elif opcode == WS_OPCODE_PING:
+                            writer.write(encode_websocket_frame(payload, WS_OPCODE_PONG))
+                        elif opcode == WS_OPCODE_CLOSE:
+                            writer.write(encode_websocket_frame(b'', WS_OPCODE_CLOSE))
+                            session.closed = True
+                            break
+                session.poll_telemetry(time.time())
+                await asyncio.wait_for(writer.drain(), self.WRITE_TIMEOUT)
+        finally:
+            session.closed = True
+    
+    async def _serve_snapshot(self, writer):
+        """/video_feed：返回单张JPEG"""
+        # 各画面来源都已预先编码，直接取用，不占用事件循环
+        _, jpeg = current_frame_cache().latest()
+        await self._send_response(writer, 200, 'image/jpeg', jpeg or b"",
+                                  extra_headers=("Cache-Control: no-cache",))
+        if jpeg:
+            JPEG_BYTES_SENT.inc(len(jpeg))
+
+    async def _serve_mjpeg_stream(self, writer):
+        """multipart/x-mixed-replace 推流：所有连接共用一个事件循环和同一份JPEG"""
+        writer.transport.set_write_buffer_limits(high=self.WRITE_BUFFER_HIGH)
+        writer.write(b"HTTP/1.0 200 OK\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                     b"Cache-Control: no-cache, private\r\n"
+                     b"Pragma: no-cache\r\n\r\n")
+        self.viewer_count += 1
+        VIEWERS.inc()
+        last_seq = -1
+        last_sent = 0
+        cache = None
+        try:
+            while StreamHandler.streaming:
+                # 画面来源（摄像头/视频预览/文档）切换后序号重新开始比较
+                current = current_frame_cache()
+                if current is not cache:
+                    cache, last_seq = current, -1
+                seq, jpeg = cache.latest()
+                if jpeg is None or (seq == last_seq and
+                                    time.time() - last_sent < StreamHandler.stream_keepalive_interval):
+                    # 等待下一帧广播
+                    event = self._frame_event
+                    try:
+                        await asyncio.wait_for(event.wait(), 1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # 只发送最新一帧：drain 期间发布的旧帧被跳过；画面没有变化时按较长间隔重发
+                last_seq = seq
+                last_sent = time.time()
+                writer.write(mjpeg_part_header(jpeg) + jpeg + b'\r\n')
+                JPEG_BYTES_SENT.inc(len(jpeg))
+                await asyncio.wait_for(writer.drain(), self.WRITE_TIMEOUT)
+        finally:
+            self.viewer_count -= 1
+            VIEWERS.dec()
+
+    def stop(self):
+        # 结束所有推流连接
+        StreamHandler.streaming = False
+        StreamHandler.jpeg_cache.remove_listener(self._on_new_frame_threadsafe)
+        StreamHandler.preview_cache.remove_listener(self._on_new_frame_threadsafe)
+        StreamHandler.document_cache.remove_listener(self._on_new_frame_threadsafe)
+        self._wake_viewers()
+        if self.preview_player is not None:
+            self.preview_player.close()
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._broadcast_new_frame)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=2)
@@ -0,0 +1,208 @@
+import json
+import os
+import platform
+import socket
+import time
+
+import numpy as np
+
+from detector_backends import BACKEND_NAMES, BackendUnavailable
+from eye_detector_mediapipe import MediaPipeEyeDetector
+
+# 探测结果按机器保存，同一台机器后续启动直接使用
+PROBE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".config", "ai-eye-remote", "detector_backend.json")
+
+REFERENCE_BACKEND = "facemesh"  # 精度基准
+PROBE_WARMUP_FRAMES = 3  # 不计入耗时的预热帧数
+MIN_REFERENCE_FACE_RATIO = 0.5  # 基准后端在录制帧中检测到人脸的最低比例，否则无法判断精度
+MIN_FACE_AGREEMENT = 0.9  # 有无人脸判断与基准一致的最低比例
+MIN_EYES_AGREEMENT = 0.9  # 睁眼/闭眼判断与基准一致的最低比例
+MAX_CENTER_ERROR = 0.03  # 眼睛中心与基准的中位距离上限（相对画面宽度）
+EYES_CLOSED_EAR = 0.21  # 与 MediaPipeEyeDetector.EAR_THRESHOLD 一致
+INCONCLUSIVE_RETRY_SECONDS = 24 * 3600  # 探测未得出结论时，回退的后端在这段时间内直接使用，之后重新探测
+
+
+def machine_id():
+    """机器标识：主机名 + 架构 + CPU型号，换机器或换CPU后重新探测"""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.lower().startswith(("model name", "hardware")):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{socket.gethostname()}|{platform.machine()}|{cpu}"
+
+
+def load_cached_backend(path=PROBE_CACHE_PATH):
+    """读取本机保存的后端选择，没有则返回 None"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entry = cache.get(machine_id())
+    if not entry or entry.get('backend') not in BACKEND_NAMES:
+        return None
+    if entry.get('inconclusive') and time.time() - entry.get('probed_at', 0) > INCONCLUSIVE_RETRY_SECONDS:
+        return None
+    return entry['backend']
+
+
+def save_backend(backend, report, path=PROBE_CACHE_PATH, inconclusive=False):
+    """保存本机的后端选择和探测报告；inconclusive 表示探测未得出结论，只是回退的可用后端"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[machine_id()] = {'backend': backend, 'probed_at': time.time(), 'inconclusive': inconclusive,
+                           'report': report}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"保存检测后端选择失败: {e}")
+
+
+def _run_backend(name, frames, backend_options):
+    """用指定后端按顺序测量所有录制帧，返回 (测量结果列表, 每帧耗时毫秒)"""
+    detector = MediaPipeEyeDetector(backend=name, backend_options=backend_options.get(name))
+    try:
+        measurements, times = [], []
+        for index, frame in enumerate(frames):
+            start = time.perf_counter()
+            measurements.append(detector.measure(frame))
+            if index >= PROBE_WARMUP_FRAMES:
+                times.append((time.perf_counter() - start) * 1000)
+        return measurements, times
+    finally:
+        detector.close()
+
+
+def _accuracy(measurements, reference, frame_width):
+    """与基准后端逐帧比较：有无人脸、睁眼/闭眼、眼睛中心位置"""
+    face_agree = np.mean([m['face_found'] == r['face_found'] for m, r in zip(measurements, reference)])
+    both = [(m, r) for m, r in zip(measurements, reference) if m['face_found'] and r['face_found']]
+    if not both:
+        return face_agree, 0.0, float('inf')
+    eyes_agree = np.mean([((m['left_ear'] + m['right_ear']) / 2 < EYES_CLOSED_EAR) ==
+                          ((r['left_ear'] + r['right_ear']) / 2 < EYES_CLOSED_EAR) for m, r in both])
+    center_error = np.median([np.hypot(m['eye_center'][0] - r['eye_center'][0],
+                                       m['eye_center'][1] - r['eye_center'][1]) for m, r in both])
+    return float(face_agree), float(eyes_agree), float(center_error / frame_width)
+
+
+def probe_backends(frames, candidates=BACKEND_NAMES, backend_options=None):
+    """在录制帧上依次运行各后端，返回 (选中的后端或None, 报告列表)
+
+    选择延迟最低且精度检查通过的后端；基准后端在录制帧中几乎没有检测到人脸时无法判断精度，返回 None。
+    """
+    backend_options = backend_options or {}
+    frame_width = frames[0].shape[1]
+    report = []
+
+    try:
+        reference, reference_times = _run_backend(REFERENCE_BACKEND, frames, backend_options)
+    except (BackendUnavailable, ImportError) as e:
+        print(f"基准后端 {REFERENCE_BACKEND} 不可用: {e}")
+        reference = None
+    if reference is not None:
+        report.append({'backend': REFERENCE_BACKEND, 'available': True, 'passed': True,
+                       'latency_ms': float(np.median(reference_times))})
+        face_ratio = np.mean([r['face_found'] for r in reference])
+        if face_ratio < MIN_REFERENCE_FACE_RATIO:
+            print(f"录制帧中人脸比例过低 ({face_ratio:.0%})，无法比较精度")
+            return None, report
+
+    for name in candidates:
+        if name == REFERENCE_BACKEND:
+            continue
+        try:
+            measurements, times = _run_backend(name, frames, backend_options)
+        except (BackendUnavailable, ImportError) as e:
+            report.append({'backend': name, 'available': False, 'passed': False, 'reason': str(e)})
+            continue
+        entry = {'backend': name, 'available': True, 'latency_ms': float(np.median(times))}
+        if reference is None:
+            # 没有基准时只能确认后端能检测到人脸
+            entry['passed'] = bool(np.mean([m['face_found'] for m in measurements]) >= MIN_REFERENCE_FACE_RATIO)
+        else:
+            face_agree, eyes_agree, center_error = _accuracy(measurements, reference, frame_width)
+            entry.update(face_agreement=face_agree, eyes_agreement=eyes_agree, center_error=center_error)
+            entry['passed'] = bool(face_agree >= MIN_FACE_AGREEMENT and eyes_agree >= MIN_EYES_AGREEMENT and
+                                   center_error <= MAX_CENTER_ERROR)
+        report.append(entry)
+
+    passed = [entry for entry in report if entry.get('passed')]
+    if not passed:
+        return None, report
+    best = min(passed, key=lambda entry: entry['latency_ms'])
+    return best['backend'], report
+
+
+def print_probe_report(report):
+    for entry in report:
+        if not entry['available']:
+            print(f"  {entry['backend']:<11} 不可用: {entry['reason']}")
+            continue
+        line = f"  {entry['backend']:<11} {entry['latency_ms']:7.2f} ms  {'通过' if entry['passed'] else '未通过'}"
+        if 'face_agreement' in entry:
+            line += (f"  人脸一致 {entry['face_agreement']:.0%}  睁闭眼一致 {entry['eyes_agreement']:.0%}"
+                     f"  中心偏差 {entry['center_error']:.1%}")
+        print(line)
+
+
+def backend_available(name, backend_options=None):
+    """能否在本机创建该后端（依赖模块、模型文件是否齐全）"""
+    backend_options = backend_options or {}
+    try:
+        detector = MediaPipeEyeDetector(backend=name, backend_options=backend_options.get(name))
+    except (BackendUnavailable, ImportError):
+        return False
+    detector.close()
+    return True
+
+
+def fallback_backend(backend_options=None):
+    """探测未得出结论时使用的后端：基准后端，不可用时依次取第一个可用的后端"""
+    for name in (REFERENCE_BACKEND,) + tuple(n for n in BACKEND_NAMES if n != REFERENCE_BACKEND):
+        if backend_available(name, backend_options):
+            return name
+    raise BackendUnavailable("没有可用的检测后端（需要 mediapipe 或 OpenCV 的 Haar 级联文件）")
+
+
+def select_backend(record_frames, reprobe=False, backend_options=None, cache_path=PROBE_CACHE_PATH):
+    """启动时选择检测后端：优先使用本机保存的结果，否则录制若干帧探测并保存
+
+    record_frames 为无参函数，返回用于探测的帧列表（只在需要探测时调用）。
+    探测未得出结论（帧不足、画面中没有人脸）时使用可用的回退后端，并标记为未得出结论保存，
+    INCONCLUSIVE_RETRY_SECONDS 之内的启动直接使用，之后重新探测。
+    """
+    if not reprobe:
+        cached = load_cached_backend(cache_path)
+        if cached:
+            print(f"使用本机保存的检测后端: {cached}")
+            return cached
+
+    frames = record_frames()
+    if len(frames) <= PROBE_WARMUP_FRAMES:
+        backend = fallback_backend(backend_options)
+        print(f"探测帧不足，使用默认检测后端: {backend}")
+        save_backend(backend, [], cache_path, inconclusive=True)
+        return backend
+
+    print(f"正在探测检测后端（{len(frames)} 帧）...")
+    backend, report = probe_backends(frames, backend_options=backend_options)
+    print_probe_report(report)
+    if backend is None:
+        backend = fallback_backend(backend_options)
+        print(f"探测未得出结论，使用默认检测后端: {backend}")
+        save_backend(backend, report, cache_path, inconclusive=True)
+        return backend
+    save_backend(backend, report, cache_path)
+    print(f"已选择检测后端: {backend}")
+    return backend
@@ -0,0 +1,1085 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 性能基准测试脚本（无需摄像头）
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+
+def make_test_frame(index, width=640, height=480):
+    """生成带变化内容的测试帧，避免JPEG编码命中过于简单的画面"""
+    rng = np.random.default_rng(index)
+    frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frame[:, :, 1] = (np.arange(width, dtype=np.uint16) + index * 4).astype(np.uint8)
+    return frame
+
+
+def _stream_viewer_process(port, viewers, duration, result_queue):
+    """在独立进程中打开多个 /stream 连接并持续读取，避免客户端占用服务端CPU"""
+    sockets = []
+    for _ in range(viewers):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"GET /stream HTTP/1.0\r\n\r\n")
+        sock.setblocking(False)
+        sockets.append(sock)
+
+    import selectors
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        selector.register(sock, selectors.EVENT_READ)
+
+    received = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        for key, _ in selector.select(timeout=0.1):
+            try:
+                data = key.fileobj.recv(262144)
+            except BlockingIOError:
+                continue
+            received += len(data)
+    for sock in sockets:
+        sock.close()
+    result_queue.put(received)
+
+
+def bench_viewers(args):
+    """测量观看者数量增加时服务端CPU占用：编码只做一次，每个观看者的CPU开销应趋于平稳"""
+    from stream_server import StreamHandler
+    if args.backend == "asyncio":
+        from async_stream_server import AsyncStreamServer as server_cls
+    else:
+        from stream_server import StreamServer as server_cls
+
+    frames = [make_test_frame(i) for i in range(30)]
+    print(f"{'viewers':>8} {'cpu_ms/s':>10} {'cpu_ms/s/viewer':>16} {'encodes/s':>10} {'MB/s sent':>10}")
+
+    for viewers in args.viewers:
+        server = server_cls(port=args.port)
+        server.start()
+        time.sleep(0.2)
+
+        result_queue = multiprocessing.Queue()
+        client = multiprocessing.Process(target=_stream_viewer_process,
+                                         args=(server.port, viewers, args.duration + 0.5, result_queue))
+        client.start()
+        time.sleep(0.5)  # 等待所有连接建立
+
+        encoded_before = StreamHandler.jpeg_cache.encoded_count
+        cpu_before = time.process_time()
+        start = time.time()
+        interval = 1.0 / args.fps
+        index = 0
+        while time.time() - start < args.duration:
+            server.update_frame(frames[index % len(frames)])
+            index += 1
+            time.sleep(max(0.0, start + index * interval - time.time()))
+        elapsed = time.time() - start
+        cpu_ms = (time.process_time() - cpu_before) * 1000 / elapsed
+        encodes = (StreamHandler.jpeg_cache.encoded_count - encoded_before) / elapsed
+
+        received = result_queue.get()
+        client.join()
+        server.stop()
+        if server.server is not None:
+            server.server.server_close()
+
+        print(f"{viewers:>8} {cpu_ms:>10.1f} {cpu_ms / viewers:>16.2f} {encodes:>10.1f} "
+              f"{received / elapsed / 1e6:>10.2f}")
+
+
+def _make_landmark_list(seed=0):
+    """构造 478 个关键点的 NormalizedLandmarkList（优先使用 MediaPipe 的 protobuf 类型）"""
+    rng = np.random.default_rng(seed)
+    values = rng.random((478, 3))
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+        landmark_list = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in values:
+            landmark_list.landmark.add(x=x, y=y, z=z)
+        return landmark_list
+    except ImportError:
+        from types import SimpleNamespace
+        return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in values])
+
+
+def _legacy_ear_path(face_landmarks, w, h, left_indices, right_indices):
+    """改造前的实现：逐点构造 np.array（整数截断），每只眼睛3次 np.linalg.norm"""
+    def calculate_ear(eye_landmarks):
+        p1, p2, p3, p4, p5, p6 = eye_landmarks
+        A = np.linalg.norm(p2 - p6)
+        B = np.linalg.norm(p3 - p5)
+        C = np.linalg.norm(p1 - p4)
+        if C == 0:
+            return 0.0
+        return (A + B) / (2.0 * C)
+
+    left_eye_points = []
+    right_eye_points = []
+    for idx in left_indices:
+        landmark = face_landmarks.landmark[idx]
+        left_eye_points.append(np.array([int(landmark.x * w), int(landmark.y * h)]))
+    for idx in right_indices:
+        landmark = face_landmarks.landmark[idx]
+        right_eye_points.append(np.array([int(landmark.x * w), int(landmark.y * h)]))
+    left_ear = calculate_ear(left_eye_points)
+    right_ear = calculate_ear(right_eye_points)
+    left_eye_center = np.mean(left_eye_points, axis=0)
+    right_eye_center = np.mean(right_eye_points, axis=0)
+    eye_center = ((left_eye_center + right_eye_center) / 2).astype(int)
+    return left_ear, right_ear, eye_center
+
+
+def _time_per_call(func, iterations):
+    """返回每次调用的平均耗时（微秒）"""
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_ear(args):
+    """关键点提取 + 双眼EAR + 眼睛中心：逐点 Python 循环 vs 预分配数组的向量化计算"""
+    from face_landmarks import (FaceLandmarks, LEFT_EYE_EAR_INDICES, RIGHT_EYE_EAR_INDICES,
+                                EAR_LANDMARK_ROWS, OUTLINE_LANDMARK_ROWS)
+
+    landmark_list = _make_landmark_list()
+    w, h = 640, 480
+    container = FaceLandmarks()
+
+    def vectorized(rows):
+        container.fill(landmark_list, w, h, rows)
+        return container.eye_metrics()
+
+    cases = [
+        ("legacy (per-point np.array + 6x norm)",
+         lambda: _legacy_ear_path(landmark_list, w, h, LEFT_EYE_EAR_INDICES, RIGHT_EYE_EAR_INDICES)),
+        ("vectorized, fill 12 EAR rows", lambda: vectorized(EAR_LANDMARK_ROWS)),
+        ("vectorized, fill 32 outline rows", lambda: vectorized(OUTLINE_LANDMARK_ROWS)),
+        ("vectorized, fill all 478 rows", lambda: vectorized(None)),
+    ]
+    print(f"{'path':<40} {'us/frame':>10}")
+    for name, func in cases:
+        print(f"{name:<40} {_time_per_call(func, args.iterations):>10.1f}")
+
+    legacy_left, legacy_right, _ = cases[0][1]()
+    ears, _ = vectorized(EAR_LANDMARK_ROWS)
+    print(f"EAR legacy (int pixels): {legacy_left:.4f}/{legacy_right:.4f}  "
+          f"vectorized (float pixels): {ears[0]:.4f}/{ears[1]:.4f}")
+
+
+def _load_source_frames(source, count, width=640, height=480):
+    """读取测试帧：视频文件按顺序读取；图片则缩放到帧尺寸后逐帧平移，模拟头部的小幅移动"""
+    import cv2
+
+    image = cv2.imread(source)
+    if image is None:
+        cap = cv2.VideoCapture(source)
+        frames = []
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (width, height)))
+        cap.release()
+        return frames
+
+    image = cv2.resize(image, (width, height))
+    frames = []
+    for i in range(count):
+        dx = 12 * np.sin(i / 15.0)
+        dy = 8 * np.sin(i / 10.0)
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        frames.append(cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE))
+    return frames
+
+
+def bench_inference(args):
+    """整帧 / 裁剪区域 / 缩小整帧三种推理模式的像素数、推理耗时和EAR偏差（可叠加关键帧 + 光流传播）"""
+    from eye_detector_mediapipe import MediaPipeEyeDetector
+
+    frames = _load_source_frames(args.source, args.frames)
+    if not frames:
+        print(f"无法读取测试素材: {args.source}")
+        return
+
+    reference = None
+    print(f"{'mode':<10} {'interval':>8} {'kpx/frame':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} "
+          f"{'face %':>7} {'keyframe %':>10} {'fallbacks':>9} {'EAR diff':>9}")
+    cases = [(mode, 1) for mode in args.modes]
+    for interval in args.keyframe_intervals:
+        if interval > 1:
+            cases.extend((mode, interval) for mode in args.modes)
+    for mode, interval in cases:
+        detector = MediaPipeEyeDetector(inference_mode=mode, keyframe_interval=interval)
+        pixels, times, ears = [], [], []
+        for frame in frames:
+            result = detector.detect_eyes_state(frame)
+            pixels.append(result['inference_pixels'])
+            times.append(result['inference_ms'])
+            ears.append(result['avg_ear'] if result['face_detected'] else np.nan)
+        ears = np.array(ears)
+        if reference is None:
+            reference = ears
+        ear_diff = np.nanmean(np.abs(ears - reference))
+        # 跳过第一帧（整帧检测 + 模型预热）
+        steady = np.array(times[1:] or times)
+        keyframe_ratio = detector.keyframe_count / len(frames) * 100
+        print(f"{mode:<10} {interval:>8} {np.mean(pixels) / 1000:>10.1f} {np.percentile(steady, 50):>8.2f} "
+              f"{np.percentile(steady, 95):>8.2f} {np.mean(steady):>8.2f} {np.mean(~np.isnan(ears)) * 100:>7.1f} "
+              f"{keyframe_ratio:>10.1f} {detector.roi_fallback_count:>9} {ear_diff:>9.4f}")
+
+
+def _responsiveness_probe(stop_event, interval, lateness):
+    """模拟界面事件循环：每隔 interval 醒来一次，记录实际唤醒比预期晚了多少（GIL争用的直接体现）"""
+    while not stop_event.is_set():
+        expected = time.perf_counter() + interval
+        time.sleep(interval)
+        lateness.append(time.perf_counter() - expected)
+
+
+def bench_detector_process(args):
+    """进程内检测 vs 独立检测进程：端到端识别帧率和界面线程响应延迟"""
+    import threading
+    from camera_capture import FramePacer
+    from detector_worker import ProcessEyeDetector
+    from eye_detector_mediapipe import MediaPipeEyeDetector
+    from stream_server import StreamServer
+
+    frames = _load_source_frames(args.source, 120)
+    if not frames:
+        print(f"无法读取测试素材: {args.source}")
+        return
+
+    rows = []
+    for mode in args.modes:
+        server = StreamServer(port=args.port)
+        server.start()
+        client = None
+        if args.viewers:
+            result_queue = multiprocessing.Queue()
+            client = multiprocessing.Process(target=_stream_viewer_process,
+                                             args=(server.port, args.viewers, args.duration + 1.0, result_queue))
+            client.start()
+            time.sleep(0.5)
+
+        detector = ProcessEyeDetector() if mode == "process" else MediaPipeEyeDetector()
+        detector.detect_eyes_state(frames[0])  # 预热（启动子进程、加载模型）
+
+        stop_event = threading.Event()
+        lateness = []
+        probe = threading.Thread(target=_responsiveness_probe,
+                                 args=(stop_event, args.probe_interval / 1000, lateness), daemon=True)
+        probe.start()
+
+        pacer = FramePacer(args.fps)
+        processed = 0
+        start = time.time()
+        while time.time() - start < args.duration:
+            pacer.wait()
+            frame = frames[processed % len(frames)].copy()
+            detection_result = detector.detect_eyes_state(frame)
+            detector.draw_landmarks(frame, detection_result)
+            server.update_frame(frame)
+            server.update_detection(detection_result)
+            processed += 1
+        elapsed = time.time() - start
+
+        stop_event.set()
+        probe.join()
+        if client is not None:
+            result_queue.get()
+            client.join()
+        detector.close()
+        server.stop()
+        if server.server is not None:
+            server.server.server_close()
+
+        lateness_ms = np.array(lateness) * 1000
+        rows.append((mode, processed / elapsed, np.percentile(lateness_ms, 50),
+                     np.percentile(lateness_ms, 99), lateness_ms.max()))
+
+    print(f"{'mode':<10} {'fps':>7} {'ui p50 ms':>10} {'ui p99 ms':>10} {'ui max ms':>10}")
+    for mode, fps, p50, p99, worst in rows:
+        print(f"{mode:<10} {fps:>7.1f} {p50:>10.2f} {p99:>10.2f} {worst:>10.2f}")
+
+
+def bench_pipeline(args):
+    """流水线检测吞吐量随实例数 K 的变化（不限帧率，尽可能快地提交）"""
+    from pipelined_detector import PipelinedEyeDetector
+
+    frames = _load_source_frames(args.source, 120)
+    if not frames:
+        print(f"无法读取测试素材: {args.source}")
+        return
+
+    print(f"{'K':>3} {'workers':<8} {'fps':>7} {'latency ms':>11} {'in order':>9} {'face %':>7}")
+    for workers in args.workers:
+        detector = PipelinedEyeDetector(workers=workers, worker_type=args.worker_type)
+        # 预热：每个实例至少处理一帧（启动子进程、加载模型）
+        for index in range(workers):
+            detector.submit(frames[index])
+        detector.flush(timeout=60)
+
+        submit_times = {}
+        delivered = []
+        faces = 0
+        seq = 0
+        start = time.time()
+        while time.time() - start < args.duration:
+            seq += 1
+            submit_times[seq] = time.time()
+            for done_seq, _, result in detector.process(frames[seq % len(frames)], seq):
+                delivered.append((done_seq, time.time() - submit_times.pop(done_seq)))
+                faces += result['face_detected']
+        for done_seq, _, result in detector.flush():
+            delivered.append((done_seq, time.time() - submit_times.pop(done_seq)))
+            faces += result['face_detected']
+        elapsed = time.time() - start
+        detector.close()
+
+        order = [done_seq for done_seq, _ in delivered]
+        in_order = order == sorted(order) and len(order) == seq
+        latency_ms = np.mean([latency for _, latency in delivered]) * 1000
+        print(f"{workers:>3} {args.worker_type:<8} {len(delivered) / elapsed:>7.1f} {latency_ms:>11.1f} "
+              f"{str(in_order):>9} {faces / max(1, len(delivered)) * 100:>7.1f}")
+
+
+def bench_backends(args):
+    """在录制素材上运行启动探测：各检测后端的延迟和相对 facemesh 的精度检查"""
+    from backend_probe import probe_backends, print_probe_report, save_backend
+
+    frames = _load_source_frames(args.source, args.frames)
+    if not frames:
+        print(f"无法读取测试素材: {args.source}")
+        return
+    backend_options = {}
+    if args.landmarker_model:
+        backend_options['landmarker'] = {'model_path': args.landmarker_model}
+    if args.haar_dir:
+        backend_options['opencv'] = {'cascade_dir': args.haar_dir}
+
+    backend, report = probe_backends(frames, backend_options=backend_options)
+    print_probe_report(report)
+    print(f"选择: {backend}")
+    if args.save and backend is not None:
+        save_backend(backend, report)
+
+
+def bench_record(args):
+    """不用摄像头录制会话：素材帧按固定帧率打上采集时间，经检测器和动作控制器处理后录制"""
+    from action_controller_simple import SimpleActionController, ControlMode
+    from eye_detector_mediapipe import MediaPipeEyeDetector
+    from session_recorder import SessionRecorder
+
+    frames = _load_source_frames(args.source, args.frames)
+    if not frames:
+        print(f"无法读取测试素材: {args.source}")
+        return
+    config = {'inference_mode': args.inference_mode, 'keyframe_interval': args.keyframe_interval}
+    detector = MediaPipeEyeDetector(**config)
+    controller = SimpleActionController()
+    controller.switch_mode(ControlMode(args.mode))
+    recorder = SessionRecorder(args.output, detector_config=dict(config, backend="facemesh"),
+                               max_pending_frames=len(frames))
+    start_timestamp = time.time()
+    try:
+        for seq, frame in enumerate(frames, 1):
+            timestamp = start_timestamp + seq / args.fps
+            recorder.record_frame(seq, timestamp, frame)
+            mode = controller.mode.value
+            detection_result = detector.detect_eyes_state(frame, timestamp)
+            command = controller.process_detection(detection_result)
+            recorder.record_result(seq, detection_result, command, mode)
+    finally:
+        detector.close()
+        recorder.close()
+
+
+def bench_replay(args):
+    """确定性回放录制的会话，与录制时的检测结果和命令逐帧比较，并报告回放吞吐量"""
+    from session_recorder import SessionRecording, replay_session, print_replay_report
+
+    recording = SessionRecording(args.recording)
+    overrides = {}
+    if args.inference_mode:
+        overrides['inference_mode'] = args.inference_mode
+    if args.keyframe_interval:
+        overrides['keyframe_interval'] = args.keyframe_interval
+    report = replay_session(recording, realtime=args.realtime, detector_kwargs=overrides,
+                            ear_tolerance=args.ear_tolerance)
+    print_replay_report(report)
+    if report['mismatched_frames']:
+        raise SystemExit(1)
+
+
+class StageProfiler:
+    """按阶段记录每次调用的耗时；trace_allocations 为 True 时改为记录每次调用新分配内存的峰值（需先 tracemalloc.start()）"""
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.times = {}
+        self.allocations = {}
+
+    def call(self, name, func, *args, **kwargs):
+        import tracemalloc
+
+        if self.trace_allocations:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter_ns()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter_ns() - start
+        if self.trace_allocations:
+            self.allocations.setdefault(name, []).append(tracemalloc.get_traced_memory()[1] - before)
+        else:
+            self.times.setdefault(name, []).append(elapsed)
+        return result
+
+    def wrap(self, name, func):
+        """包装为计时函数，用于替换对象上的方法（检测器内部调用的阶段）"""
+        def wrapper(*args, **kwargs):
+            return self.call(name, func, *args, **kwargs)
+        return wrapper
+
+
+def _instrumented_detector(profiler):
+    """创建检测器，并把 update() 内部调用的阶段替换为计时版本（只影响这个实例）"""
+    from eye_detector_mediapipe import MediaPipeEyeDetector
+
+    detector = MediaPipeEyeDetector()
+    detector.face_mesh.process = profiler.wrap("face_mesh.process", detector.face_mesh.process)
+    detector.landmarks.fill = profiler.wrap("landmark extraction", detector.landmarks.fill)
+    # 单帧EAR计算在热路径中由 eye_metrics 完成（calculate_ear 的向量化版本）
+    detector.landmarks.eye_metrics = profiler.wrap("calculate_ear", detector.landmarks.eye_metrics)
+    detector.update_eye_state = profiler.wrap("update_eye_state", detector.update_eye_state)
+    detector._detect_vertical_movement = profiler.wrap("_detect_vertical_movement",
+                                                       detector._detect_vertical_movement)
+    return detector
+
+
+def _qt_update_frame(size=(640, 480)):
+    """返回与 main_widget.MainWindow.update_frame 相同的 BGR -> QPixmap 转换；没有 PyQt6 时返回 None"""
+    import os
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtCore import Qt, QSize
+        from PyQt6.QtGui import QGuiApplication, QImage, QPixmap
+    except ImportError:
+        return None
+    import cv2
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    label_size = QSize(*size)
+
+    def update_frame(frame):
+        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        qt_image = QImage(rgb_image.data, w, h, ch * w, QImage.Format.Format_RGB888)
+        pixmap = QPixmap.fromImage(qt_image)
+        return pixmap.scaled(label_size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    update_frame.app = app
+    return update_frame
+
+
+def _run_stage_pass(frames, timestamps, profiler, qt_update_frame):
+    """按 main_simple 的顺序处理所有帧：检测 -> 动作 -> 绘制 -> JPEG编码（-> Qt显示转换）"""
+    import types
+
+    import cv2
+
+    from action_controller_simple import SimpleActionController
+    from main_simple import SimpleEyeRemote
+    from stream_server import encode_jpeg
+
+    detector = _instrumented_detector(profiler)
+    controller = SimpleActionController()
+    # draw_debug_info 只读取这几个属性，不需要创建完整的 SimpleEyeRemote（摄像头、推流服务器）
+    remote = types.SimpleNamespace(action_controller=controller, frame_count=0,
+                                   media_controller=types.SimpleNamespace(
+                                       get_video_status=lambda: controller.video_playing),
+                                   calculate_fps=lambda: 0.0)
+    start = time.perf_counter()
+    try:
+        for index, (frame, timestamp) in enumerate(zip(frames, timestamps)):
+            # cvtColor 在检测器内部与 face_mesh.process 相邻调用，这里在同一帧上单独计时
+            profiler.call("cv2.cvtColor", cv2.cvtColor, frame, cv2.COLOR_BGR2RGB)
+            detection_result = detector.detect_eyes_state(frame, timestamp)
+            command = controller.process_detection(detection_result)
+            visualized_frame = frame.copy()
+            profiler.call("draw_landmarks", detector.draw_landmarks, visualized_frame, detection_result)
+            remote.frame_count = index
+            profiler.call("draw_debug_info", SimpleEyeRemote.draw_debug_info, remote,
+                          visualized_frame, detection_result, command)
+            profiler.call("cv2.imencode", encode_jpeg, visualized_frame)
+            if qt_update_frame is not None:
+                profiler.call("qt update_frame", qt_update_frame, visualized_frame)
+    finally:
+        detector.close()
+    return time.perf_counter() - start
+
+
+# 仓库中的测试素材（NASA 公有领域的宇航员肖像）和在它上面生成的基线
+STAGE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_face.jpg")
+STAGE_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_stages_baseline.json")
+STAGE_REGRESSION_MIN_MS = 0.05  # 小于此值的耗时增长视为噪声
+STAGE_REGRESSION_MIN_KB = 1.0  # 小于此值的分配增长视为噪声
+
+
+def _compare_stage_baseline(result, baseline, threshold):
+    """与基线比较，返回回归列表 [(阶段, 指标, 基线值, 当前值)]"""
+    regressions = []
+    for name, stats in result['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base:
+            continue
+        # p99 只输出不判定：几百帧的 p99 取决于个别几帧，受系统调度影响太大
+        for metric in ("p50_ms", "p95_ms"):
+            if (stats[metric] > base[metric] * (1 + threshold) and
+                    stats[metric] - base[metric] > STAGE_REGRESSION_MIN_MS):
+                regressions.append((name, metric, base[metric], stats[metric]))
+        if stats.get('alloc_kb') is not None and base.get('alloc_kb') is not None:
+            if (stats['alloc_kb'] > base['alloc_kb'] * (1 + threshold) and
+                    stats['alloc_kb'] - base['alloc_kb'] > STAGE_REGRESSION_MIN_KB):
+                regressions.append((name, "alloc_kb", base['alloc_kb'], stats['alloc_kb']))
+    if baseline.get('fps') and result['fps'] < baseline['fps'] / (1 + threshold):
+        regressions.append(("overall", "fps", baseline['fps'], result['fps']))
+    return regressions
+
+
+def _check_stage_baseline(result, path, threshold):
+    """读取基线文件并比较，返回 (状态, 回归列表)
+
+    状态: "ok" 没有回归 / "regressed" 出现回归 / "missing" 基线文件不存在 /
+    "invalid" 基线文件无法解析 / "mismatch" 基线的测试素材或帧数与本次不同（结果不可比）
+    """
+    import json
+
+    if not os.path.exists(path):
+        print(f"基线文件不存在: {path}，没有做回归比较（用 --update-baseline 生成）")
+        return "missing", []
+    try:
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"无法读取基线文件 {path}: {e}")
+        return "invalid", []
+    if not isinstance(baseline, dict) or not isinstance(baseline.get('stages'), dict):
+        print(f"基线文件格式不正确: {path}")
+        return "invalid", []
+    for key in ("source", "frames", "frame_shape"):
+        if baseline.get(key) != result[key]:
+            print(f"基线的 {key} 与本次不同（{baseline.get(key)} / {result[key]}），没有做回归比较")
+            return "mismatch", []
+    if baseline.get('platform') != result['platform']:
+        print(f"注意: 基线生成于 {baseline.get('platform')}，与本机不同，耗时差异可能来自硬件")
+    regressions = _compare_stage_baseline(result, baseline, threshold)
+    if not regressions:
+        print(f"与基线相比没有回归（阈值 {threshold:.0%}）")
+        return "ok", []
+    print(f"与基线相比出现回归（阈值 {threshold:.0%}）:")
+    for name, metric, base, current in regressions:
+        print(f"  {name:<26} {metric:<8} {base:10.3f} -> {current:10.3f}")
+    return "regressed", regressions
+
+
+def bench_stages(args):
+    """热路径逐阶段的 p50/p95/p99 耗时、每次调用的内存分配和整体帧率（无需摄像头和显示器）
+
+    结果写入 JSON 文件并与基线逐阶段比较：出现回归时退出码为 1，
+    基线文件不存在、无法读取或测试素材不同（没能比较）时退出码为 2。
+    """
+    import json
+    import platform
+    import tracemalloc
+
+    import cv2
+
+    if args.recording:
+        from session_recorder import SessionRecording
+
+        recording = SessionRecording(args.recording)
+        count = min(args.frames, len(recording))
+        frames = [np.array(recording.frames[i]) for i in range(count)]
+        timestamps = [float(t) for t in recording.index['timestamp'][:count]]
+        source = args.recording
+    else:
+        frames = _load_source_frames(args.source, args.frames)
+        timestamps = [i / 30.0 for i in range(len(frames))]
+        # 仓库内的素材记录相对路径，基线在其他检出目录中也能比较
+        source = os.path.abspath(args.source)
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        if os.path.commonpath([source, repo_dir]) == repo_dir:
+            source = os.path.relpath(source, repo_dir)
+        else:
+            source = args.source
+    if not frames:
+        print(f"无法读取测试素材: {source}")
+        return
+
+    qt_update_frame = _qt_update_frame((frames[0].shape[1], frames[0].shape[0]))
+    if qt_update_frame is None:
+        print("未安装 PyQt6，跳过 Qt update_frame 阶段")
+
+    # 计时和内存分配分两遍统计，tracemalloc 的开销不计入耗时
+    profiler = StageProfiler()
+    elapsed = _run_stage_pass(frames, timestamps, profiler, qt_update_frame)
+    if args.alloc_frames > 0:
+        profiler.trace_allocations = True
+        tracemalloc.start()
+        _run_stage_pass(frames[:args.alloc_frames], timestamps[:args.alloc_frames], profiler, qt_update_frame)
+        tracemalloc.stop()
+
+    stages = {}
+    for name, samples in profiler.times.items():
+        ms = np.array(samples) / 1e6
+        allocations = profiler.allocations.get(name)
+        stages[name] = {
+            'calls': len(samples),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'mean_ms': float(ms.mean()),
+            'alloc_kb': float(np.mean(allocations)) / 1024 if allocations else None,
+        }
+    result = {
+        'source': source,
+        'frames': len(frames),
+        'frame_shape': list(frames[0].shape),
+        'fps': len(frames) / elapsed,
+        'created_at': time.time(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'stages': stages,
+    }
+
+    print(f"{'stage':<26} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'alloc KB':>9}")
+    for name, stats in stages.items():
+        alloc = f"{stats['alloc_kb']:9.1f}" if stats['alloc_kb'] is not None else f"{'-':>9}"
+        print(f"{name:<26} {stats['calls']:>6} {stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} "
+              f"{stats['p99_ms']:>8.3f} {alloc}")
+    print(f"整体: {len(frames)} 帧, {result['fps']:.1f} fps")
+
+    status, regressions = "skipped", []
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        status = "updated"
+        print(f"基线已更新: {args.baseline}")
+    elif args.baseline:
+        status, regressions = _check_stage_baseline(result, args.baseline, args.threshold)
+    else:
+        print("未指定基线文件，不做回归比较")
+    result['baseline'] = {'path': args.baseline, 'status': status,
+                          'regressions': [list(regression) for regression in regressions]}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
+
+    if status == "regressed":
+        raise SystemExit(1)
+    if status in ("missing", "invalid", "mismatch"):
+        # 没能比较不等于没有回归，用单独的退出码区分
+        raise SystemExit(2)
+
+
+def bench_mpv_ipc(args):
+    """mpv IPC 控制器的暂停/恢复延迟和状态推送延迟（启动真实的 mpv；协议行为的测试见 tests/test_mpv_ipc.py）"""
+    import os
+    import tempfile
+    import threading
+
+    from mpv_ipc import MpvMediaController
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"ai-eye-remote-bench-mpv-{os.getpid()}.sock")
+    controller = MpvMediaController(socket_path=socket_path, mpv_args=['--vo=null', '--ao=null'])
+
+    status_changed = threading.Event()
+    controller.add_status_listener(lambda playing: status_changed.set())
+    videos = args.video
+    try:
+        # 预热：加载播放列表时启动 mpv 并暂停在第一帧，不计入首次播放
+        start = time.perf_counter()
+        controller.load_playlist(videos)
+        print(f"预加载（含启动 mpv、连接、加载）: {(time.perf_counter() - start) * 1000:.1f} ms")
+        start = time.perf_counter()
+        if not controller.play_video():
+            print("播放失败")
+            return
+        print(f"首次播放（已预加载，只取消暂停）: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        command_ms, push_ms = [], []
+        for i in range(args.iterations):
+            status_changed.clear()
+            start = time.perf_counter()
+            ok = controller.pause_video() if i % 2 == 0 else controller.resume_video()
+            command_ms.append((time.perf_counter() - start) * 1000)
+            if not ok or not status_changed.wait(1.0):
+                print("未收到状态推送")
+                break
+            push_ms.append((time.perf_counter() - start) * 1000)
+        if push_ms:
+            print(f"暂停/恢复 {len(command_ms)} 次: 命令往返 p50 {np.percentile(command_ms, 50):.2f} ms "
+                  f"p95 {np.percentile(command_ms, 95):.2f} ms；状态推送 p50 {np.percentile(push_ms, 50):.2f} ms "
+                  f"p95 {np.percentile(push_ms, 95):.2f} ms")
+        controller.seek(10, "absolute")
+        print(f"seek 后 time-pos: {controller.get_property('time-pos')}")
+        if len(controller.playlist) > 1:
+            start = time.perf_counter()
+            controller.next_video()
+            deadline = time.time() + 5.0
+            while controller.current_video != controller.playlist[1] and time.time() < deadline:
+                time.sleep(0.001)
+            print(f"切换到下一个视频: {(time.perf_counter() - start) * 1000:.2f} ms -> {controller.current_video}")
+        controller.stop_video()
+        print(f"stop 后播放状态: {controller.get_video_status()}")
+        start = time.perf_counter()
+        controller.play_video()
+        print(f"stop 后重新播放（重新加载播放列表）: {(time.perf_counter() - start) * 1000:.2f} ms")
+    finally:
+        controller.close()
+
+
+def _reader_window(title):
+    """在 X 显示上创建一个标题为 title 的窗口充当PDF阅读器，后台线程把收到的按键放入队列"""
+    import os
+    import queue
+    import threading
+
+    from Xlib import X, display
+
+    conn = display.Display(os.environ['DISPLAY'])
+    screen = conn.screen()
+    window = screen.root.create_window(0, 0, 320, 240, 0, screen.root_depth,
+                                       event_mask=X.KeyPressMask | X.StructureNotifyMask)
+    window.set_wm_name(title)
+    window.set_wm_class(title.split()[0], title.split()[0].capitalize())
+    window.map()
+    conn.sync()
+    keys = queue.Queue()
+
+    def read_events():
+        try:
+            while True:
+                ev = conn.next_event()
+                if ev.type == X.KeyPress:
+                    keys.put((time.perf_counter(), ev.detail))
+                elif ev.type == X.DestroyNotify:
+                    break
+        except Exception:
+            pass
+
+    threading.Thread(target=read_events, daemon=True).start()
+    return conn, window, keys
+
+
+def _time_page_turns(turn, keys, iterations):
+    """每次翻页到阅读器窗口收到按键的延迟（毫秒）；未收到按键的次数"""
+    import queue
+
+    latencies, missed = [], 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        turn("page_down" if i % 2 == 0 else "page_up")
+        try:
+            received, _ = keys.get(timeout=1.0)
+            latencies.append((received - start) * 1000)
+        except queue.Empty:
+            missed += 1
+    return latencies, missed
+
+
+def bench_page_turn(args):
+    """XTest 翻页与 xdotool 翻页的延迟对比（在 Xvfb 等独立的 X 显示上运行，例如 Xvfb :99 &）"""
+    import os
+    import shutil
+
+    from media_controller_simple_fallback import SimpleMediaController
+
+    os.environ['DISPLAY'] = args.display
+    try:
+        conn, window, keys = _reader_window("evince - test.pdf")
+    except ImportError:
+        print("需要 python-xlib: pip install python-xlib")
+        return
+    except Exception as e:
+        print(f"无法连接 X 显示 {args.display}（先运行 Xvfb {args.display}）: {e}")
+        return
+    controller = SimpleMediaController()
+    controller.x_display = args.display
+    controller.document_control_method = "xtest"
+
+    def report(name, latencies, missed):
+        if latencies:
+            print(f"{name}: {len(latencies)} 次 p50 {np.percentile(latencies, 50):.2f} ms "
+                  f"p95 {np.percentile(latencies, 95):.2f} ms max {max(latencies):.2f} ms，未收到按键 {missed} 次")
+        else:
+            print(f"{name}: 未收到按键 {missed} 次")
+
+    try:
+        latencies, missed = _time_page_turns(controller.control_document, keys, args.iterations)
+        document_input = controller.document_input
+        if document_input is None:
+            print("XTest 后端不可用")
+        else:
+            report("XTest", latencies, missed)
+            print(f"窗口搜索次数: {document_input.lookups}")
+
+            # 阅读器窗口关闭后重新打开：缓存应作废并找到新窗口
+            window.destroy()
+            conn.sync()
+            conn, window, keys = _reader_window("okular - test.pdf")
+            latencies, missed = _time_page_turns(controller.control_document, keys, 10)
+            report("重新打开窗口后 XTest", latencies, missed)
+            print(f"窗口搜索次数: {document_input.lookups}，缓存窗口 {document_input.window_id:#x}，"
+                  f"新窗口 {window.id:#x}")
+
+        if shutil.which("xdotool"):
+            latencies, missed = _time_page_turns(controller._control_document_xdotool, keys,
+                                                 min(args.iterations, args.xdotool_iterations))
+            report("xdotool", latencies, missed)
+        else:
+            print("未安装 xdotool，跳过对比")
+    finally:
+        controller.close()
+        window.destroy()
+        conn.close()
+
+
+def bench_pdf(args):
+    """内置PDF渲染器的翻页延迟：有预取（缓存命中）与无预取（每页现渲染）对比"""
+    from pdf_renderer import PdfDocument, PdfRenderError
+
+    for prefetch in (args.prefetch, 0):
+        try:
+            document = PdfDocument(args.pdf, prefetch=prefetch)
+        except PdfRenderError as e:
+            print(e)
+            return
+        try:
+            start = time.perf_counter()
+            document.goto(1)
+            first_ms = (time.perf_counter() - start) * 1000
+            turns = min(args.turns, document.page_count - 1)
+            latencies = []
+            for _ in range(turns):
+                # 模拟阅读时间，预取线程在此期间渲染相邻页
+                time.sleep(args.interval)
+                start = time.perf_counter()
+                document.page_down()
+                latencies.append((time.perf_counter() - start) * 1000)
+            stats = document.stats()
+            label = f"预取 {prefetch} 页" if prefetch else "无预取"
+            print(f"{label}: 首页 {first_ms:.1f} ms，翻页 {turns} 次", end="")
+            if latencies:
+                print(f" p50 {np.percentile(latencies, 50):.2f} ms p95 {np.percentile(latencies, 95):.2f} ms "
+                      f"max {max(latencies):.2f} ms", end="")
+            print(f"；缓存命中 {stats['hits']} 未命中 {stats['misses']}，平均渲染 {stats['render_avg_ms']:.1f} ms")
+        finally:
+            document.close()
+
+
+def bench_preview(args):
+    """视频预览播放：不同观看者数下实际发布帧率与源帧率的对比、丢帧数和预读缓冲的内存占用"""
+    from stream_server import StreamServer, StreamHandler, current_frame_cache
+
+    for viewers in args.viewers:
+        server = StreamServer(preview_read_ahead=args.read_ahead)
+        server._reset_state()
+        if not server.load_video_preview(args.video):
+            return
+        server.set_video_preview_mode(True)
+        stop = threading.Event()
+        seen = [0] * viewers
+
+        def watch(index):
+            # 观看者尽可能快地请求新帧，不影响播放速度
+            last_seq = -1
+            while not stop.is_set():
+                seq, jpeg = current_frame_cache().wait_newer(last_seq, timeout=0.2)
+                if jpeg is not None and seq != last_seq:
+                    last_seq = seq
+                    seen[index] += 1
+
+        threads = [threading.Thread(target=watch, args=(i,), daemon=True) for i in range(viewers)]
+        for thread in threads:
+            thread.start()
+        start_stats = server.preview_stats
+        start = time.perf_counter()
+        max_bytes = 0
+        while time.perf_counter() - start < args.seconds:
+            time.sleep(0.05)
+            max_bytes = max(max_bytes, server.preview_stats['buffered_bytes'])
+        elapsed = time.perf_counter() - start
+        stats = server.preview_stats
+        stop.set()
+        for thread in threads:
+            thread.join()
+        server.stop()
+        StreamHandler.show_video_preview = False
+        published = (stats['published'] - start_stats['published']) / elapsed
+        per_viewer = f"{sum(seen) / viewers / elapsed:.1f}" if viewers else "-"
+        print(f"viewers={viewers}: 源 {stats['fps']:.1f} fps，发布 {published:.1f} fps，每个观看者 {per_viewer} fps，"
+              f"丢帧 {stats['dropped']}，循环 {stats['loops']} 次，预读缓冲最大 {max_bytes / 1e3:.0f} KB")
+
+
+def bench_thumbnails(args):
+    """缩略图索引：首次生成（grab 跳过不需要的帧 / 每帧 read）与之后从缓存读取的耗时"""
+    import tempfile
+
+    import cv2
+
+    from thumbnail_index import ThumbnailIndex
+
+    cache_dir = tempfile.mkdtemp(prefix="thumbnails-")
+    index = ThumbnailIndex(args.video, count=args.count, cache_dir=cache_dir)
+    index.build()
+    index.save()
+    print(f"生成 {len(index.thumbnails)} 张缩略图（grab 跳帧）: {index.build_ms:.0f} ms")
+
+    # 对照：每帧都完整读取（解码 + 颜色转换）
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(args.video)
+    frames = 0
+    while cap.read()[0]:
+        frames += 1
+    cap.release()
+    print(f"逐帧 read 整个视频 ({frames} 帧): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    cached = ThumbnailIndex(args.video, count=args.count, cache_dir=cache_dir)
+    start = time.perf_counter()
+    loaded = cached.load()
+    print(f"从缓存读取: {(time.perf_counter() - start) * 1000:.2f} ms ({'命中' if loaded else '未命中'}, "
+          f"{os.path.getsize(cached.cache_path) / 1e3:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Eye Remote Control 性能基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    viewers_parser = subparsers.add_parser("viewers", help="推流服务端CPU随观看者数量的变化")
+    viewers_parser.add_argument("--viewers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    viewers_parser.add_argument("--duration", type=float, default=5.0, help="每组测试时长（秒）")
+    viewers_parser.add_argument("--fps", type=float, default=30.0, help="发布帧率")
+    viewers_parser.add_argument("--port", type=int, default=8090)
+    viewers_parser.add_argument("--backend", choices=["thread", "asyncio"], default="thread")
+    viewers_parser.set_defaults(func=bench_viewers)
+
+    ear_parser = subparsers.add_parser("ear", help="关键点提取与EAR计算的微基准")
+    ear_parser.add_argument("--iterations", type=int, default=20000)
+    ear_parser.set_defaults(func=bench_ear)
+
+    inference_parser = subparsers.add_parser("inference", help="Face Mesh 推理区域模式对比")
+    inference_parser.add_argument("--source", required=True, help="含人脸的图片或视频文件")
+    inference_parser.add_argument("--frames", type=int, default=200)
+    inference_parser.add_argument("--modes", nargs="+", default=["full", "roi", "downscale"],
+                                  choices=["full", "roi", "downscale"])
+    inference_parser.add_argument("--keyframe-intervals", type=int, nargs="*", default=[],
+                                  help="额外测试的关键帧间隔上限（>1 时启用光流传播）")
+    inference_parser.set_defaults(func=bench_inference)
+
+    process_parser = subparsers.add_parser("detector-process", help="进程内检测与独立检测进程的帧率和界面响应对比")
+    process_parser.add_argument("--source", required=True, help="含人脸的图片或视频文件")
+    process_parser.add_argument("--duration", type=float, default=10.0)
+    process_parser.add_argument("--fps", type=float, default=30.0, help="识别目标帧率")
+    process_parser.add_argument("--viewers", type=int, default=4, help="同时拉流的观看者数量")
+    process_parser.add_argument("--probe-interval", type=float, default=5.0, help="界面线程唤醒间隔（毫秒）")
+    process_parser.add_argument("--port", type=int, default=8091)
+    process_parser.add_argument("--modes", nargs="+", default=["inprocess", "process"],
+                                choices=["inprocess", "process"])
+    process_parser.set_defaults(func=bench_detector_process)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="多实例流水线检测的吞吐量随 K 的变化")
+    pipeline_parser.add_argument("--source", required=True, help="含人脸的图片或视频文件")
+    pipeline_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 3, 4])
+    pipeline_parser.add_argument("--worker-type", choices=["thread", "process"], default="thread")
+    pipeline_parser.add_argument("--duration", type=float, default=5.0)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    backends_parser = subparsers.add_parser("backends", help="检测后端探测（延迟 + 精度检查）")
+    backends_parser.add_argument("--source", required=True, help="含人脸的图片或视频文件")
+    backends_parser.add_argument("--frames", type=int, default=30)
+    backends_parser.add_argument("--landmarker-model", help="face_landmarker.task 路径")
+    backends_parser.add_argument("--haar-dir", help="Haar 级联文件所在目录")
+    backends_parser.add_argument("--save", action="store_true", help="把结果保存为本机的检测后端选择")
+    backends_parser.set_defaults(func=bench_backends)
+
+    record_parser = subparsers.add_parser("record", help="用素材文件代替摄像头录制会话")
+    record_parser.add_argument("--source", required=True, help="含人脸的图片或视频文件")
+    record_parser.add_argument("--output", required=True, help="会话目录")
+    record_parser.add_argument("--frames", type=int, default=300)
+    record_parser.add_argument("--fps", type=float, default=30.0, help="采集时间间隔按此帧率生成")
+    record_parser.add_argument("--mode", choices=["video", "document"], default="video")
+    record_parser.add_argument("--inference-mode", choices=["full", "roi", "downscale"], default="full")
+    record_parser.add_argument("--keyframe-interval", type=int, default=1)
+    record_parser.set_defaults(func=bench_record)
+
+    replay_parser = subparsers.add_parser("replay", help="回放录制的会话并与录制结果逐帧比较")
+    replay_parser.add_argument("--recording", required=True, help="会话目录（main_simple.py --record 或 record 子命令生成）")
+    replay_parser.add_argument("--realtime", action="store_true", help="按录制时的帧间隔回放（默认尽快回放）")
+    replay_parser.add_argument("--inference-mode", choices=["full", "roi", "downscale"],
+                               help="覆盖录制时的推理模式，检查优化是否改变行为")
+    replay_parser.add_argument("--keyframe-interval", type=int, help="覆盖录制时的关键帧间隔")
+    replay_parser.add_argument("--ear-tolerance", type=float, default=1e-6, help="EAR 允许的误差")
+    replay_parser.set_defaults(func=bench_replay)
+
+    stages_parser = subparsers.add_parser("stages", help="热路径逐阶段耗时分位数和内存分配，可与基线比较")
+    stages_parser.add_argument("--source", default=STAGE_SOURCE,
+                               help="含人脸的图片或视频文件 (默认: 仓库中的 benchmark_face.jpg)")
+    stages_parser.add_argument("--recording", help="录制的会话目录（代替 --source）")
+    stages_parser.add_argument("--frames", type=int, default=300)
+    stages_parser.add_argument("--alloc-frames", type=int, default=50,
+                               help="统计内存分配的帧数（单独一遍，0 为不统计）")
+    stages_parser.add_argument("--output", default="benchmark_stages.json", help="结果 JSON 文件")
+    stages_parser.add_argument("--baseline", default=STAGE_BASELINE,
+                               help="基线 JSON 文件，逐阶段比较并标出回归 (默认: benchmark_stages_baseline.json；"
+                                    "空字符串为不比较)")
+    stages_parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线文件")
+    stages_parser.add_argument("--threshold", type=float, default=0.2, help="判定回归的相对增长 (默认: 0.2)")
+    stages_parser.set_defaults(func=bench_stages)
+
+    mpv_parser = subparsers.add_parser("mpv-ipc", help="mpv JSON IPC 控制器的暂停/恢复延迟（需要安装 mpv）")
+    mpv_parser.add_argument("--iterations", type=int, default=200)
+    mpv_parser.add_argument("--video", nargs="+", required=True, help="播放的视频文件（多个时作为播放列表，测试切换）")
+    mpv_parser.set_defaults(func=bench_mpv_ipc)
+
+    preview_parser = subparsers.add_parser("preview", help="视频预览按源帧率播放：不同观看者数下的发布帧率与内存占用")
+    preview_parser.add_argument("--video", required=True)
+    preview_parser.add_argument("--viewers", type=int, nargs="+", default=[0, 1, 3])
+    preview_parser.add_argument("--seconds", type=float, default=5.0)
+    preview_parser.add_argument("--read-ahead", type=int, default=8)
+    preview_parser.set_defaults(func=bench_preview)
+
+    thumbnails_parser = subparsers.add_parser("thumbnails", help="缩略图索引的生成耗时与缓存读取耗时")
+    thumbnails_parser.add_argument("--video", required=True)
+    thumbnails_parser.add_argument("--count", type=int, default=40)
+    thumbnails_parser.set_defaults(func=bench_thumbnails)
+
+    pdf_parser = subparsers.add_parser("pdf", help="内置PDF渲染器翻页延迟（预取/无预取，需要 poppler-utils）")
+    pdf_parser.add_argument("--pdf", default="test.pdf")
+    pdf_parser.add_argument("--turns", type=int, default=20)
+    pdf_parser.add_argument("--interval", type=float, default=0.5, help="两次翻页之间的阅读时间（秒）")
+    pdf_parser.add_argument("--prefetch", type=int, default=2)
+    pdf_parser.set_defaults(func=bench_pdf)
+
+    page_parser = subparsers.add_parser("page-turn", help="XTest 与 xdotool 翻页延迟对比（需要 Xvfb 等 X 显示）")
+    page_parser.add_argument("--display", default=":99", help="测试用的 X 显示 (默认: :99，先运行 Xvfb :99)")
+    page_parser.add_argument("--iterations", type=int, default=200)
+    page_parser.add_argument("--xdotool-iterations", type=int, default=20, help="xdotool 较慢，单独限制次数")
+    page_parser.set_defaults(func=bench_page_turn)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
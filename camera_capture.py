@@ -0,0 +1,110 @@
+import threading
+import time
+
+import cv2
+
+from metrics import STAGE_SECONDS, FRAMES_DROPPED
+from tracing import TRACER, TraceContext
+
+
+class CapturedFrame:
+    """采集到的一帧及其采集信息"""
+
+    def __init__(self, frame, seq, timestamp):
+        self.frame = frame
+        self.seq = seq  # 采集序号，从1开始递增
+        self.timestamp = timestamp  # cap.read() 返回时的时间
+
+
+class LatestFrameCapture:
+    """采集线程：持续读取摄像头，只保留最新一帧，避免 V4L2 队列堆积过期帧"""
+
+    def __init__(self, cap, name="camera-capture"):
+        self.cap = cap
+        self.name = name
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+        self._latest = None  # 最新的 CapturedFrame
+        self._consumed_seq = 0  # 最近一次被取走的帧序号
+        # 统计
+        self.captured_count = 0
+        self.dropped_count = 0  # 未被取走就被新帧覆盖的帧数
+        self.read_failures = 0
+
+        # 驱动侧也只缓存一帧（部分后端不支持，忽略返回值）
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        seq = 0
+        capture_seconds = STAGE_SECONDS.labels("capture")
+        dropped_frames = FRAMES_DROPPED.labels("capture")
+        while self.running:
+            read_start = time.time()
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            capture_seconds.observe(timestamp - read_start)
+            if TRACER.enabled and ret:
+                # 跟踪上下文的 trace_id 即下面分配的采集序号
+                TRACER.add_span("cap.read", TraceContext(seq + 1, timestamp), read_start, timestamp)
+            if not ret:
+                self.read_failures += 1
+                time.sleep(0.1)
+                continue
+            seq += 1
+            with self.cond:
+                if self._latest is not None and self._latest.seq != self._consumed_seq:
+                    self.dropped_count += 1
+                    dropped_frames.inc()
+                self._latest = CapturedFrame(frame, seq, timestamp)
+                self.captured_count += 1
+                self.cond.notify_all()
+
+    def get_latest(self, last_seq=0, timeout=1.0):
+        """等待并返回比 last_seq 更新的最新帧，超时返回 None"""
+        with self.cond:
+            self.cond.wait_for(
+                lambda: not self.running or (self._latest is not None and self._latest.seq > last_seq),
+                timeout=timeout)
+            latest = self._latest
+            if latest is None or latest.seq <= last_seq:
+                return None
+            self._consumed_seq = latest.seq
+            return latest
+
+
+class FramePacer:
+    """按目标帧率的截止时间调度，处理耗时计入帧间隔而不是叠加在固定 sleep 之上"""
+
+    def __init__(self, target_fps=30):
+        self.interval = 1.0 / target_fps if target_fps > 0 else 0
+        self._next_deadline = None
+        self.late_count = 0  # 错过截止时间的次数
+
+    def wait(self):
+        """等到下一个截止时间；已经落后时不补帧，直接从当前时间重新对齐"""
+        now = time.time()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+            self._next_deadline += self.interval
+        else:
+            if delay < -self.interval:
+                self.late_count += 1
+                self._next_deadline = now
+            self._next_deadline += self.interval
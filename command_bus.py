@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+from metrics import STAGE_SECONDS, COMMANDS
+from tracing import TRACER
+
+
+class Command:
+    """总线上的一条命令"""
+
+    def __init__(self, kind, name, arg=None, source="web", on_done=None, trace=None):
+        self.kind = kind  # "video" / "document" / "mode"
+        self.name = name  # 例如 "play", "page_down", "open_pdf", "document"
+        self.arg = arg  # 附加参数，例如 PDF 路径
+        self.source = source  # "web" 或 "detector"
+        self.trace = trace  # 产生该命令的帧的 TraceContext（检测命令）
+        self.enqueue_time = time.time()
+        self.start_time = None
+        self.done_time = None
+        self.ok = None
+        self._callbacks = [on_done] if on_done else []
+
+    @property
+    def key(self):
+        return f"{self.kind}/{self.name}"
+
+    def latency(self):
+        """入队到执行完成的延迟（秒）"""
+        if self.done_time is None:
+            return None
+        return self.done_time - self.enqueue_time
+
+    def __repr__(self):
+        return f"Command({self.key}, arg={self.arg!r}, source={self.source})"
+
+
+class CommandBus:
+    """线程安全的命令总线：命令入队后立即唤醒对应的消费线程，并统计入队到执行的延迟"""
+
+    HISTORY_SIZE = 200  # 每种命令保留的延迟样本数
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self._queue = deque()
+        self.closed = False
+        self._wait_samples = {}  # key -> deque[入队到开始执行的秒数]
+        self._latency_samples = {}  # key -> deque[入队到执行完成的秒数]
+        self._counts = {}  # key -> 执行次数
+
+    def submit(self, kind, name, arg=None, source="web", on_done=None, trace=None):
+        """提交命令，返回 Command；on_done(command) 在执行完成后调用，trace 为产生命令的帧的 TraceContext"""
+        command = Command(kind, name, arg, source, on_done, trace)
+        TRACER.flow('s', trace, command.enqueue_time)
+        with self.cond:
+            self._queue.append(command)
+            self.cond.notify_all()
+        return command
+
+    def get(self, kinds, timeout=None):
+        """取出第一条属于 kinds 的命令，超时或总线关闭时返回 None"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while not self.closed:
+                for command in self._queue:
+                    if command.kind in kinds:
+                        self._queue.remove(command)
+                        command.start_time = time.time()
+                        TRACER.flow('f', command.trace, command.start_time)
+                        return command
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+        return None
+
+    def complete(self, command, ok=True):
+        """消费线程执行完命令后调用，记录延迟并触发回调"""
+        command.done_time = time.time()
+        command.ok = bool(ok)
+        STAGE_SECONDS.labels("command").observe(command.done_time - command.start_time)
+        COMMANDS.labels(command.kind, command.name, command.source, str(command.ok).lower()).inc()
+        TRACER.command_completed(command)
+        with self.cond:
+            key = command.key
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._wait_samples.setdefault(key, deque(maxlen=self.HISTORY_SIZE)).append(
+                command.start_time - command.enqueue_time)
+            self._latency_samples.setdefault(key, deque(maxlen=self.HISTORY_SIZE)).append(
+                command.latency())
+        for callback in command._callbacks:
+            try:
+                callback(command)
+            except Exception as e:
+                print(f"命令回调出错: {e}")
+
+    def pending_count(self):
+        with self.cond:
+            return len(self._queue)
+
+    def latency_stats(self):
+        """每种命令的延迟统计（毫秒）: {key: {count, wait_avg_ms, avg_ms, p95_ms, max_ms}}"""
+        stats = {}
+        with self.cond:
+            for key, samples in self._latency_samples.items():
+                ordered = sorted(samples)
+                waits = self._wait_samples[key]
+                stats[key] = {
+                    'count': self._counts[key],
+                    'wait_avg_ms': sum(waits) / len(waits) * 1000,
+                    'avg_ms': sum(ordered) / len(ordered) * 1000,
+                    'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    'max_ms': ordered[-1] * 1000,
+                }
+        return stats
+
+    def clear(self):
+        """丢弃所有未执行的命令"""
+        with self.cond:
+            self._queue.clear()
+
+    def close(self):
+        """关闭总线，唤醒所有等待中的消费线程"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
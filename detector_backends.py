@@ -0,0 +1,169 @@
+import abc
+import os
+import time
+
+import cv2
+import numpy as np
+
+from face_landmarks import FaceLandmarks, EAR_LANDMARK_ROWS
+
+# 可选的检测后端：
+#   facemesh   - 旧版 mp.solutions.face_mesh（MediaPipeEyeDetector 内置实现，支持 ROI/关键帧光流）
+#   landmarker - MediaPipe Tasks FaceLandmarker，直接使用 eyeBlink 表情系数，不计算EAR
+#   opencv     - 仅依赖 OpenCV 的 Haar 级联检测，作为没有 MediaPipe 时的兜底
+BACKEND_NAMES = ("facemesh", "landmarker", "opencv")
+
+# FaceLandmarker 模型文件（需单独下载 face_landmarker.task）
+DEFAULT_LANDMARKER_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models",
+                                        "face_landmarker.task")
+
+# 非EAR后端输出的“等效EAR”：状态机的阈值按EAR设定，睁眼约0.3，完全闭眼约0
+EQUIVALENT_OPEN_EAR = 0.30
+EQUIVALENT_CLOSED_EAR = 0.10
+
+
+class BackendUnavailable(Exception):
+    """后端依赖（模块、模型文件）缺失"""
+
+
+class EyeDetectorBackend(abc.ABC):
+    """检测后端接口：measure(frame) 返回与 MediaPipeEyeDetector.measure 相同格式的测量结果
+
+    测量结果字典：timestamp, face_found, left_ear, right_ear, eye_center (整数像素坐标或None),
+    inference_mode, inference_pixels, inference_ms。left/right 为画面左侧/右侧的眼睛。
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def measure(self, frame):
+        """测量一帧（BGR），返回测量结果字典"""
+
+    def close(self):
+        pass
+
+    def _measurement(self, frame, start, face_found=False, left_ear=0.0, right_ear=0.0, eye_center=None):
+        return {
+            'timestamp': time.time(),
+            'face_found': face_found,
+            'left_ear': float(left_ear),
+            'right_ear': float(right_ear),
+            'eye_center': eye_center,
+            'inference_mode': self.name,
+            'inference_pixels': frame.shape[0] * frame.shape[1],
+            'inference_ms': (time.perf_counter() - start) * 1000
+        }
+
+
+class FaceLandmarkerBackend(EyeDetectorBackend):
+    """MediaPipe Tasks FaceLandmarker：eyeBlinkLeft/Right 表情系数（0睁眼~1闭眼）直接给出闭眼程度"""
+
+    name = "landmarker"
+
+    def __init__(self, model_path=None):
+        try:
+            import mediapipe as mp
+            from mediapipe.tasks.python import BaseOptions
+            from mediapipe.tasks.python import vision
+        except ImportError as e:
+            raise BackendUnavailable(f"MediaPipe Tasks 不可用: {e}")
+        model_path = model_path or DEFAULT_LANDMARKER_MODEL
+        if not os.path.exists(model_path):
+            raise BackendUnavailable(f"未找到 FaceLandmarker 模型: {model_path}")
+
+        self.mp = mp
+        options = vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.VIDEO,
+            num_faces=1,
+            output_face_blendshapes=True,
+            min_face_detection_confidence=0.5,
+            min_face_presence_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.landmarker = vision.FaceLandmarker.create_from_options(options)
+        self.landmarks = FaceLandmarks()
+        self._last_timestamp_ms = 0
+
+    def measure(self, frame):
+        start = time.perf_counter()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image = self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=rgb_frame)
+        # VIDEO 模式要求时间戳严格递增
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+        result = self.landmarker.detect_for_video(image, timestamp_ms)
+        if not result.face_landmarks or not result.face_blendshapes:
+            return self._measurement(frame, start)
+
+        h, w = frame.shape[:2]
+        self.landmarks.fill(result.face_landmarks[0], w, h, EAR_LANDMARK_ROWS)
+        center = self.landmarks.xy[EAR_LANDMARK_ROWS].mean(axis=0)
+
+        scores = {category.category_name: category.score for category in result.face_blendshapes[0]}
+        # 表情系数以被拍摄者自身为左右：画面左侧的眼睛是其右眼
+        left_ear = EQUIVALENT_OPEN_EAR * (1.0 - scores.get('eyeBlinkRight', 0.0))
+        right_ear = EQUIVALENT_OPEN_EAR * (1.0 - scores.get('eyeBlinkLeft', 0.0))
+        return self._measurement(frame, start, True, left_ear, right_ear,
+                                 (int(center[0]), int(center[1])))
+
+    def close(self):
+        self.landmarker.close()
+
+
+class OpenCVEyeBackend(EyeDetectorBackend):
+    """OpenCV Haar 级联：人脸框内上半部分找到眼睛视为睁眼，找不到视为闭眼
+
+    只能区分睁眼/闭眼，精度明显低于关键点方案，用于没有 MediaPipe 或算力极低的设备。
+    """
+
+    name = "opencv"
+
+    FACE_SCALE = 0.5  # 人脸检测前的缩放比例
+
+    def __init__(self, cascade_dir=None):
+        cascade_dir = cascade_dir or getattr(getattr(cv2, 'data', None), 'haarcascades', '')
+        face_path = os.path.join(cascade_dir, "haarcascade_frontalface_default.xml")
+        eye_path = os.path.join(cascade_dir, "haarcascade_eye.xml")
+        if not (os.path.exists(face_path) and os.path.exists(eye_path)):
+            raise BackendUnavailable(f"未找到 Haar 级联文件: {cascade_dir}")
+        self.face_cascade = cv2.CascadeClassifier(face_path)
+        self.eye_cascade = cv2.CascadeClassifier(eye_path)
+        self.last_eyes = None  # 上一次检测到的两只眼睛中心，闭眼时用于估计眼睛位置
+
+    def measure(self, frame):
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, None, fx=self.FACE_SCALE, fy=self.FACE_SCALE, interpolation=cv2.INTER_AREA)
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=1.2, minNeighbors=5, minSize=(40, 40))
+        if len(faces) == 0:
+            self.last_eyes = None
+            return self._measurement(frame, start)
+
+        # 取最大的人脸，换算回原图坐标
+        x, y, w, h = (np.array(max(faces, key=lambda f: f[2] * f[3])) / self.FACE_SCALE).astype(int)
+        upper = gray[y:y + h // 2, x:x + w]
+        eyes = self.eye_cascade.detectMultiScale(upper, scaleFactor=1.1, minNeighbors=5,
+                                                 minSize=(w // 8, w // 8), maxSize=(w // 3, w // 3))
+        centers = sorted((x + ex + ew / 2, y + ey + eh / 2) for ex, ey, ew, eh in eyes)
+        if len(centers) >= 2:
+            # 取最左和最右的两只
+            self.last_eyes = (centers[0], centers[-1])
+        face_center_eyes = ((x + w * 0.3, y + h * 0.4), (x + w * 0.7, y + h * 0.4))
+        left, right = self.last_eyes or face_center_eyes
+        eye_center = (int((left[0] + right[0]) / 2), int((left[1] + right[1]) / 2))
+
+        left_open = any(cx < x + w / 2 for cx, _ in centers)
+        right_open = any(cx >= x + w / 2 for cx, _ in centers)
+        left_ear = EQUIVALENT_OPEN_EAR if left_open else EQUIVALENT_CLOSED_EAR
+        right_ear = EQUIVALENT_OPEN_EAR if right_open else EQUIVALENT_CLOSED_EAR
+        return self._measurement(frame, start, True, left_ear, right_ear, eye_center)
+
+
+def create_backend(name, **kwargs):
+    """创建非 FaceMesh 后端；依赖缺失时抛出 BackendUnavailable"""
+    if name == "landmarker":
+        return FaceLandmarkerBackend(**kwargs)
+    if name == "opencv":
+        return OpenCVEyeBackend(**kwargs)
+    raise ValueError(f"未知的检测后端: {name}")
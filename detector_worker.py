@@ -0,0 +1,235 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from eye_detector_mediapipe import MediaPipeEyeDetector, empty_measurement
+
+
+class SharedFrameRing:
+    """共享内存中的定长帧环：父进程写入帧，子进程按槽位号直接读取，避免通过管道序列化整帧"""
+
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # spawn 启动的子进程与父进程共用资源跟踪器，由创建方父进程负责回收
+            self.owner = False
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self._next_slot = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame):
+        """把帧写入下一个槽位，返回槽位号"""
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self.frames[slot] = frame
+        return slot
+
+    def close(self):
+        # 先释放 numpy 视图，否则共享内存无法关闭
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _detector_worker_main(conn, ring_name, shape, slots, detector_kwargs):
+    """检测子进程入口：从共享内存读帧，只把检测结果字典发回父进程"""
+    ring = SharedFrameRing(shape, slots, name=ring_name)
+    detector = MediaPipeEyeDetector(**detector_kwargs)
+    conn.send(("ready", None, None))
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            slot, seq, method, timestamp = message
+            # detect_eyes_state: 完整检测；measure: 只做无状态的关键点测量（流水线模式）
+            result = getattr(detector, method)(ring.frames[slot], timestamp)
+            conn.send((seq, result, detector.inference_stats()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.close()
+        ring.close()
+
+
+class ProcessEyeDetector:
+    """在独立进程中运行 MediaPipeEyeDetector，接口与进程内检测器一致
+
+    帧通过共享内存环传给子进程，检测结果通过管道返回；推理不再与 HTTP 编码、界面绘制等线程争抢 GIL。
+    子进程超时未返回结果（卡死）或意外退出时，看门狗会杀掉并重启子进程。
+    """
+
+    RESPONSE_TIMEOUT = 2.0  # 单帧检测超时（秒），超过视为子进程卡死
+    START_TIMEOUT = 30.0  # 子进程启动（加载模型）超时（秒）
+
+    def __init__(self, slots=4, **detector_kwargs):
+        self.slots = slots
+        self.detector_kwargs = detector_kwargs
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.conn = None
+        self.ring = None
+        self.seq = 0
+        self.restart_count = 0
+        self.timeout_count = 0
+        self.closed = False
+        self._stats = {}
+
+    def _start_worker(self, shape):
+        """创建共享内存环并启动子进程，等待模型加载完成"""
+        self.ring = SharedFrameRing(shape, self.slots)
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_detector_worker_main,
+            args=(child_conn, self.ring.name, self.ring.shape, self.slots, self.detector_kwargs),
+            name="eye-detector-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not self.conn.poll(self.START_TIMEOUT):
+            print("检测子进程启动超时")
+            self._stop_worker()
+            return False
+        try:
+            self.conn.recv()
+        except EOFError:
+            print("检测子进程启动失败")
+            self._stop_worker()
+            return False
+        print(f"检测子进程已启动 (pid={self.process.pid})")
+        return True
+
+    def _stop_worker(self, graceful=True):
+        if self.conn is not None:
+            if graceful:
+                try:
+                    self.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+            self.conn.close()
+            self.conn = None
+        if self.process is not None:
+            self.process.join(timeout=1.0 if graceful else 0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def restart(self, reason):
+        """看门狗：杀掉当前子进程并重新启动"""
+        if self.closed:
+            return
+        print(f"检测子进程{reason}，正在重启...")
+        shape = self.ring.shape if self.ring is not None else None
+        self._stop_worker(graceful=False)
+        self.restart_count += 1
+        if shape is not None:
+            self._start_worker(shape)
+
+    def detect_eyes_state(self, frame, timestamp=None):
+        """把帧写入共享内存并等待子进程返回检测结果；超时则重启子进程并返回未检测到人脸"""
+        return self._call("detect_eyes_state", frame, timestamp)
+
+    def measure(self, frame, timestamp=None):
+        """只在子进程中做无状态的关键点测量，见 MediaPipeEyeDetector.measure"""
+        return self._call("measure", frame, timestamp)
+
+    def _call(self, method, frame, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        if self.closed:
+            return self._empty_result(method, 'worker_error', timestamp)
+        if self.ring is not None and self.ring.shape != frame.shape:
+            # 分辨率变化，按新尺寸重建共享内存
+            self._stop_worker()
+        if self.process is None and not self._start_worker(frame.shape):
+            return self._empty_result(method, 'worker_error', timestamp)
+
+        self.seq += 1
+        slot = self.ring.write(frame)
+        try:
+            self.conn.send((slot, self.seq, method, timestamp))
+            deadline = time.time() + self.RESPONSE_TIMEOUT
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    self.timeout_count += 1
+                    self.restart("响应超时")
+                    return self._empty_result(method, 'worker_timeout', timestamp)
+                seq, result, stats = self.conn.recv()
+                # 丢弃之前超时请求迟到的结果
+                if seq == self.seq:
+                    break
+        except (EOFError, OSError):
+            self.restart("意外退出")
+            return self._empty_result(method, 'worker_error', timestamp)
+
+        self._stats = stats
+        return result
+
+    def _empty_result(self, method, error, timestamp):
+        """子进程不可用时的结果：按未检测到人脸处理，error ('worker_error'/'worker_timeout') 记录在 worker_error 中"""
+        inference_mode = self.detector_kwargs.get('inference_mode', 'full')
+        if method == "measure":
+            measurement = empty_measurement(inference_mode)
+            measurement['timestamp'] = timestamp
+            measurement['worker_error'] = error
+            return measurement
+        return {
+            'face_detected': False,
+            'eyes_closed': True,
+            'is_blinking': False,
+            'eye_state': error,
+            'is_gazing': False,
+            'vertical_movement': None,
+            'left_ear': 0,
+            'right_ear': 0,
+            'avg_ear': 0,
+            'eye_center': None,
+            'fps': 0,
+            'inference_mode': inference_mode,
+            'inference_pixels': 0,
+            'inference_ms': 0.0,
+            'keyframe': True,
+            'timestamp': timestamp,
+            'worker_error': error
+        }
+
+    def inference_stats(self):
+        """子进程最近一次返回的推理统计，附带重启次数"""
+        stats = dict(self._stats) if self._stats else {
+            'pixels': 0, 'inference_ms': 0.0, 'roi_fallbacks': 0,
+            'keyframes': 0, 'tracked': 0, 'keyframe_interval': 1}
+        stats['worker_restarts'] = self.restart_count
+        return stats
+
+    # 绘制只依赖检测结果，直接复用进程内检测器的实现
+    draw_landmarks = MediaPipeEyeDetector.draw_landmarks
+
+    def close(self):
+        self.closed = True
+        self._stop_worker()
@@ -2,28 +2,116 @@ import cv2
 import numpy as np
 from collections import deque
 import time
-import mediapipe as mp
+try:
+    import mediapipe as mp
+except ImportError:
+    # 没有 MediaPipe 时仍可使用 OpenCV 后端
+    mp = None
+from detector_backends import BACKEND_NAMES, create_backend
+from face_landmarks import (FaceLandmarks, LEFT_EYE_EAR_INDICES, RIGHT_EYE_EAR_INDICES,
+                            EAR_LANDMARK_ROWS, TRACKING_LANDMARK_ROWS, FACE_EXTENT_INDICES,
+                            eye_aspect_ratios)
+
+# 推理模式：整帧 / 只在上一帧人脸附近的裁剪区域推理 / 缩小整帧后推理
+INFERENCE_MODES = ("full", "roi", "downscale")
+
+def empty_measurement(inference_mode="full"):
+    """未检测到人脸时的测量结果"""
+    return {
+        'timestamp': time.time(),
+        'face_found': False,
+        'left_ear': 0.0,
+        'right_ear': 0.0,
+        'eye_center': None,
+        'inference_mode': inference_mode,
+        'inference_pixels': 0,
+        'inference_ms': 0.0
+    }
 
 class MediaPipeEyeDetector:
-    def __init__(self):
-        # 初始化 MediaPipe Face Mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )        
-        
-        # MediaPipe 绘图工具
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
+    def __init__(self, inference_mode="full", roi_padding=0.5, downscale_width=320, keyframe_interval=1,
+                 backend="facemesh", backend_options=None):
+        # 检测后端：facemesh 为内置实现，其余后端见 detector_backends（只替换测量部分，状态机共用）
+        if backend not in BACKEND_NAMES:
+            raise ValueError(f"未知的检测后端: {backend}")
+        self.backend_name = backend
+        self.backend = None
+        self.face_mesh = None
+        if backend == "facemesh":
+            if mp is None:
+                raise ImportError("未安装 mediapipe，无法使用 facemesh 后端")
+            # 初始化 MediaPipe Face Mesh
+            self.mp_face_mesh = mp.solutions.face_mesh
+            self.face_mesh = self.mp_face_mesh.FaceMesh(
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )        
+            
+            # MediaPipe 绘图工具
+            self.mp_drawing = mp.solutions.drawing_utils
+            self.mp_drawing_styles = mp.solutions.drawing_styles
+        else:
+            # ROI、关键帧光流只对 facemesh 有效
+            self.backend = create_backend(backend, **(backend_options or {}))
+            inference_mode = "full"
+            keyframe_interval = 1
         
         # 标准EAR计算使用的6个关键点索引
         # 左眼：上眼皮(159, 145)，下眼皮(158, 153)，眼角(33, 133)
-        self.LEFT_EYE_INDICES = [33, 159, 158, 133, 153, 145]  # 顺序：p1, p2, p3, p4, p5, p6
+        self.LEFT_EYE_INDICES = LEFT_EYE_EAR_INDICES  # 顺序：p1, p2, p3, p4, p5, p6
         # 右眼：上眼皮(386, 374)，下眼皮(385, 380)，眼角(362, 263)
-        self.RIGHT_EYE_INDICES = [362, 386, 385, 263, 380, 374]  # 顺序：p1, p2, p3, p4, p5, p6
+        self.RIGHT_EYE_INDICES = RIGHT_EYE_EAR_INDICES  # 顺序：p1, p2, p3, p4, p5, p6
+        
+        # 预分配的关键点容器，每帧只填充一次
+        self.landmarks = FaceLandmarks()
+        
+        # 推理区域配置
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"未知的推理模式: {inference_mode}")
+        self.inference_mode = inference_mode
+        self.ROI_PADDING = roi_padding  # 人脸外接框向外扩展的比例（相对人脸框长边）
+        self.ROI_MIN_SIZE = 128  # 裁剪区域最小边长（像素）
+        self.DOWNSCALE_WIDTH = downscale_width  # 缩小推理时的图像宽度
+        self.roi = None  # 当前裁剪区域 (x0, y0, x1, y1)，None 表示整帧推理
+        # Face Mesh 会用上一帧的关键点在归一化坐标下跟踪人脸，整帧和裁剪图像的坐标系不同，
+        # 因此裁剪区域使用独立的实例，避免两种输入交替时跟踪互相失效
+        self.roi_face_mesh = None
+        if inference_mode == "roi" and self.face_mesh is not None:
+            self.roi_face_mesh = self.mp_face_mesh.FaceMesh(
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+        
+        # 推理统计（最近30帧）
+        self.inference_pixels_history = deque(maxlen=30)
+        self.inference_time_history = deque(maxlen=30)
+        self.roi_fallback_count = 0  # 裁剪区域丢失人脸、回退整帧的次数
+        
+        # 关键帧 + 光流传播：每隔若干帧运行一次 Face Mesh，中间帧用光流跟踪12个EAR关键点
+        # keyframe_interval 为关键帧间隔上限，1 表示每帧都运行 Face Mesh
+        self.MAX_KEYFRAME_INTERVAL = max(1, keyframe_interval)
+        self.keyframe_interval = self.MAX_KEYFRAME_INTERVAL  # 当前间隔，随漂移和运动自适应
+        self.FLOW_WIN_SIZE = (15, 15)  # 光流窗口
+        self.FLOW_MAX_LEVEL = 2  # 金字塔层数
+        self.FLOW_REGION_PADDING = 0.6  # 光流区域相对眼部外接框宽度的扩展比例
+        self.FLOW_FB_ERROR_THRESHOLD = 1.0  # 前后向光流误差阈值（像素），超过视为跟踪失败
+        self.DRIFT_HIGH = 0.06  # 关键帧处光流结果与 Face Mesh 的偏差（相对眼宽），超过则缩短间隔
+        self.DRIFT_LOW = 0.02  # 偏差低于此值时延长间隔
+        self.MOTION_THRESHOLD = 0.15  # 单帧运动量（相对眼宽），超过则下一帧强制关键帧
+        self.EAR_KEYFRAME_DELTA = 0.04  # 传播的EAR偏离关键帧EAR超过此值时下一帧强制关键帧
+        self.flow_region = None  # 光流区域 (x0, y0, x1, y1)
+        self.flow_gray = None  # 上一帧光流区域的灰度图
+        self.flow_points = None  # 上一帧的12个EAR关键点 (12, 2)
+        self.frames_since_keyframe = 0
+        self.keyframe_ear = 0.0  # 最近一个关键帧的平均EAR
+        self.force_keyframe = False
+        self.keyframe_count = 0
+        self.tracked_count = 0
+        self.flow_failure_count = 0  # 光流跟踪失败、改用 Face Mesh 的次数
         
         # 配置参数
         self.GAZING_STABILITY_THRESHOLD = 25  # 注视稳定性阈值
@@ -55,27 +143,12 @@ class MediaPipeEyeDetector:
         self.start_time = time.time()
         self.fps = 0
     
-        print("使用 MediaPipe 眼睛检测器（改进版）")
+        print(f"使用 MediaPipe 眼睛检测器（改进版，后端: {backend}）")
     
     def calculate_ear(self, eye_landmarks):
-        """使用标准6点法计算眼睛纵横比 (Eye Aspect Ratio)"""
+        """使用标准6点法计算单只眼睛的眼睛纵横比 (Eye Aspect Ratio)"""
         # 标准EAR计算公式: EAR = (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||)
-        p1, p2, p3, p4, p5, p6 = eye_landmarks
-        
-        # 计算垂直距离1（上眼皮到下眼皮）
-        A = np.linalg.norm(p2 - p6)
-        # 计算垂直距离2（上眼皮到下眼皮）
-        B = np.linalg.norm(p3 - p5)
-        # 计算水平距离（眼角到眼角）
-        C = np.linalg.norm(p1 - p4)
-        
-        # 避免除以0
-        if C == 0:
-            return 0.0
-        
-        # 计算EAR
-        ear = (A + B) / (2.0 * C)
-        return ear
+        return float(eye_aspect_ratios(np.asarray(eye_landmarks)[np.newaxis])[0])
     
     def update_eye_state(self, avg_ear):
         """更新眼睛状态机"""
@@ -127,11 +200,233 @@ class MediaPipeEyeDetector:
                 
         return self.eye_state
     
-    def detect_eyes_state(self, frame):
-        """使用 MediaPipe 检测眼睛状态"""
-        # 转换颜色空间
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def _process(self, image, face_mesh=None):
+        """转换颜色空间并运行 Face Mesh，返回 (第一个人脸的关键点或None, 像素数)"""
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        results = (face_mesh or self.face_mesh).process(rgb_image)
+        pixels = image.shape[0] * image.shape[1]
+        if not results.multi_face_landmarks:
+            return None, pixels
+        return results.multi_face_landmarks[0], pixels
+    
+    def _run_inference(self, frame):
+        """按推理模式运行 Face Mesh
+        
+        返回 (关键点或None, 推理图像在整帧中的区域 (x0, y0, w, h), 实际推理模式, 推理像素数)
+        """
+        h, w = frame.shape[:2]
         
+        if self.inference_mode == "downscale" and w > self.DOWNSCALE_WIDTH:
+            # 归一化坐标与缩放无关，直接按整帧尺寸换算
+            scale = self.DOWNSCALE_WIDTH / w
+            small = cv2.resize(frame, (self.DOWNSCALE_WIDTH, int(round(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            face_landmarks, pixels = self._process(small)
+            return face_landmarks, (0, 0, w, h), "downscale", pixels
+        
+        if self.inference_mode == "roi" and self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            face_landmarks, pixels = self._process(frame[y0:y1, x0:x1], self.roi_face_mesh)
+            if face_landmarks is not None:
+                return face_landmarks, (x0, y0, x1 - x0, y1 - y0), "roi", pixels
+            # 跟踪丢失：同一帧回退到整帧检测
+            self.roi = None
+            self.roi_fallback_count += 1
+            face_landmarks, full_pixels = self._process(frame)
+            return face_landmarks, (0, 0, w, h), "full", pixels + full_pixels
+        
+        face_landmarks, pixels = self._process(frame)
+        return face_landmarks, (0, 0, w, h), "full", pixels
+    
+    def _update_roi(self, frame_shape):
+        """根据当前关键点更新裁剪区域；人脸仍在当前区域内部时保持不变，减少推理图像的跳动"""
+        h, w = frame_shape[:2]
+        fx0, fy0, fx1, fy1 = self.landmarks.bounding_box(FACE_EXTENT_INDICES)
+        size = max(fx1 - fx0, fy1 - fy0)
+        pad = size * self.ROI_PADDING
+        
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            margin = pad / 2
+            roi_size = max(x1 - x0, y1 - y0)
+            # 人脸离边缘还有余量，且尺寸变化不大时沿用当前区域
+            if (fx0 - x0 >= margin or x0 == 0) and (x1 - fx1 >= margin or x1 == w) and \
+               (fy0 - y0 >= margin or y0 == 0) and (y1 - fy1 >= margin or y1 == h) and \
+               size + 2 * pad <= roi_size * 1.25:
+                return
+        
+        half = max(size / 2 + pad, self.ROI_MIN_SIZE / 2)
+        cx, cy = (fx0 + fx1) / 2, (fy0 + fy1) / 2
+        x0, y0 = max(0, int(cx - half)), max(0, int(cy - half))
+        x1, y1 = min(w, int(cx + half)), min(h, int(cy + half))
+        if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) >= w * h * 0.8:
+            # 人脸很大或跑出画面，裁剪没有收益
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x1, y1)
+    
+    def _locate_eye_landmarks(self, frame):
+        """把当前帧的EAR关键点填入 self.landmarks（整帧像素坐标）
+        
+        关键帧运行 Face Mesh；非关键帧用光流从上一帧传播。返回 (是否找到人脸, 推理模式, 像素数)
+        """
+        tracked = None
+        if self.MAX_KEYFRAME_INTERVAL > 1 and self.flow_points is not None:
+            tracked = self._propagate_eye_points(frame)
+        
+        if (tracked is not None and not self.force_keyframe and
+                self.frames_since_keyframe + 1 < self.keyframe_interval):
+            # 非关键帧：直接使用光流结果
+            self.landmarks.xy[EAR_LANDMARK_ROWS] = tracked
+            self.flow_points = tracked
+            self.frames_since_keyframe += 1
+            self.tracked_count += 1
+            x0, y0, x1, y1 = self.flow_region
+            return True, "flow", (x1 - x0) * (y1 - y0)
+        
+        # 关键帧：运行 Face Mesh
+        face_landmarks, region, inference_mode, pixels = self._run_inference(frame)
+        self.keyframe_count += 1
+        self.frames_since_keyframe = 0
+        self.force_keyframe = False
+        if face_landmarks is None:
+            self.flow_points = None
+            return False, inference_mode, pixels
+        
+        # 提取眼部关键点坐标（浮点像素坐标，保留亚像素精度），映射回整帧坐标
+        x0, y0, region_w, region_h = region
+        if self.inference_mode == "roi":
+            self.landmarks.fill(face_landmarks, region_w, region_h, TRACKING_LANDMARK_ROWS, (x0, y0))
+            self._update_roi(frame.shape)
+        else:
+            self.landmarks.fill(face_landmarks, region_w, region_h, EAR_LANDMARK_ROWS)
+        
+        if self.MAX_KEYFRAME_INTERVAL > 1:
+            points = self.landmarks.xy[EAR_LANDMARK_ROWS]
+            if tracked is not None:
+                self._adapt_keyframe_interval(tracked, points)
+            self._set_flow_reference(frame, points)
+        return True, inference_mode, pixels
+    
+    def _eye_width(self, points):
+        """双眼眼角距离（p1-p4）的平均值，作为漂移和运动量的尺度"""
+        eyes = points.reshape(2, 6, 2)
+        return float(np.mean(np.hypot(*(eyes[:, 0] - eyes[:, 3]).T))) or 1.0
+    
+    def _set_flow_reference(self, frame, points):
+        """以关键帧的关键点为起点，重新确定光流区域并保存其灰度图"""
+        h, w = frame.shape[:2]
+        pad = self._eye_width(points) * self.FLOW_REGION_PADDING
+        x0, y0 = points.min(axis=0) - pad
+        x1, y1 = points.max(axis=0) + pad
+        self.flow_region = (max(0, int(x0)), max(0, int(y0)), min(w, int(x1) + 1), min(h, int(y1) + 1))
+        rx0, ry0, rx1, ry1 = self.flow_region
+        self.flow_gray = cv2.cvtColor(frame[ry0:ry1, rx0:rx1], cv2.COLOR_BGR2GRAY)
+        self.flow_points = points.copy()
+    
+    def _propagate_eye_points(self, frame):
+        """在灰度眼部区域上用金字塔 Lucas-Kanade 光流传播关键点，跟踪失败返回 None"""
+        rx0, ry0, rx1, ry1 = self.flow_region
+        gray = cv2.cvtColor(frame[ry0:ry1, rx0:rx1], cv2.COLOR_BGR2GRAY)
+        offset = np.array([rx0, ry0], dtype=np.float32)
+        previous = (self.flow_points - offset).reshape(-1, 1, 2)
+        
+        flow_params = dict(winSize=self.FLOW_WIN_SIZE, maxLevel=self.FLOW_MAX_LEVEL)
+        current, status, _ = cv2.calcOpticalFlowPyrLK(self.flow_gray, gray, previous, None, **flow_params)
+        # 反向光流检查：从当前位置跟踪回上一帧，偏差大说明跟踪不可靠
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.flow_gray, current, None, **flow_params)
+        self.flow_gray = gray
+        
+        fb_error = np.hypot(*(back - previous).reshape(-1, 2).T)
+        current = current.reshape(-1, 2)
+        region_h, region_w = gray.shape
+        if (not status.all() or not back_status.all() or
+                fb_error.max() > self.FLOW_FB_ERROR_THRESHOLD or
+                current.min() < 0 or (current[:, 0] >= region_w).any() or (current[:, 1] >= region_h).any()):
+            self.flow_failure_count += 1
+            return None
+        
+        tracked = current + offset
+        # 运动较大时尽快用 Face Mesh 校正
+        motion = float(np.median(np.hypot(*(tracked - self.flow_points).T)))
+        if motion > self.MOTION_THRESHOLD * self._eye_width(tracked):
+            self.force_keyframe = True
+        return tracked
+    
+    def _adapt_keyframe_interval(self, tracked, points):
+        """根据关键帧处光流结果与 Face Mesh 的偏差调整关键帧间隔"""
+        drift = float(np.mean(np.hypot(*(tracked - points).T))) / self._eye_width(points)
+        if drift > self.DRIFT_HIGH:
+            self.keyframe_interval = max(1, self.keyframe_interval // 2)
+        elif drift < self.DRIFT_LOW:
+            self.keyframe_interval = min(self.MAX_KEYFRAME_INTERVAL, self.keyframe_interval + 1)
+    
+    def inference_stats(self):
+        """最近若干帧的平均推理像素数和推理耗时（毫秒）"""
+        if not self.inference_time_history:
+            return {'pixels': 0, 'inference_ms': 0.0, 'roi_fallbacks': self.roi_fallback_count,
+                    'keyframes': self.keyframe_count, 'tracked': self.tracked_count,
+                    'keyframe_interval': self.keyframe_interval}
+        return {
+            'pixels': sum(self.inference_pixels_history) / len(self.inference_pixels_history),
+            'inference_ms': sum(self.inference_time_history) / len(self.inference_time_history),
+            'roi_fallbacks': self.roi_fallback_count,
+            'keyframes': self.keyframe_count,
+            'tracked': self.tracked_count,
+            'keyframe_interval': self.keyframe_interval,
+        }
+    
+    def measure(self, frame, timestamp=None):
+        """检测的无状态部分：定位眼部关键点，计算双眼EAR和中心
+        
+        返回紧凑的测量结果字典，交给 update() 更新状态机；流水线模式下多个实例并行调用本方法。
+        timestamp 为帧的采集时间，状态机的时间窗口都以它为准（回放录制的会话时结果可复现）；
+        不传时使用当前时间。
+        """
+        if self.backend is not None:
+            measurement = self.backend.measure(frame)
+            if timestamp is not None:
+                measurement['timestamp'] = timestamp
+            self.inference_pixels_history.append(measurement['inference_pixels'])
+            self.inference_time_history.append(measurement['inference_ms'])
+            return measurement
+        
+        # 处理帧（Face Mesh 或光流传播，计入推理耗时）
+        inference_start = time.perf_counter()
+        face_found, inference_mode, pixels = self._locate_eye_landmarks(frame)
+        inference_ms = (time.perf_counter() - inference_start) * 1000
+        self.inference_pixels_history.append(pixels)
+        self.inference_time_history.append(inference_ms)
+        
+        measurement = empty_measurement(inference_mode)
+        if timestamp is not None:
+            measurement['timestamp'] = timestamp
+        measurement['inference_pixels'] = pixels
+        measurement['inference_ms'] = inference_ms
+        if not face_found:
+            return measurement
+        
+        # 同时计算双眼的眼睛纵横比和双眼中心
+        ears, center = self.landmarks.eye_metrics()
+        measurement['face_found'] = True
+        measurement['left_ear'] = float(ears[0])
+        measurement['right_ear'] = float(ears[1])
+        measurement['eye_center'] = (int(center[0]), int(center[1]))
+        
+        if self.MAX_KEYFRAME_INTERVAL > 1:
+            avg_ear = (measurement['left_ear'] + measurement['right_ear']) / 2.0
+            if inference_mode != "flow":
+                self.keyframe_ear = avg_ear
+            elif abs(avg_ear - self.keyframe_ear) > self.EAR_KEYFRAME_DELTA:
+                # 可能正在眨眼：光流难以跟住眼皮的快速闭合，下一帧改用 Face Mesh
+                self.force_keyframe = True
+        return measurement
+    
+    def update(self, measurement):
+        """检测的有状态部分：用一帧的测量结果更新眼睛状态机和历史记录，返回检测结果
+        
+        必须按采集顺序逐帧调用。
+        """
         # 计算FPS
         self.frame_count += 1
         if self.frame_count % 10 == 0:
@@ -140,6 +435,7 @@ class MediaPipeEyeDetector:
             self.start_time = time.time()
             self.frame_count = 0
         
+        inference_mode = measurement['inference_mode']
         detection_result = {
             'face_detected': False,
             'eyes_closed': False,
@@ -151,15 +447,17 @@ class MediaPipeEyeDetector:
             'right_ear': 0,
             'avg_ear': 0,
             'eye_center': None,
-            'fps': self.fps
+            'fps': self.fps,
+            'inference_mode': inference_mode,
+            'inference_pixels': measurement['inference_pixels'],
+            'inference_ms': measurement['inference_ms'],
+            'keyframe': inference_mode != "flow",
+            'timestamp': measurement['timestamp']
         }
         
-        # 处理帧
-        results = self.face_mesh.process(rgb_frame)
-        
-        if not results.multi_face_landmarks:
+        if not measurement['face_found']:
             # 如果没有检测到人脸，重置状态
-            current_time = time.time()
+            current_time = measurement['timestamp']
             if current_time - self.last_vertical_action_time > self.VERTICAL_MOVEMENT_RESET_TIME:
                 self.last_vertical_action_time = 0
             
@@ -174,29 +472,8 @@ class MediaPipeEyeDetector:
         
         detection_result['face_detected'] = True
         
-        # 获取第一个人脸的关键点
-        face_landmarks = results.multi_face_landmarks[0]
-        
-        # 提取眼部关键点坐标
-        h, w = frame.shape[:2]
-        left_eye_points = []
-        right_eye_points = []
-        
-        # 左眼关键点（按标准6点顺序）
-        for idx in self.LEFT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            left_eye_points.append(np.array([x, y]))
-        
-        # 右眼关键点（按标准6点顺序）
-        for idx in self.RIGHT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            right_eye_points.append(np.array([x, y]))
-        
-        # 计算眼睛纵横比
-        left_ear = self.calculate_ear(left_eye_points)
-        right_ear = self.calculate_ear(right_eye_points)
+        left_ear = measurement['left_ear']
+        right_ear = measurement['right_ear']
         avg_ear = (left_ear + right_ear) / 2.0
         
         detection_result['left_ear'] = left_ear
@@ -211,6 +488,10 @@ class MediaPipeEyeDetector:
         eye_state = self.update_eye_state(avg_ear)
         detection_result['eye_state'] = eye_state
         
+        if inference_mode == "flow" and eye_state != "open":
+            # 眨眼过程中每帧都用 Face Mesh
+            self.force_keyframe = True
+        
         # 根据状态确定眼睛是否闭合
         if eye_state == "closed":
             detection_result['eyes_closed'] = True
@@ -236,14 +517,12 @@ class MediaPipeEyeDetector:
         # 记录眼睛状态历史
         self.eyes_state_history.append(eye_state)
         
-        # 计算眼睛中心位置
-        left_eye_center = np.mean(left_eye_points, axis=0)
-        right_eye_center = np.mean(right_eye_points, axis=0)
-        eye_center = ((left_eye_center + right_eye_center) / 2).astype(int)
-        detection_result['eye_center'] = (int(eye_center[0]), int(eye_center[1]))
+        # 眼睛中心位置
+        eye_center = measurement['eye_center']
+        detection_result['eye_center'] = eye_center
         
-        # 记录人脸中心位置和时间
-        self.face_position_history.append((tuple(eye_center), time.time()))
+        # 记录人脸中心位置和测量时间
+        self.face_position_history.append((eye_center, measurement['timestamp']))
         
         # 检测注视状态（基于位置稳定性）
         if len(self.face_position_history) >= 5:
@@ -255,13 +534,16 @@ class MediaPipeEyeDetector:
             detection_result['is_gazing'] = total_variance < self.GAZING_STABILITY_THRESHOLD
         
         # 检测垂直移动
-        detection_result['vertical_movement'] = self._detect_vertical_movement()
+        detection_result['vertical_movement'] = self._detect_vertical_movement(measurement['timestamp'])
         
         return detection_result
     
-    def _detect_vertical_movement(self):
-        """检测垂直方向的移动"""
-        current_time = time.time()
+    def detect_eyes_state(self, frame, timestamp=None):
+        """使用 MediaPipe 检测眼睛状态，timestamp 见 measure()"""
+        return self.update(self.measure(frame, timestamp))
+    
+    def _detect_vertical_movement(self, current_time):
+        """检测垂直方向的移动（current_time 为当前帧的时间）"""
         
         # 如果历史数据不足，返回None
         if len(self.face_position_history) < 8:
@@ -309,6 +591,15 @@ class MediaPipeEyeDetector:
         
         return None
     
+    def close(self):
+        """释放 Face Mesh 或检测后端的资源"""
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+        if self.roi_face_mesh is not None:
+            self.roi_face_mesh.close()
+        if self.backend is not None:
+            self.backend.close()
+    
     def draw_landmarks(self, frame, detection_result):
         """在帧上绘制关键点和信息"""
         if detection_result['eye_center']:
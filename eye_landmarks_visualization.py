@@ -6,6 +6,8 @@ import numpy as np
 import time
 import mediapipe as mp
 from eye_detector_mediapipe import MediaPipeEyeDetector
+from face_landmarks import (FaceLandmarks, LEFT_EYE_OUTLINE_INDICES, RIGHT_EYE_OUTLINE_INDICES,
+                            OUTLINE_LANDMARK_ROWS, eye_aspect_ratios)
 
 class EyeLandmarksVisualizer:
     def __init__(self):
@@ -19,8 +21,11 @@ class EyeLandmarksVisualizer:
         )
         
         # 使用与MediaPipeEyeDetector相同的索引
-        self.LEFT_EYE_INDICES = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
-        self.RIGHT_EYE_INDICES = [263, 249, 390, 373, 374, 380, 381, 382, 362, 398, 384, 385, 386, 387, 388, 466]
+        self.LEFT_EYE_INDICES = LEFT_EYE_OUTLINE_INDICES
+        self.RIGHT_EYE_INDICES = RIGHT_EYE_OUTLINE_INDICES
+        
+        # 预分配的关键点容器，每帧只填充轮廓用到的32个点
+        self.landmarks = FaceLandmarks()
         
         # EAR计算中使用的点对
         self.LEFT_EAR_POINTS = [1, 5, 2, 4, 0, 3]  # 对应 indices 中的索引
@@ -39,19 +44,9 @@ class EyeLandmarksVisualizer:
         face_landmarks = results.multi_face_landmarks[0]
         h, w = frame.shape[:2]
         
-        # 处理左眼
-        left_eye_points = []
-        for idx in self.LEFT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            left_eye_points.append(np.array([x, y]))
-            
-        # 处理右眼
-        right_eye_points = []
-        for idx in self.RIGHT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            right_eye_points.append(np.array([x, y]))
+        # 一次性提取双眼轮廓点 (2, 16, 2)，绘制时再取整
+        outline = self._extract_outline(face_landmarks, w, h)
+        left_eye_points, right_eye_points = outline.round().astype(np.int32)
             
         # 绘制眼部轮廓
         self._draw_eye_outline(frame, left_eye_points, (0, 255, 0))
@@ -61,9 +56,8 @@ class EyeLandmarksVisualizer:
         self._visualize_ear_points(frame, left_eye_points, (0, 0, 255), "Left")
         self._visualize_ear_points(frame, right_eye_points, (255, 0, 0), "Right")
         
-        # 计算并显示EAR值
-        left_ear = self._calculate_ear(left_eye_points)
-        right_ear = self._calculate_ear(right_eye_points)
+        # 计算并显示EAR值（浮点坐标，双眼一次计算）
+        left_ear, right_ear = self._calculate_ears(outline)
         
         # 显示EAR值
         cv2.putText(frame, f"Left EAR: {left_ear:.3f}", (10, 30),
@@ -84,6 +78,11 @@ class EyeLandmarksVisualizer:
         
         return frame
 
+    def _extract_outline(self, face_landmarks, w, h):
+        """填充关键点容器并返回双眼轮廓点 (2, 16, 2)"""
+        self.landmarks.fill(face_landmarks, w, h, OUTLINE_LANDMARK_ROWS)
+        return self.landmarks.eye_outline_points()
+
     def _draw_eye_outline(self, frame, eye_points, color):
         """绘制眼部轮廓"""
         points = np.array(eye_points, np.int32)
@@ -91,7 +90,7 @@ class EyeLandmarksVisualizer:
         
         # 绘制关键点
         for point in eye_points:
-            cv2.circle(frame, tuple(point), 2, color, -1)
+            cv2.circle(frame, (int(point[0]), int(point[1])), 2, color, -1)
 
     def _visualize_ear_points(self, frame, eye_points, color, eye_name):
         """可视化用于EAR计算的关键点"""
@@ -100,12 +99,12 @@ class EyeLandmarksVisualizer:
         # B = 垂直距离2 (点2到点4)  
         # C = 水平距离 (点0到点3)
         
-        pt1 = tuple(eye_points[1])  # A的第一点
-        pt5 = tuple(eye_points[5])  # A的第二点
-        pt2 = tuple(eye_points[2])  # B的第一点
-        pt4 = tuple(eye_points[4])  # B的第二点
-        pt0 = tuple(eye_points[0])  # C的第一点
-        pt3 = tuple(eye_points[3])  # C的第二点
+        pt1 = tuple(map(int, eye_points[1]))  # A的第一点
+        pt5 = tuple(map(int, eye_points[5]))  # A的第二点
+        pt2 = tuple(map(int, eye_points[2]))  # B的第一点
+        pt4 = tuple(map(int, eye_points[4]))  # B的第二点
+        pt0 = tuple(map(int, eye_points[0]))  # C的第一点
+        pt3 = tuple(map(int, eye_points[3]))  # C的第二点
         
         # 绘制垂直距离线
         cv2.line(frame, pt1, pt5, color, 2)
@@ -116,29 +115,19 @@ class EyeLandmarksVisualizer:
         
         # 标记点索引
         for i, idx in enumerate([0, 1, 2, 3, 4, 5]):
-            point = tuple(eye_points[idx])
+            point = tuple(map(int, eye_points[idx]))
             cv2.circle(frame, point, 4, (255, 255, 255), -1)
-            cv2.putText(frame, str(idx), (point[0]+5, point[1]+5),
+            cv2.putText(frame, str(idx), (int(point[0])+5, int(point[1])+5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
 
-    def _calculate_ear(self, eye_landmarks):
-        """计算眼睛纵横比 (Eye Aspect Ratio)"""
+    def _calculate_ears(self, outline):
+        """同时计算双眼的眼睛纵横比 (Eye Aspect Ratio)"""
         # 根据图片中的坐标点定义
         # P1: 左上角，P2: 右上角，P3: 右下角，P4: 左下角，P5: 左侧中间，P6: 右侧中间
         # 使用图片中的点索引：P1=0, P2=1, P3=2, P4=3, P5=4, P6=5
-        
-        # 计算眼部关键点之间的距离
-        # 垂直距离
-        A = np.linalg.norm(eye_landmarks[1] - eye_landmarks[5])  # P2到P6
-        B = np.linalg.norm(eye_landmarks[2] - eye_landmarks[4])  # P3到P5
-        # 水平距离
-        C = np.linalg.norm(eye_landmarks[0] - eye_landmarks[3])  # P1到P4
-        
-        # 计算 EAR
-        if C == 0:
-            return 0
-        ear = (A + B) / (2.0 * C)
-        return ear
+        # 垂直距离 P2到P6、P3到P5；水平距离 P1到P4
+        left_ear, right_ear = eye_aspect_ratios(outline[:, :6])
+        return float(left_ear), float(right_ear)
 
     def visualize_eye_model(self, frame):
         """可视化完整的眼部模型，包括所有关键点"""
@@ -151,19 +140,9 @@ class EyeLandmarksVisualizer:
         face_landmarks = results.multi_face_landmarks[0]
         h, w = frame.shape[:2]
         
-        # 处理左眼
-        left_eye_points = []
-        for idx in self.LEFT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            left_eye_points.append(np.array([x, y]))
-            
-        # 处理右眼
-        right_eye_points = []
-        for idx in self.RIGHT_EYE_INDICES:
-            landmark = face_landmarks.landmark[idx]
-            x, y = int(landmark.x * w), int(landmark.y * h)
-            right_eye_points.append(np.array([x, y]))
+        # 一次性提取双眼轮廓点 (2, 16, 2)，绘制时再取整
+        outline = self._extract_outline(face_landmarks, w, h)
+        left_eye_points, right_eye_points = outline.round().astype(np.int32)
         
         # 绘制完整眼部轮廓
         self._draw_eye_outline(frame, left_eye_points, (0, 255, 0))
@@ -171,13 +150,13 @@ class EyeLandmarksVisualizer:
         
         # 标注所有关键点索引
         for i, point in enumerate(left_eye_points):
-            cv2.circle(frame, tuple(point), 3, (0, 255, 255), -1)
-            cv2.putText(frame, str(self.LEFT_EYE_INDICES[i]), (point[0]+5, point[1]+5),
+            cv2.circle(frame, (int(point[0]), int(point[1])), 3, (0, 255, 255), -1)
+            cv2.putText(frame, str(self.LEFT_EYE_INDICES[i]), (int(point[0])+5, int(point[1])+5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.3, (255, 255, 255), 1)
             
         for i, point in enumerate(right_eye_points):
-            cv2.circle(frame, tuple(point), 3, (0, 255, 255), -1)
-            cv2.putText(frame, str(self.RIGHT_EYE_INDICES[i]), (point[0]+5, point[1]+5),
+            cv2.circle(frame, (int(point[0]), int(point[1])), 3, (0, 255, 255), -1)
+            cv2.putText(frame, str(self.RIGHT_EYE_INDICES[i]), (int(point[0])+5, int(point[1])+5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.3, (255, 255, 255), 1)
             
         return frame
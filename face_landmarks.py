@@ -0,0 +1,123 @@
+import numpy as np
+
+# FaceMesh (refine_landmarks=True) 输出的关键点数量
+NUM_LANDMARKS = 478
+
+# 标准EAR计算使用的6个关键点索引，顺序：p1, p2, p3, p4, p5, p6
+LEFT_EYE_EAR_INDICES = [33, 159, 158, 133, 153, 145]
+RIGHT_EYE_EAR_INDICES = [362, 386, 385, 263, 380, 374]
+EAR_INDICES = np.array([LEFT_EYE_EAR_INDICES, RIGHT_EYE_EAR_INDICES], dtype=np.intp)  # (2, 6)
+
+# 眼部轮廓的16个关键点索引
+LEFT_EYE_OUTLINE_INDICES = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
+RIGHT_EYE_OUTLINE_INDICES = [263, 249, 390, 373, 374, 380, 381, 382, 362, 398, 384, 385, 386, 387, 388, 466]
+EYE_OUTLINE_INDICES = np.array([LEFT_EYE_OUTLINE_INDICES, RIGHT_EYE_OUTLINE_INDICES], dtype=np.intp)  # (2, 16)
+
+
+class FaceLandmarks:
+    """单帧人脸关键点容器：预分配的 float32 (478, 3) 数组，x/y 为像素坐标（保留亚像素精度），z 为相对深度"""
+
+    def __init__(self, num_landmarks=NUM_LANDMARKS):
+        self.points = np.zeros((num_landmarks, 3), dtype=np.float32)
+        self.width = 0
+        self.height = 0
+
+    @property
+    def xy(self):
+        """(N, 2) 像素坐标视图"""
+        return self.points[:, :2]
+
+    def fill(self, landmark_list, width, height, indices=None, offset=(0, 0)):
+        """从 MediaPipe NormalizedLandmarkList（或 Tasks API 返回的关键点列表）填充，归一化坐标换算为像素坐标
+
+        indices 为 None 时填充全部关键点；否则 indices 为整数数组，只填充用到的行，其余行保持不变。
+        width/height 为推理图像对应到原始帧的尺寸，offset 为其左上角在原始帧中的位置：
+        在裁剪区域上推理时传入裁剪框，关键点即映射回整帧坐标。
+        """
+        landmarks = getattr(landmark_list, 'landmark', landmark_list)
+        if indices is None:
+            count = min(len(landmarks), len(self.points))
+            rows = slice(0, count)
+            selected = landmarks[:count]
+        else:
+            count = len(indices)
+            rows = indices
+            selected = [landmarks[i] for i in indices.tolist()]
+        values = np.fromiter((v for lm in selected for v in (lm.x, lm.y, lm.z)),
+                             dtype=np.float32, count=count * 3).reshape(count, 3)
+        values *= np.array([width, height, 1.0], dtype=np.float32)
+        if offset[0] or offset[1]:
+            values[:, 0] += offset[0]
+            values[:, 1] += offset[1]
+        self.points[rows] = values
+        self.width = width
+        self.height = height
+        return self
+
+    def eye_points(self):
+        """双眼EAR关键点 (2, 6, 2)"""
+        return self.xy[EAR_INDICES]
+
+    def eye_metrics(self):
+        """双眼EAR (2,) 和双眼中心 (2,)，直接在关键点数组上做向量化计算"""
+        xy = self.xy
+        diff = xy[_EAR_FROM_ROWS] - xy[_EAR_TO_ROWS]  # (2, 3, 2)
+        dist = np.hypot(diff[..., 0], diff[..., 1])  # (2, 3)
+        horizontal = dist[:, 2]
+        vertical = dist @ _HALF_VERTICAL_SUM
+        if horizontal.all():
+            ears = vertical / horizontal
+        else:
+            # 避免除以0
+            ears = np.divide(vertical, horizontal, out=np.zeros_like(horizontal), where=horizontal > 0)
+        center = xy[EAR_LANDMARK_ROWS].sum(axis=0) / len(EAR_LANDMARK_ROWS)
+        return ears, center
+
+    def eye_outline_points(self):
+        """双眼轮廓关键点 (2, 16, 2)"""
+        return self.xy[EYE_OUTLINE_INDICES]
+
+    def bounding_box(self, rows=None):
+        """指定关键点的外接框 (x0, y0, x1, y1)，rows 为 None 时使用全部关键点"""
+        xy = self.xy if rows is None else self.xy[rows]
+        x0, y0 = xy.min(axis=0)
+        x1, y1 = xy.max(axis=0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+
+# 填充检测器需要的关键点（双眼EAR共12个点）
+EAR_LANDMARK_ROWS = EAR_INDICES.ravel()
+# 填充可视化工具需要的关键点（双眼轮廓共32个点）
+OUTLINE_LANDMARK_ROWS = EYE_OUTLINE_INDICES.ravel()
+
+# 人脸上下左右的端点：额头顶部、下巴、左右脸颊，用于估计人脸外接框
+FACE_EXTENT_INDICES = np.array([10, 152, 234, 454], dtype=np.intp)
+# 区域跟踪模式下需要填充的关键点（EAR关键点 + 人脸端点）
+TRACKING_LANDMARK_ROWS = np.concatenate([EAR_LANDMARK_ROWS, FACE_EXTENT_INDICES])
+
+
+# EAR 中三段距离的端点在6点序列中的位置：p2-p6, p3-p5, p1-p4
+_EAR_FROM = [1, 2, 0]
+_EAR_TO = [5, 4, 3]
+
+
+# 直接索引关键点数组的端点行号 (2, 3)
+_EAR_FROM_ROWS = EAR_INDICES[:, _EAR_FROM]
+_EAR_TO_ROWS = EAR_INDICES[:, _EAR_TO]
+# (||p2-p6|| + ||p3-p5||) / 2
+_HALF_VERTICAL_SUM = np.array([0.5, 0.5, 0.0], dtype=np.float32)
+
+
+def eye_aspect_ratios(eyes):
+    """同时计算多只眼睛的EAR，eyes 形状为 (n, 6, 2)，返回 (n,) 数组
+
+    EAR = (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||)
+    """
+    eyes = np.asarray(eyes, dtype=np.float32)
+    diff = eyes[:, _EAR_FROM] - eyes[:, _EAR_TO]
+    dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))  # (n, 3)
+    horizontal = dist[:, 2]
+    # 避免除以0
+    return np.divide(dist[:, 0] + dist[:, 1], 2.0 * horizontal,
+                     out=np.zeros_like(horizontal), where=horizontal > 0)
+
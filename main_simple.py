@@ -3,28 +3,110 @@ import time
 import sys
 import os
 import threading
+import argparse
 # 眼睛检测器导入（MediaPipe 版本）
-from eye_detector_mediapipe import MediaPipeEyeDetector
+from eye_detector_mediapipe import MediaPipeEyeDetector, INFERENCE_MODES
+from detector_worker import ProcessEyeDetector
+from pipelined_detector import PipelinedEyeDetector
+# 检测后端探测
+from detector_backends import BACKEND_NAMES
+from backend_probe import select_backend, load_cached_backend
 # 动作控制器导入
 from action_controller_simple import SimpleActionController, ControlMode
 # 媒体控制器导入（处理VLC依赖问题）
 from media_controller_simple_fallback import SimpleMediaController
+from mpv_ipc import MpvMediaController
+# 媒体操作执行器（超时、取消、完成回调）
+from media_executor import MediaExecutor
 # 流媒体服务器
 from stream_server import StreamServer
-from stream_server import StreamHandler
+# 命令总线
+from command_bus import CommandBus
+# 摄像头采集线程
+from camera_capture import LatestFrameCapture, FramePacer
+# 会话录制
+from session_recorder import SessionRecorder
+# 性能指标（StreamServer 的 /metrics）
+from metrics import STAGE_SECONDS, FRAMES_PROCESSED
+# 看一眼到动作生效的延迟跟踪
+from tracing import TRACER, TraceContext, print_trace_summary
 
 class SimpleEyeRemote:
-    def __init__(self):
+    # 视频命令 -> 媒体控制器方法
+    VIDEO_OPERATIONS = {
+        'play': 'play_video',
+        'pause': 'pause_video',
+        'stop': 'stop_video',
+        'next': 'next_video',
+        'prev': 'previous_video',
+        'seek': 'seek',
+    }
+    
+    def __init__(self, stream_backend="thread", inference_mode="full", keyframe_interval=1,
+                 detector_process=False, detector_workers=1, detector_backend="facemesh",
+                 backend_options=None, reprobe_backend=False, record_path=None, trace_path=None,
+                 media_backend="signal", mpv_socket=None, playlist=None, document_input="xtest",
+                 document_viewer="builtin", preview_read_ahead=8):
+        # 检测器配置（detector_process 为 True 时检测器运行在独立进程中，
+        # detector_workers > 1 时多个检测实例流水线并行，结果按采集顺序交付）
+        self.detector_process = detector_process
+        self.detector_workers = detector_workers
+        self.pipelined = detector_workers > 1
+        self.reprobe_backend = reprobe_backend
+        self.detector_kwargs = {
+            'inference_mode': inference_mode,
+            'keyframe_interval': keyframe_interval,
+        }
+        self.backend_options = backend_options or {}  # 后端名 -> 该后端的构造参数
+        # detector_backend 为 auto 时使用本机保存的探测结果；没有则等摄像头打开后录制几帧探测
+        self.detector_backend = detector_backend
+        if detector_backend == "auto" and not reprobe_backend:
+            self.detector_backend = load_cached_backend() or "auto"
+        self.eye_detector = None
+        # record_path 不为空时录制会话（原始帧 + 检测结果 + 命令），供之后确定性回放
+        self.record_path = record_path
+        self.recorder = None
+        # trace_path 不为空时跟踪每帧及其产生的命令，退出时导出 Chrome trace-event JSON
+        self.trace_path = trace_path
+        if trace_path:
+            TRACER.enable()
+        if self.detector_backend != "auto":
+            self.eye_detector = self._create_detector(self.detector_backend)
+        
         # 初始化各模块
-        self.eye_detector = MediaPipeEyeDetector()
         self.action_controller = SimpleActionController()
-        self.media_controller = SimpleMediaController()
+        # ipc: 常驻 mpv + JSON IPC；signal: 每次播放启动 mpv，用 SIGSTOP/SIGCONT 暂停
+        if media_backend == "ipc":
+            self.media_controller = MpvMediaController(socket_path=mpv_socket)
+        else:
+            self.media_controller = SimpleMediaController()
+        # 文档翻页: xtest 常驻 X 连接发送按键（不可用时回退） / xdotool 每次启动子进程
+        self.media_controller.document_control_method = document_input
+        # 文档显示: builtin 进程内渲染并缓存页面（不可用时回退） / external 启动 okular/evince
+        self.media_controller.document_viewer = document_viewer
+        # 所有媒体操作都在专用执行器中执行：命令处理线程提交后立即返回，慢操作按超时结束
+        self.media_executor = MediaExecutor(self.media_controller)
+        self.open_pdf_operation = None  # 最近一次打开PDF的操作，新的打开请求会取消它
         
-        # 流媒体服务器
-        self.stream_server = StreamServer()
+        # 命令总线：Web命令和检测到的命令都经由总线交给处理线程
+        self.command_bus = CommandBus()
         
-        # 摄像头对象
+        # 流媒体服务器（thread: 每个请求一个线程；asyncio: 单事件循环线程）
+        if stream_backend == "asyncio":
+            from async_stream_server import AsyncStreamServer
+            self.stream_server = AsyncStreamServer(command_bus=self.command_bus,
+                                                   preview_read_ahead=preview_read_ahead)
+        else:
+            self.stream_server = StreamServer(command_bus=self.command_bus,
+                                              preview_read_ahead=preview_read_ahead)
+        # 内置渲染器翻页后在推流页面上显示新页面
+        self.media_controller.add_document_listener(
+            lambda page, image: self.stream_server.set_document_page(image))
+        
+        # 摄像头对象及采集线程
         self.cap = None
+        self.capture = None
+        self.target_fps = 30  # 识别目标帧率
         
         # 运行状态
         self.running = False
@@ -42,16 +124,23 @@ class SimpleEyeRemote:
         
         # 视频播放状态跟踪
         self.last_video_status = False
-        self.pending_video_command = None  # 待执行的视频命令
-        self.pending_document_command = None  # 待执行的文档命令
-        self.pending_mode_switch = None  # 待执行的模式切换
+        self.status_poll_interval = 0.5  # 空闲时检查视频状态的间隔（秒）
         
         # 文档相关
         self.test_pdf = "test.pdf"  # 测试PDF文件名
         
-        # 自动加载测试视频
-        self.auto_load_test_video()
+        # 加载播放列表（mpv 预先加载并暂停在第一帧），没有指定时自动加载测试视频
+        if playlist:
+            self.load_playlist(playlist)
+        else:
+            self.auto_load_test_video()
         
+    def load_playlist(self, playlist):
+        """加载命令行指定的播放列表，流媒体预览使用第一个视频"""
+        if self.media_controller.load_playlist(playlist):
+            if self.stream_server.load_video_preview(self.media_controller.current_video):
+                print("视频预览已加载到流媒体服务器")
+    
     def auto_load_test_video(self):
         """自动加载测试视频"""
         test_videos = ["test.mp4", "test.MP4", "video.mp4", "video.MP4"]
@@ -67,6 +156,28 @@ class SimpleEyeRemote:
             print("未找到测试视频文件 (test.mp4)")
     
     # 在main_simple.py中修改摄像头初始化
+    def _create_detector(self, backend):
+        """按配置创建眼睛检测器"""
+        print(f"Detector backend: {backend}")
+        if self.pipelined:
+            return PipelinedEyeDetector(
+                workers=self.detector_workers, worker_type="process" if self.detector_process else "thread",
+                backend=backend, backend_options=self.backend_options.get(backend), **self.detector_kwargs)
+        detector_class = ProcessEyeDetector if self.detector_process else MediaPipeEyeDetector
+        return detector_class(backend=backend, backend_options=self.backend_options.get(backend),
+                              **self.detector_kwargs)
+    
+    def _record_probe_frames(self, count=30):
+        """从摄像头录制探测用的帧（采集线程启动前调用）"""
+        frames = []
+        for _ in range(count * 2):
+            ret, frame = self.cap.read()
+            if ret:
+                frames.append(frame)
+            if len(frames) >= count:
+                break
+        return frames
+    
     def initialize_camera(self):
         """初始化摄像头"""
         try:
@@ -91,6 +202,22 @@ class SimpleEyeRemote:
         if not self.initialize_camera():
             return
         
+        # 首次在本机运行：在录制帧上探测最快且精度合格的检测后端
+        if self.eye_detector is None:
+            backend = select_backend(self._record_probe_frames, reprobe=self.reprobe_backend,
+                                     backend_options=self.backend_options)
+            self.eye_detector = self._create_detector(backend)
+            self.detector_backend = backend
+        
+        if self.record_path:
+            config = dict(self.detector_kwargs, backend=self.detector_backend,
+                          backend_options=self.backend_options.get(self.detector_backend))
+            self.recorder = SessionRecorder(self.record_path, detector_config=config)
+        
+        # 启动采集线程
+        self.capture = LatestFrameCapture(self.cap)
+        self.capture.start()
+        
         # 启动流媒体服务器
         self.stream_server.start()
         
@@ -122,46 +249,84 @@ class SimpleEyeRemote:
     def _recognition_loop(self):
         """实时识别线程"""
         print("Starting recognition thread...")
+        pacer = FramePacer(self.target_fps)
+        last_seq = 0
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Failed to read camera frame")
-                time.sleep(1)
-                continue
+            # 按目标帧率调度，推理耗时计入帧间隔
+            pacer.wait()
             
-            # 检测眼睛状态
-            detection_result = self.eye_detector.detect_eyes_state(frame)
+            # 总是取最新采集的一帧，过期帧在采集线程中被丢弃
+            captured = self.capture.get_latest(last_seq, timeout=1.0)
+            if captured is None:
+                if self.running:
+                    print("Failed to read camera frame")
+                continue
+            last_seq = captured.seq
+            if self.recorder:
+                self.recorder.record_frame(captured.seq, captured.timestamp, captured.frame)
             
-            # 处理动作
+            # 状态机和动作计时都以采集时间为准
+            trace = TraceContext(captured.seq, captured.timestamp) if TRACER.enabled else None
+            if self.pipelined:
+                # 流水线模式：提交当前帧，处理按采集顺序完成的较早帧
+                with STAGE_SECONDS.labels("detection").time(), TRACER.span("pipeline.process", trace):
+                    completed = self.eye_detector.process(captured.frame, captured.seq, captured.timestamp)
+                for seq, frame, detection_result in completed:
+                    self._handle_detection(seq, frame, detection_result)
+            else:
+                # 检测眼睛状态
+                with STAGE_SECONDS.labels("detection").time(), TRACER.span("detect_eyes_state", trace):
+                    detection_result = self.eye_detector.detect_eyes_state(captured.frame, captured.timestamp)
+                self._handle_detection(captured.seq, captured.frame, detection_result)
+    
+    def _handle_detection(self, seq, frame, detection_result):
+        """按采集顺序处理一帧的检测结果：动作判断、命令执行、画面推送"""
+        # 处理动作
+        mode = self.action_controller.mode.value
+        trace = TraceContext(seq, detection_result['timestamp']) if TRACER.enabled else None
+        with STAGE_SECONDS.labels("decision").time(), TRACER.span("process_detection", trace):
             command = self.action_controller.process_detection(detection_result)
-            
-            # 执行命令
-            if command:
-                self.execute_command(command)
-            
-            # 添加调试信息到帧
+        if self.recorder:
+            self.recorder.record_result(seq, detection_result, command, mode)
+        
+        # 执行命令
+        if command:
+            self.execute_command(command, trace)
+        
+        # 添加调试信息到帧
+        with STAGE_SECONDS.labels("render").time(), TRACER.span("render", trace):
             visualized_frame = frame.copy()
             if self.show_landmarks:
                 self.eye_detector.draw_landmarks(visualized_frame, detection_result)
             visualized_frame = self.draw_debug_info(visualized_frame, detection_result, command)
-            
-            # 发送到流媒体服务器（始终显示摄像头画面）
-            self.stream_server.update_frame(visualized_frame)
-            
-            # 显示调试信息到终端
-            if self.show_debug and self.frame_count % 30 == 0:  # 每30帧打印一次
-                self.print_debug_info(detection_result, command)
-            
-            # 性能统计
-            self.frame_count += 1
-            
-            # 控制处理速度
-            time.sleep(0.03)  # 约30fps
+        
+        # 发送到流媒体服务器（始终显示摄像头画面）
+        self.stream_server.update_frame(visualized_frame)
+        # 推送检测状态给 WebSocket 客户端
+        self.stream_server.update_detection(detection_result, command,
+                                            self.action_controller.mode.value)
+        
+        # 显示调试信息到终端
+        if self.show_debug and self.frame_count % 30 == 0:  # 每30帧打印一次
+            self.print_debug_info(detection_result, command)
+        
+        # 性能统计
+        self.frame_count += 1
+        FRAMES_PROCESSED.inc()
     
     def _video_processing_loop(self):
-        """视频处理线程"""
+        """视频处理线程：阻塞等待命令总线上的视频命令和模式切换"""
         print("Starting video processing thread...")
         while self.running:
+            # 有命令时立即唤醒；空闲时每隔一段时间检查一次视频状态
+            command = self.command_bus.get(("video", "mode"), timeout=self.status_poll_interval)
+            
+            if command is not None:
+                if command.kind == "video":
+                    self._execute_video_command(command)
+                else:
+                    self._execute_mode_switch(command)
+            
             # 检查视频播放状态变化
             current_video_status = self.media_controller.get_video_status()
             
@@ -171,71 +336,65 @@ class SimpleEyeRemote:
                     print("视频开始播放")
                 else:
                     print("视频停止/暂停")
+                # 播放期间推流页面显示按视频帧率播放的预览
+                self.stream_server.set_video_playback_mode(current_video_status)
                 
                 self.last_video_status = current_video_status
-            
-            # 检查来自Web界面的命令
-            with StreamHandler.frame_lock:
-                if StreamHandler.pending_video_command:
-                    self.pending_video_command = StreamHandler.pending_video_command
-                    StreamHandler.pending_video_command = None
-                if StreamHandler.pending_document_command:
-                    self.pending_document_command = StreamHandler.pending_document_command
-                    StreamHandler.pending_document_command = None
-                if StreamHandler.pending_mode_switch:
-                    self.pending_mode_switch = StreamHandler.pending_mode_switch
-                    StreamHandler.pending_mode_switch = None
-            
-            # 处理待执行的视频命令
-            if self.pending_video_command:
-                print(f"执行视频命令: {self.pending_video_command}")
-                if self.pending_video_command == "play":
-                    self.media_controller.play_video()
-                elif self.pending_video_command == "pause":
-                    self.media_controller.pause_video()
-                elif self.pending_video_command == "stop":
-                    self.media_controller.stop_video()
-                    
-                self.pending_video_command = None
-            
-            # 处理模式切换
-            if self.pending_mode_switch:
-                if self.pending_mode_switch == "video":
-                    self.action_controller.switch_mode(ControlMode.VIDEO)
-                    print("切换到视频模式")
-                elif self.pending_mode_switch == "document":
-                    self.action_controller.switch_mode(ControlMode.DOCUMENT)
-                    # 切换到文档模式时自动打开PDF文档
-                    self.auto_open_test_pdf()
-                    print("切换到文档模式")
-                self.pending_mode_switch = None
-            
-            time.sleep(0.1)
+    
+    def _execute_video_command(self, command):
+        """把视频命令交给媒体执行器；未开始的旧视频命令被新命令取代（例如排队中的 play 被随后的 pause 取消）"""
+        print(f"执行视频命令: {command.name} (来源: {command.source})")
+        operation = self.VIDEO_OPERATIONS.get(command.name)
+        if operation is None:
+            self.command_bus.complete(command, False)
+            return
+        # seek 的参数为绝对时间（秒），来自推流页面的缩略图跳转条
+        args = (command.arg, "absolute") if command.name == "seek" else ()
+        self.media_executor.submit(operation, *args, group="video", trace=command.trace,
+                                   on_done=self._complete_command(command))
+    
+    def _complete_command(self, command):
+        """媒体操作结束（完成、失败、超时或取消）后结束总线上的命令"""
+        return lambda operation: self.command_bus.complete(command, operation.ok)
+    
+    def _execute_mode_switch(self, command):
+        """执行模式切换"""
+        if command.name == "video":
+            self.action_controller.switch_mode(ControlMode.VIDEO)
+            self.stream_server.set_document_mode(False)
+            print("切换到视频模式")
+        elif command.name == "document":
+            self.action_controller.switch_mode(ControlMode.DOCUMENT)
+            self.stream_server.set_document_mode(True)
+            # 切换到文档模式时自动打开PDF文档
+            self.auto_open_test_pdf()
+            print("切换到文档模式")
+        self.command_bus.complete(command)
     
     def _document_processing_loop(self):
-        """文档处理线程"""
+        """文档处理线程：阻塞等待命令总线上的文档命令"""
         print("Starting document processing thread...")
         while self.running:
-            # 检查来自Web界面的文档命令
-            with StreamHandler.frame_lock:
-                if StreamHandler.pending_document_command:
-                    self.pending_document_command = StreamHandler.pending_document_command
-                    StreamHandler.pending_document_command = None
-                if StreamHandler.pending_open_pdf:
-                    # 处理打开PDF命令
-                    pdf_path = StreamHandler.pending_open_pdf
-                    StreamHandler.pending_open_pdf = None
-                    if pdf_path:
-                        print(f"打开PDF文档: {pdf_path}")
-                        self.media_controller.open_pdf(pdf_path)
-            
-            # 处理待执行的文档命令
-            if self.pending_document_command:
-                print(f"执行文档命令: {self.pending_document_command}")
-                self.media_controller.control_document(self.pending_document_command)
-                self.pending_document_command = None
+            command = self.command_bus.get(("document",), timeout=1.0)
+            if command is None:
+                continue
             
-            time.sleep(0.1)
+            on_done = self._complete_command(command)
+            if command.name == "open_pdf":
+                # 处理打开PDF命令
+                print(f"打开PDF文档: {command.arg}")
+                self.open_pdf(command.arg, on_done)
+            else:
+                print(f"执行文档命令: {command.name} (来源: {command.source})")
+                self.media_executor.submit("control_document", command.name, trace=command.trace,
+                                           on_done=on_done)
+    
+    def open_pdf(self, pdf_path, on_done=None):
+        """提交打开PDF的操作；仍在等待阅读器窗口的上一次打开被取消"""
+        if self.open_pdf_operation is not None:
+            self.open_pdf_operation.cancel()
+        self.open_pdf_operation = self.media_executor.submit("open_pdf", pdf_path, group="open_pdf",
+                                                             cancellable=True, on_done=on_done)
     
     def auto_open_test_pdf(self):
         """自动打开测试PDF文档"""
@@ -243,7 +402,7 @@ class SimpleEyeRemote:
         for pdf_file in test_pdfs:
             if os.path.exists(pdf_file):
                 print(f"自动打开测试PDF文档: {pdf_file}")
-                self.media_controller.open_pdf(pdf_file)
+                self.open_pdf(pdf_file)
                 return
         else:
             print(f"未找到测试PDF文档 ({self.test_pdf})")
@@ -265,22 +424,34 @@ class SimpleEyeRemote:
             print(f"Left EAR: {detection_result['left_ear']:.2f}, Right EAR: {detection_result['right_ear']:.2f}")
         print(f"Last Command: {last_command if last_command else 'None'}")
         print(f"Video Status: {'Playing' if self.media_controller.get_video_status() else 'Paused/Stopped'}")
-        print(f"Video Preview: {'Loaded' if self.stream_server.is_video_loaded() else 'Not loaded'}")
+        preview = self.stream_server.preview_stats
+        if preview:
+            print(f"Video Preview: {preview['fps']:.1f} fps, published={preview['published']} "
+                  f"dropped={preview['dropped']} buffered={preview['buffered_frames']} "
+                  f"({preview['buffered_bytes'] / 1e3:.0f} KB)")
+        else:
+            print("Video Preview: Not loaded")
         print(f"FPS: {self.calculate_fps():.1f}")
+        if self.capture:
+            print(f"Camera: captured={self.capture.captured_count} dropped={self.capture.dropped_count}")
+        inference = self.eye_detector.inference_stats()
+        print(f"Inference ({detection_result['inference_mode']}): {inference['pixels'] / 1000:.0f}k px "
+              f"{inference['inference_ms']:.1f}ms roi_fallbacks={inference['roi_fallbacks']} "
+              f"keyframes={inference['keyframes']} tracked={inference['tracked']} "
+              f"interval={inference['keyframe_interval']}")
+        if 'worker_restarts' in inference:
+            print(f"Detector worker restarts: {inference['worker_restarts']}")
+        for key, stats in self.command_bus.latency_stats().items():
+            print(f"Command {key}: n={stats['count']} wait={stats['wait_avg_ms']:.1f}ms "
+                  f"avg={stats['avg_ms']:.1f}ms p95={stats['p95_ms']:.1f}ms max={stats['max_ms']:.1f}ms")
         
-    def execute_command(self, command):
-        """执行控制命令"""
+    def execute_command(self, command, trace=None):
+        """把检测到的控制命令提交到命令总线，由处理线程执行，不阻塞识别线程"""
         if self.action_controller.mode == ControlMode.VIDEO:
-            if command == "play":
-                # 直接执行播放命令
-                self.media_controller.play_video()
-                print("视频开始播放")
-            elif command == "pause":
-                # 直接执行暂停命令
-                self.media_controller.pause_video()
-                print("视频暂停播放")
+            if command in ("play", "pause"):
+                self.command_bus.submit("video", command, source="detector", trace=trace)
         elif self.action_controller.mode == ControlMode.DOCUMENT:
-            self.media_controller.control_document(command)
+            self.command_bus.submit("document", command, source="detector", trace=trace)
     
     def draw_debug_info(self, frame, detection_result, last_command):
         """在画面上绘制调试信息"""
@@ -312,17 +483,90 @@ class SimpleEyeRemote:
         """清理资源"""
         # 停止所有线程
         self.running = False
+        self.command_bus.close()
         
+        if self.capture:
+            self.capture.stop()
         if self.cap:
             self.cap.release()
-        # 停止视频播放
+        # 等识别线程退出后再释放检测器
+        if self.recognition_thread:
+            self.recognition_thread.join(timeout=2)
+        if self.eye_detector:
+            self.eye_detector.close()
+        if self.recorder:
+            self.recorder.close()
+        if self.trace_path:
+            count = TRACER.export_chrome(self.trace_path)
+            print(f"已导出 {count} 个跟踪事件: {self.trace_path}")
+            print_trace_summary(TRACER.summary())
+        # 停止视频播放并释放播放器（执行器中未开始的操作被取消）
+        self.media_executor.close()
         if self.media_controller:
-            self.media_controller.stop_video()
+            self.media_controller.close()
         # 停止流媒体服务器
         if self.stream_server:
             self.stream_server.stop()
         print("Program exited")
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="AI Eye Remote Control")
+    parser.add_argument("--stream-backend", choices=["thread", "asyncio"], default="thread",
+                        help="流媒体服务器实现 (默认: thread)")
+    parser.add_argument("--inference-mode", choices=INFERENCE_MODES, default="full",
+                        help="人脸关键点推理区域: full 整帧 / roi 人脸附近裁剪 / downscale 缩小整帧 (默认: full)")
+    parser.add_argument("--keyframe-interval", type=int, default=1,
+                        help="每N帧运行一次 Face Mesh，中间帧用光流传播眼部关键点 (默认: 1，每帧推理)")
+    parser.add_argument("--detector-process", action="store_true",
+                        help="在独立进程中运行眼睛检测器，帧通过共享内存传递")
+    parser.add_argument("--detector-workers", type=int, default=1,
+                        help="并行的检测实例数，>1 时流水线检测，结果按采集顺序处理 (默认: 1)")
+    parser.add_argument("--detector-backend", choices=("auto",) + BACKEND_NAMES, default="auto",
+                        help="检测后端；auto 在本机首次运行时探测最快且精度合格的后端并保存 (默认: auto)")
+    parser.add_argument("--reprobe-backend", action="store_true",
+                        help="忽略保存的结果，重新探测检测后端")
+    parser.add_argument("--landmarker-model", help="FaceLandmarker 模型文件 face_landmarker.task 的路径")
+    parser.add_argument("--haar-dir", help="Haar 级联文件所在目录（opencv 后端）")
+    parser.add_argument("--record", metavar="DIR",
+                        help="把会话（原始帧、检测结果、命令）录制到目录，用 benchmark.py replay 回放比较")
+    parser.add_argument("--media-backend", choices=["ipc", "signal"], default="signal",
+                        help="视频播放控制: ipc 常驻 mpv 并通过 JSON IPC 控制（实验性）/ signal 用信号暂停 mpv 进程 (默认: signal)")
+    parser.add_argument("--mpv-socket", help="mpv IPC 套接字路径（默认在临时目录下按进程号生成）")
+    parser.add_argument("--document-input", choices=["xtest", "xdotool"], default="xtest",
+                        help="文档翻页按键: xtest 通过 python-xlib 常驻 X 连接发送，缓存阅读器窗口 / "
+                             "xdotool 每次启动子进程 (默认: xtest，不可用时自动回退)")
+    parser.add_argument("--document-viewer", choices=["builtin", "external"], default="builtin",
+                        help="文档显示: builtin 用 pdftoppm 在进程内渲染、缓存并预取前后页，显示在推流页面上 / "
+                             "external 启动 okular 或 evince (默认: builtin，未安装 poppler-utils 时自动回退)")
+    parser.add_argument("--preview-read-ahead", type=int, default=8,
+                        help="推流页面视频预览的预读缓冲帧数，内存占用与视频长度无关 (默认: 8)")
+    parser.add_argument("--playlist", nargs="+", metavar="VIDEO",
+                        help="播放列表（默认自动查找 test.mp4）；ipc 后端启动时预加载第一个，播放时预先打开下一个")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="跟踪每帧到命令执行完成的各段耗时，退出时写出 Chrome trace-event JSON 并打印延迟汇总")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    controller = SimpleEyeRemote()
+    args = parse_args()
+    backend_options = {}
+    if args.landmarker_model:
+        backend_options['landmarker'] = {'model_path': args.landmarker_model}
+    if args.haar_dir:
+        backend_options['opencv'] = {'cascade_dir': args.haar_dir}
+    controller = SimpleEyeRemote(stream_backend=args.stream_backend, inference_mode=args.inference_mode,
+                                 keyframe_interval=args.keyframe_interval,
+                                 detector_process=args.detector_process,
+                                 detector_workers=args.detector_workers,
+                                 detector_backend=args.detector_backend,
+                                 backend_options=backend_options,
+                                 reprobe_backend=args.reprobe_backend,
+                                 record_path=args.record,
+                                 trace_path=args.trace,
+                                 media_backend=args.media_backend,
+                                 mpv_socket=args.mpv_socket,
+                                 playlist=args.playlist,
+                                 document_input=args.document_input,
+                                 document_viewer=args.document_viewer,
+                                 preview_read_ahead=args.preview_read_ahead)
     controller.process_control_loop()
\ No newline at end of file
@@ -6,6 +6,8 @@ import cv2
 import time
 import os
 import threading
+import argparse
+from collections import deque
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
@@ -18,22 +20,38 @@ from PyQt6.QtGui import QImage, QPixmap
 # 导入现有的模块
 sys.path.append(os.path.dirname(__file__))
 from eye_detector_mediapipe import MediaPipeEyeDetector
+from detector_worker import ProcessEyeDetector
 from action_controller_simple import SimpleActionController, ControlMode
 from media_controller_simple_fallback import SimpleMediaController
+from media_executor import MediaExecutor
+from camera_capture import LatestFrameCapture, FramePacer
+from metrics import STAGE_SECONDS, FRAMES_DROPPED
 
 class VideoCaptureThread(QThread):
-    frame_ready = pyqtSignal(object)
+    frame_ready = pyqtSignal()  # 有新的待显示帧，用 take_frame() 取走；同一时间最多一个信号在排队
     finished = pyqtSignal()
     
-    def __init__(self):
+    def __init__(self, detector_process=False):
         super().__init__()
         self.cap = None
+        self.capture = None  # 采集线程，只保留最新一帧
+        self.target_fps = 30
         self.running = False
         self.detecting = False
         self.show_landmarks = True
         
-        # 组件初始化
-        self.eye_detector = MediaPipeEyeDetector()
+        # 待显示帧：在本线程中缩放到显示大小并转换为 QImage，只保留最新一帧
+        self.display_size = (640, 480)  # 显示标签的大小，由界面线程更新
+        self._frame_lock = threading.Lock()
+        self._display_frame = None  # (QImage, 采集时间)
+        self._frame_signal_pending = False
+        self.gui_dropped = 0  # 界面线程来不及显示、被新帧覆盖的帧数
+        
+        # 组件初始化（detector_process 为 True 时在独立进程中推理，不占用界面进程的 GIL）
+        if detector_process:
+            self.eye_detector = ProcessEyeDetector()
+        else:
+            self.eye_detector = MediaPipeEyeDetector()
         self.action_controller = SimpleActionController()
         
     def start_capture(self, camera_id=3):
@@ -43,6 +61,8 @@ class VideoCaptureThread(QThread):
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
             self.cap.set(cv2.CAP_PROP_FPS, 30)
             
+        self.capture = LatestFrameCapture(self.cap)
+        self.capture.start()
         self.running = True
         self.start()
         
@@ -50,6 +70,9 @@ class VideoCaptureThread(QThread):
         self.running = False
         self.wait()
         
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
         if self.cap:
             self.cap.release()
             self.cap = None
@@ -60,6 +83,9 @@ class VideoCaptureThread(QThread):
     def toggle_landmarks(self, show):
         self.show_landmarks = show
         
+    def set_display_size(self, width, height):
+        self.display_size = (max(width, 1), max(height, 1))
+        
     def switch_mode(self, mode):
         if mode == "video":
             self.action_controller.switch_mode(ControlMode.VIDEO)
@@ -67,10 +93,16 @@ class VideoCaptureThread(QThread):
             self.action_controller.switch_mode(ControlMode.DOCUMENT)
             
     def run(self):
+        pacer = FramePacer(self.target_fps)
+        last_seq = 0
         while self.running and self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                processed_frame = frame.copy()
+            # 按目标帧率调度，并总是处理最新采集的一帧
+            pacer.wait()
+            captured = self.capture.get_latest(last_seq, timeout=1.0)
+            if captured is not None:
+                last_seq = captured.seq
+                # 只有绘制关键点时才修改帧，需要复制
+                processed_frame = captured.frame.copy() if self.detecting else captured.frame
                 
                 # 如果启用检测，则处理帧
                 if self.detecting:
@@ -91,12 +123,44 @@ class VideoCaptureThread(QThread):
                     if command:
                         self.command_detected.emit(self.action_controller.mode.value, command)
                 
-                # 发出帧准备好的信号
-                self.frame_ready.emit(processed_frame)
-                
-            time.sleep(0.03)  # ~30 FPS
+                # 转换和缩放在本线程完成，界面线程只需显示
+                self._publish_frame(self._to_display_image(processed_frame), captured.timestamp)
             
         self.finished.emit()
+    
+    def _to_display_image(self, frame):
+        """缩放到显示标签的大小（保持宽高比）并转换为可直接显示的 QImage"""
+        h, w = frame.shape[:2]
+        width, height = self.display_size
+        scale = min(width / w, height / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if size != (w, h):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        # copy() 让 QImage 持有自己的数据，不依赖 numpy 数组的生命周期
+        return QImage(rgb_image.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
+    
+    def _publish_frame(self, image, timestamp):
+        """只保留最新一帧：界面线程还没取走上一帧时直接覆盖，不再发送信号，帧不会在事件队列中积压"""
+        with self._frame_lock:
+            replaced = self._frame_signal_pending
+            self._display_frame = (image, timestamp)
+            self._frame_signal_pending = True
+            if replaced:
+                self.gui_dropped += 1
+        if replaced:
+            FRAMES_DROPPED.labels("gui").inc()
+        else:
+            self.frame_ready.emit()
+    
+    def take_frame(self):
+        """界面线程取走最新的待显示帧，返回 (QImage, 采集时间)，没有时返回 None"""
+        with self._frame_lock:
+            frame = self._display_frame
+            self._display_frame = None
+            self._frame_signal_pending = False
+        return frame
         
     def draw_debug_info(self, frame, detection_result, last_command):
         """在画面上绘制调试信息"""
@@ -119,12 +183,22 @@ class VideoCaptureThread(QThread):
     command_detected = pyqtSignal(str, str)  # mode, command
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    document_page_ready = pyqtSignal(int, object)  # 页码, 页面图像（由翻页线程发出）
+    media_operation_done = pyqtSignal(object)  # 媒体执行器中结束的 MediaOperation
+    
+    def __init__(self, detector_process=False):
         super().__init__()
         
         self.media_controller = SimpleMediaController()
-        self.video_thread = VideoCaptureThread()
+        # 内置渲染器的页面通过信号交给界面线程显示
+        self.document_page_ready.connect(self.show_document_page)
+        self.media_controller.add_document_listener(self.document_page_ready.emit)
+        # 媒体操作在执行器线程中进行，不阻塞界面；结果通过信号回到界面线程
+        self.media_executor = MediaExecutor(self.media_controller)
+        self.media_operation_done.connect(self.on_media_operation_done)
+        self.video_thread = VideoCaptureThread(detector_process=detector_process)
         self.current_video_file = ""
+        self.paint_latency = deque(maxlen=100)  # 最近的采集到显示延迟（毫秒）
         
         # 连接视频线程信号
         self.video_thread.frame_ready.connect(self.update_frame)
@@ -146,11 +220,28 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         
         # 视频显示区域
+        display_layout = QHBoxLayout()
         self.video_label = QLabel("点击'启动摄像头'开始")
         self.video_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.video_label.setMinimumSize(640, 480)
         self.video_label.setStyleSheet("background-color: black;")
-        main_layout.addWidget(self.video_label)
+        display_layout.addWidget(self.video_label)
+        
+        # 文档页面显示区域（内置渲染器打开文档后显示）
+        self.document_label = QLabel()
+        self.document_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.document_label.setMinimumSize(360, 480)
+        self.document_label.setStyleSheet("background-color: gray;")
+        self.document_label.hide()
+        display_layout.addWidget(self.document_label)
+        main_layout.addLayout(display_layout)
+        
+        # 显示延迟和界面丢帧，每秒刷新
+        self.display_stats_label = QLabel("显示延迟: -")
+        main_layout.addWidget(self.display_stats_label)
+        self.display_stats_timer = QTimer(self)
+        self.display_stats_timer.timeout.connect(self.update_display_stats)
+        self.display_stats_timer.start(1000)
         
         # 控制面板
         controls_layout = QHBoxLayout()
@@ -228,6 +319,13 @@ class MainWindow(QMainWindow):
         document_group = QGroupBox("文档控制")
         document_layout = QVBoxLayout()
         
+        self.open_pdf_btn = QPushButton("打开PDF")
+        self.open_pdf_btn.clicked.connect(self.select_pdf)
+        document_layout.addWidget(self.open_pdf_btn)
+        
+        self.page_label = QLabel("")
+        document_layout.addWidget(self.page_label)
+        
         self.prev_page_btn = QPushButton("上一页")
         self.prev_page_btn.clicked.connect(lambda: self.control_document("page_up"))
         document_layout.addWidget(self.prev_page_btn)
@@ -283,28 +381,62 @@ class MainWindow(QMainWindow):
             else:
                 QMessageBox.warning(self, "失败", f"无法加载视频: {os.path.basename(file_path)}")
                 
-    def play_video(self):
-        if self.current_video_file:
-            if self.media_controller.play_video():
+    def submit_media(self, name, *args, **kwargs):
+        """把媒体操作交给执行器，结束后由 on_media_operation_done 在界面线程处理"""
+        return self.media_executor.submit(name, *args, on_done=self.media_operation_done.emit, **kwargs)
+    
+    def on_media_operation_done(self, operation):
+        """媒体操作结束（界面线程）：更新按钮状态或提示失败"""
+        if operation.name == "play_video":
+            if operation.ok:
                 self.play_video_btn.setEnabled(False)
                 self.pause_video_btn.setEnabled(True)
                 self.stop_video_btn.setEnabled(True)
-            else:
+            elif operation.state != "cancelled":
                 QMessageBox.warning(self, "失败", "无法播放视频")
-                
-    def pause_video(self):
-        if self.media_controller.pause_video():
+        elif operation.name == "pause_video" and operation.ok:
             self.play_video_btn.setEnabled(True)
             self.pause_video_btn.setEnabled(False)
-            
-    def stop_video(self):
-        if self.media_controller.stop_video():
+        elif operation.name == "stop_video" and operation.ok:
             self.play_video_btn.setEnabled(True)
             self.pause_video_btn.setEnabled(False)
             self.stop_video_btn.setEnabled(False)
+        elif operation.name == "open_pdf" and not operation.ok and operation.state != "cancelled":
+            QMessageBox.warning(self, "失败", f"无法打开PDF: {os.path.basename(operation.args[0])}")
+    
+    def play_video(self):
+        if self.current_video_file:
+            self.submit_media("play_video", group="video")
+                
+    def pause_video(self):
+        self.submit_media("pause_video", group="video")
             
+    def stop_video(self):
+        self.submit_media("stop_video", group="video")
+            
+    def select_pdf(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "选择PDF文件", "", "PDF文件 (*.pdf)")
+        if file_path:
+            self.submit_media("open_pdf", file_path, group="open_pdf", cancellable=True)
+    
     def control_document(self, command):
-        self.media_controller.control_document(command)
+        self.submit_media("control_document", command)
+    
+    def show_document_page(self, page, image):
+        """显示内置渲染器的文档页面"""
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        qt_image = QImage(rgb_image.data, w, h, ch * w, QImage.Format.Format_RGB888)
+        pixmap = QPixmap.fromImage(qt_image).scaled(
+            self.document_label.size(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        self.document_label.setPixmap(pixmap)
+        self.document_label.show()
+        document = self.media_controller.pdf_document
+        if document is not None:
+            self.page_label.setText(f"第 {page}/{document.page_count} 页")
         
     def handle_command(self, mode, command):
         """处理从视频线程发出的命令"""
@@ -316,28 +448,38 @@ class MainWindow(QMainWindow):
         elif mode == "document":
             self.control_document(command)
             
-    def update_frame(self, frame):
-        """更新视频帧显示"""
-        # 将OpenCV的BGR格式转换为RGB
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        
-        # 缩放图片以适应标签大小
-        scaled_pixmap = pixmap.scaled(
-            self.video_label.size(), 
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        
-        self.video_label.setPixmap(scaled_pixmap)
+    def update_frame(self):
+        """更新视频帧显示：帧已在采集线程中缩放并转换，这里只取最新一帧显示"""
+        frame = self.video_thread.take_frame()
+        if frame is None:
+            return
+        image, timestamp = frame
+        self.video_label.setPixmap(QPixmap.fromImage(image))
+        latency = time.time() - timestamp
+        self.paint_latency.append(latency * 1000)
+        STAGE_SECONDS.labels("paint").observe(latency)
+    
+    def update_display_stats(self):
+        """刷新显示延迟（采集到显示）和界面丢帧数"""
+        if not self.paint_latency:
+            return
+        latencies = list(self.paint_latency)
+        self.display_stats_label.setText(
+            f"显示延迟: 平均 {sum(latencies) / len(latencies):.1f} ms, 最大 {max(latencies):.1f} ms | "
+            f"界面丢帧: {self.video_thread.gui_dropped}")
+    
+    def resizeEvent(self, event):
+        """窗口大小变化时，采集线程按新的标签大小缩放帧"""
+        super().resizeEvent(event)
+        size = self.video_label.size()
+        self.video_thread.set_display_size(size.width(), size.height())
         
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.video_thread.stop_capture()
-        self.media_controller.stop_video()
+        self.video_thread.eye_detector.close()
+        self.media_executor.close()
+        self.media_controller.close()
         event.accept()
         
     def start_visualization(self):
@@ -358,8 +500,13 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "错误", f"无法启动可视化工具: {str(e)}")
 
 def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="AI Eye Remote Control")
+    parser.add_argument("--detector-process", action="store_true",
+                        help="在独立进程中运行眼睛检测器")
+    # 其余参数交给 Qt 处理
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(detector_process=args.detector_process)
     window.show()
     sys.exit(app.exec())
 
@@ -2,9 +2,13 @@
 #vlc_version
 import subprocess
 import os
+import shutil
 import time
 import signal
 
+from pdf_renderer import PdfDocument, PdfRenderError
+from x11_input import create_document_input
+
 class SimpleMediaController:
     def __init__(self):
         print("使用简化版媒体控制器（命令行模式）")
@@ -12,18 +16,64 @@ class SimpleMediaController:
         self.current_video = None
         self.video_process = None  # 保存视频进程引用
         self.video_paused = False  # 跟踪暂停状态
-        # 确定使用的文档控制方法
-        self.document_control_method = "xdotool"
+        self.playlist = []  # 播放列表，current_video 为其中当前的一项
+        # 确定使用的文档控制方法：xtest 为进程内 XTest（失败时回退到 xdotool），xdotool 为每次启动子进程
+        self.document_control_method = "xtest"
+        self.document_input = None  # X11DocumentInput，首次翻页时创建
+        self.x_display = ":0"  # 阅读器所在的 X 显示
+        # 文档显示：builtin 由 pdftoppm 在进程内渲染（不可用时回退），external 启动 okular/evince
+        self.document_viewer = "builtin"
+        self.pdf_document = None  # 内置渲染器打开的 PdfDocument
+        self.document_listeners = []  # 页面变化回调 callback(页码, 图像)
+        self.reader_window_timeout = 5.0  # 外部阅读器启动后等待其窗口出现的最长时间（秒）
     def load_video(self, video_path):
         """加载视频文件"""
         if os.path.exists(video_path):
             self.current_video = video_path
+            self.playlist = [video_path]
             print(f"视频加载成功: {video_path}")
             return True
         else:
             print(f"视频文件不存在: {video_path}")
             return False
     
+    def load_playlist(self, video_paths):
+        """加载播放列表（跳过不存在的文件），从第一项开始"""
+        playlist = [path for path in video_paths if os.path.exists(path)]
+        if not playlist:
+            print("播放列表中没有可用的视频文件")
+            return False
+        self.current_video = playlist[0]
+        self.playlist = playlist
+        print(f"播放列表已加载: {len(playlist)} 个视频")
+        return True
+    
+    def next_video(self):
+        """切换到播放列表的下一项（正在播放时继续播放）"""
+        return self._advance_playlist(1)
+    
+    def previous_video(self):
+        """切换到播放列表的上一项"""
+        return self._advance_playlist(-1)
+    
+    def _advance_playlist(self, step):
+        if self.current_video not in self.playlist:
+            return False
+        index = self.playlist.index(self.current_video) + step
+        if not 0 <= index < len(self.playlist):
+            print("已经是播放列表的" + ("最后一项" if step > 0 else "第一项"))
+            return False
+        was_playing = self.get_video_status()
+        self.stop_video()
+        self.current_video = self.playlist[index]
+        print(f"切换到: {self.current_video}")
+        return self.play_video() if was_playing else True
+    
+    def seek(self, seconds, mode="relative"):
+        """跳转（需要 mpv IPC 后端，信号控制的 mpv 进程无法跳转）"""
+        print("当前媒体后端不支持跳转，请使用 --media-backend ipc")
+        return False
+    
     # 修改 play_video 方法，添加更多 VLC 参数来解决时间戳问题
     def play_video(self):
         """播放视频"""
@@ -127,39 +177,74 @@ class SimpleMediaController:
         print("视频停止")
         return True
     
-    def open_pdf(self, pdf_path):
-        """打开PDF文档"""
+    def add_document_listener(self, callback):
+        """注册内置文档的页面变化回调 callback(页码, 图像)，之后打开的文档都会调用"""
+        self.document_listeners.append(callback)
+        if self.pdf_document is not None:
+            self.pdf_document.add_page_listener(callback)
+    
+    def _open_builtin_pdf(self, pdf_path):
+        """用内置渲染器打开文档并显示第一页；已打开的同一文档重新显示当前页"""
+        document = self.pdf_document
+        try:
+            if document is not None and document.path == pdf_path:
+                return document.goto(document.current_page) is not None
+            document = PdfDocument(pdf_path)
+            if self.pdf_document is not None:
+                self.pdf_document.close()
+            self.pdf_document = document
+            for callback in self.document_listeners:
+                document.add_page_listener(callback)
+            return document.goto(1) is not None
+        except PdfRenderError as e:
+            print(f"内置PDF渲染不可用（{e}），使用外部阅读器")
+            return False
+    
+    def close(self):
+        """退出时释放播放器和 X 连接"""
+        self.stop_video()
+        self._close_documents()
+    
+    def _close_documents(self):
+        """释放内置PDF文档（预取线程）和翻页输入（X 连接与事件线程）"""
+        if self.pdf_document is not None:
+            self.pdf_document.close()
+            self.pdf_document = None
+        if self.document_input is not None:
+            self.document_input.close()
+            self.document_input = None
+    
+    def open_pdf(self, pdf_path, cancelled=None):
+        """打开PDF文档；cancelled 为 threading.Event，等待外部阅读器窗口期间被设置时不再等待"""
+        if os.path.exists(pdf_path) and self.document_viewer == "builtin":
+            if self._open_builtin_pdf(pdf_path):
+                return True
         if os.path.exists(pdf_path):
             try:
                 # 设置环境变量
                 env = os.environ.copy()
-                env['DISPLAY'] = ':0'
+                env['DISPLAY'] = self.x_display
                 
                 # 首先尝试使用 okular（如果安装了）
-                result = subprocess.run(['which', 'okular'], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
+                if shutil.which('okular'):
                     # 使用 okular 打开 PDF
-                    process = subprocess.Popen(['okular', pdf_path], env=env)
+                    app_name = 'okular'
                     print(f"使用 Okular 打开PDF: {pdf_path}")
                 else:
                     # 回退到 evince
-                    process = subprocess.Popen(['evince', pdf_path], env=env)
+                    app_name = 'evince'
                     print(f"使用 Evince 打开PDF: {pdf_path}")
+                process = subprocess.Popen([app_name, pdf_path], env=env)
                 
-                # 等待窗口打开
-                time.sleep(2)
-                
-                # 尝试激活窗口
-                try:
-                    subprocess.run(['wmctrl', '-a', 'okular'], 
-                                 capture_output=True, timeout=5, env=env)
-                except Exception as e:
-                    try:
-                        subprocess.run(['wmctrl', '-a', 'evince'], 
-                                     capture_output=True, timeout=5, env=env)
-                    except Exception as e2:
-                        print(f"激活PDF窗口失败: {e}")
+                # 等待窗口出现后立即返回（不再固定等待 2 秒）
+                start = time.time()
+                if self._wait_for_reader_window(process, app_name, env, cancelled):
+                    print(f"PDF窗口已就绪 ({(time.time() - start) * 1000:.0f} ms)")
+                elif process.poll() is not None:
+                    print(f"{app_name} 已退出 (返回码 {process.returncode})")
+                    return False
+                else:
+                    print("未等到PDF窗口，继续")
                 
                 return True
             except Exception as e:
@@ -168,13 +253,91 @@ class SimpleMediaController:
             print(f"PDF文件不存在: {pdf_path}")
         return False
     
+    def _ensure_document_input(self):
+        """按需创建 XTest 后端，不可用时改用 xdotool，返回 X11DocumentInput 或 None"""
+        if self.document_control_method == "xtest" and self.document_input is None:
+            self.document_input = create_document_input(self.x_display)
+            if self.document_input is None:
+                self.document_control_method = "xdotool"
+        return self.document_input
+    
+    def _wait_for_reader_window(self, process, app_name, env, cancelled=None):
+        """等待阅读器窗口出现并激活；阅读器退出、超时或被取消时返回 False
+        
+        XTest 后端由 X 事件唤醒；否则由 xdotool search --sync 阻塞等待，本线程只检查退出条件。
+        """
+        deadline = time.time() + self.reader_window_timeout
+        
+        def aborted():
+            return (process.poll() is not None or time.time() > deadline or
+                    (cancelled is not None and cancelled.is_set()))
+        
+        document_input = self._ensure_document_input()
+        if document_input is not None:
+            while not aborted():
+                window_id = document_input.wait_for_window(min(0.5, max(0.0, deadline - time.time())), cancelled)
+                if window_id is not None:
+                    return document_input.activate(window_id)
+            return False
+        
+        try:
+            search = subprocess.Popen(['xdotool', 'search', '--sync', '--onlyvisible', '--name', app_name],
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+        except FileNotFoundError:
+            print("错误: 未找到 xdotool 工具，无法等待PDF窗口")
+            return False
+        while True:
+            try:
+                output, _ = search.communicate(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                if aborted():
+                    search.kill()
+                    search.wait()
+                    return False
+        windows = output.split()
+        if search.returncode != 0 or not windows:
+            return False
+        subprocess.run(['xdotool', 'windowactivate', '--sync', windows[0]],
+                       capture_output=True, timeout=1, env=env)
+        return True
+    
     def control_document(self, command):
-            """控制文档翻页"""
+        """控制文档翻页：内置渲染器打开的文档直接翻页（通常命中缓存）；
+        外部阅读器优先通过常驻 X 连接发送 XTest 按键，不可用或失败时使用 xdotool"""
+        if self.pdf_document is not None:
+            start = time.perf_counter()
+            try:
+                if command == "page_down":
+                    image = self.pdf_document.page_down()
+                elif command == "page_up":
+                    image = self.pdf_document.page_up()
+                else:
+                    return False
+            except PdfRenderError as e:
+                print(f"翻页失败: {e}")
+                return False
+            if image is None:
+                print("已经是文档的" + ("最后一页" if command == "page_down" else "第一页"))
+                return False
+            print(f"翻到第 {self.pdf_document.current_page}/{self.pdf_document.page_count} 页 "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+            return True
+        if self.document_control_method == "xtest":
+            if self._ensure_document_input() is not None:
+                if self.document_input.press(command):
+                    print(f"执行文档控制命令: {command} (XTest)")
+                    return True
+                print("XTest 翻页失败，改用 xdotool")
+        return self._control_document_xdotool(command)
+    
+    def _control_document_xdotool(self, command):
+            """控制文档翻页（xdotool 子进程方案）"""
             print(f"执行文档控制命令: {command} (使用 xdotool 方案)")
             try:
                 # 设置环境变量
                 env = os.environ.copy()
-                env['DISPLAY'] = ':0'
+                env['DISPLAY'] = self.x_display
                 
                 # 直接使用 xdotool 方案（已知有效）
                 window_activated = False
@@ -201,10 +364,8 @@ class SimpleMediaController:
                                 break
                     except Exception as e:
                         continue
-                
-                # 减少等待时间
-                if window_activated:
-                    time.sleep(0.1)
+
+                # windowactivate --sync 已等到窗口激活，不再额外等待
                 
                 # 发送按键 - 只尝试最可能有效的按键
                 key = 'Page_Down' if command == "page_down" else 'Page_Up'
@@ -213,7 +374,7 @@ class SimpleMediaController:
                                     capture_output=True, text=True, timeout=1, env=env)
                 if result.returncode == 0:
                     print(f"使用 {key} 按键翻页成功")
-                    return
+                    return True
                 else:
                     print(f"使用 {key} 按键翻页失败: {result.stderr}")
                     
@@ -234,6 +395,7 @@ class SimpleMediaController:
                     print(f"文档控制错误: {e}")
             except Exception as e:
                 print(f"文档控制出现未知错误: {e}")
+            return False
     
     def get_video_status(self):
         """获取视频播放状态"""
@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import deque
+
+from metrics import MEDIA_OPERATIONS
+from tracing import TRACER
+
+# 各媒体操作的默认超时（秒）：超时后立即以 timeout 回调调用方；控制器调用本身无法中断，返回前不执行后续操作
+OPERATION_TIMEOUTS = {
+    'open_pdf': 10.0,
+    'play_video': 5.0,
+    'stop_video': 3.0,
+    'control_document': 2.0,
+    'seek': 2.0,
+}
+DEFAULT_TIMEOUT = 3.0
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMED_OUT = "timeout"
+CANCELLED = "cancelled"
+
+
+class MediaOperation:
+    """提交给 MediaExecutor 的一次媒体操作"""
+
+    def __init__(self, executor, name, args, timeout, group, trace, cancellable):
+        self.executor = executor
+        self.name = name  # 媒体控制器的方法名，例如 "play_video"
+        self.args = args
+        self.timeout = timeout
+        self.group = group  # 同组的新操作会取消尚未开始的旧操作
+        self.trace = trace
+        self.cancellable = cancellable  # 为 True 时以 cancelled=Event 关键字参数调用，供操作中途检查
+        self.cancelled = threading.Event()
+        self.state = PENDING
+        self.result = None
+        self.error = None
+        self.submit_time = time.time()
+        self.start_time = None
+        self.done_time = None
+        self._done = threading.Event()
+        self._callbacks = []
+
+    @property
+    def ok(self):
+        """正常完成且结果不为假"""
+        return self.state == DONE and self.result is not False and self.result is not None
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """等待操作结束（含超时、取消），返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """取消操作：未开始的直接移出队列；正在执行的只设置 cancelled，由操作自行检查"""
+        return self.executor.cancel(self)
+
+    def add_done_callback(self, callback):
+        """操作结束后调用 callback(operation)；已结束时立即调用"""
+        with self.executor.cond:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _run_callbacks(self):
+        for callback in self._callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"媒体操作回调出错: {e}")
+        self._callbacks = []
+
+    def __repr__(self):
+        return f"MediaOperation({self.name}, state={self.state})"
+
+
+class MediaExecutor:
+    """媒体控制器的专用执行器：操作按提交顺序在一个执行线程中串行执行，调用方立即返回
+
+    每个操作有超时：超时的操作立即以 timeout 结束并回调（cancellable 的操作同时收到取消请求），结果被丢弃。
+    媒体控制器不是线程安全的，超时的调用返回之前不会在同一控制器上开始下一个操作；
+    这期间排队时间超过自身超时的操作以 timeout 结束，不再执行。
+    """
+
+    def __init__(self, target, timeouts=None):
+        self.target = target
+        self.timeouts = dict(OPERATION_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.cond = threading.Condition()
+        self._queue = deque()
+        self._running = None  # 正在执行的操作（超时后仍保留，直到控制器调用返回）
+        self.closed = False
+        self.hung_count = 0  # 超时的调用次数
+        self._worker = threading.Thread(target=self._worker_loop, name="media-executor", daemon=True)
+        self._worker.start()
+        self._watchdog = threading.Thread(target=self._watchdog_loop, name="media-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def submit(self, name, *args, timeout=None, on_done=None, group=None, trace=None, cancellable=False):
+        """提交操作 target.name(*args)，返回 MediaOperation；group 相同的未开始操作会被取消（只保留最新的）"""
+        operation = MediaOperation(self, name, args, timeout or self.timeouts.get(name, DEFAULT_TIMEOUT),
+                                   group, trace, cancellable)
+        if on_done is not None:
+            operation._callbacks.append(on_done)
+        superseded = []
+        rejected = False
+        with self.cond:
+            if self.closed:
+                self._finish(operation, CANCELLED)
+                rejected = True
+            else:
+                if group is not None:
+                    superseded = [op for op in self._queue if op.group == group]
+                    for op in superseded:
+                        self._queue.remove(op)
+                        self._finish(op, CANCELLED)
+                self._queue.append(operation)
+                self.cond.notify_all()
+        for op in superseded:
+            op._run_callbacks()
+        if rejected:
+            operation._run_callbacks()
+        return operation
+
+    def cancel(self, operation):
+        """取消操作，返回是否已取消（正在执行的操作只发出取消请求，返回 False）"""
+        with self.cond:
+            if operation.state == RUNNING:
+                operation.cancelled.set()
+                return False
+            if operation.state != PENDING:
+                return False
+            self._queue.remove(operation)
+            self._finish(operation, CANCELLED)
+        operation._run_callbacks()
+        return True
+
+    def _finish(self, operation, state, result=None, error=None):
+        """在锁内调用：记录结果，回调由调用方在锁外执行"""
+        operation.state = state
+        operation.result = result
+        operation.error = error
+        operation.done_time = time.time()
+        if state in (CANCELLED, TIMED_OUT):
+            operation.cancelled.set()
+        operation._done.set()
+        MEDIA_OPERATIONS.labels(operation.name, state).inc()
+        if operation.start_time is not None:
+            TRACER.add_span(f"media.{operation.name}", operation.trace, operation.start_time,
+                            operation.done_time, {'state': state})
+
+    def _worker_loop(self):
+        while True:
+            with self.cond:
+                while not self._queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                operation = self._queue.popleft()
+                operation.state = RUNNING
+                operation.start_time = time.time()
+                self._running = operation
+                self.cond.notify_all()
+
+            kwargs = {'cancelled': operation.cancelled} if operation.cancellable else {}
+            result, error = None, None
+            try:
+                result = getattr(self.target, operation.name)(*operation.args, **kwargs)
+            except Exception as e:
+                error = e
+                print(f"媒体操作 {operation.name} 出错: {e}")
+
+            with self.cond:
+                # 看门狗已判定超时的操作：结果丢弃
+                late = operation.state != RUNNING
+                self._running = None
+                if not late:
+                    self._finish(operation, FAILED if error else DONE, result, error)
+                self.cond.notify_all()
+            if late:
+                print(f"媒体操作 {operation.name} 在超时后才结束，结果已丢弃")
+            else:
+                operation._run_callbacks()
+
+    def _watchdog_loop(self):
+        while True:
+            expired = []
+            with self.cond:
+                if self.closed:
+                    return
+                now = time.time()
+                deadlines = []
+                operation = self._running
+                if operation is not None and operation.state == RUNNING:
+                    deadline = operation.start_time + operation.timeout
+                    if deadline <= now:
+                        # 超时：调用方立即得到结果，执行线程仍在控制器调用中，返回后才继续处理队列
+                        self._finish(operation, TIMED_OUT)
+                        self.hung_count += 1
+                        expired.append(operation)
+                    else:
+                        deadlines.append(deadline)
+                if operation is not None and operation.state != RUNNING:
+                    # 执行线程卡在已超时的调用中：排队时间超过超时的操作不再执行
+                    for op in list(self._queue):
+                        deadline = op.submit_time + op.timeout
+                        if deadline <= now:
+                            self._queue.remove(op)
+                            self._finish(op, TIMED_OUT)
+                            expired.append(op)
+                        else:
+                            deadlines.append(deadline)
+                if not expired:
+                    self.cond.wait(min(deadlines) - now if deadlines else None)
+                    continue
+            for op in expired:
+                print(f"媒体操作 {op.name} 超时 ({op.timeout:.1f}s)")
+                op._run_callbacks()
+
+    def pending_count(self):
+        with self.cond:
+            return len(self._queue)
+
+    def close(self):
+        """取消未开始的操作并停止执行线程（不等待正在执行的操作）"""
+        with self.cond:
+            self.closed = True
+            pending = list(self._queue)
+            self._queue.clear()
+            for operation in pending:
+                self._finish(operation, CANCELLED)
+            if self._running is not None:
+                self._running.cancelled.set()
+            self.cond.notify_all()
+        for operation in pending:
+            operation._run_callbacks()
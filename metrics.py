@@ -0,0 +1,264 @@
+import bisect
+import os
+import threading
+import time
+
+# 阶段耗时直方图的桶上限（秒）：覆盖 0.5ms 的绘制到数百毫秒的推理卡顿
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _CounterValue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf 桶
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """with metric.time(): ... 记录代码块耗时"""
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metric:
+    """带标签的指标；没有标签时直接调用 inc()/observe() 等方法"""
+
+    type_name = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # 没有标签的指标从 0 开始导出，便于告警规则区分“为0”和“不存在”
+            self.labels()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, values, child):
+        """一个子指标的 [(后缀, 附加标签, 值)]"""
+        return [("", (), child.value)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in sorted(self._children.items()):
+            for suffix, extra, value in self._samples(values, child):
+                lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} "
+                             f"{_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self, values, child):
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            samples.append(("_bucket", (("le", _format_value(float(bound))),), cumulative))
+        samples.append(("_sum", (), total))
+        samples.append(("_count", (), cumulative))
+        return samples
+
+
+class ThreadCpuCollector:
+    """从 /proc/self/task 读取每个线程的用户态/内核态CPU时间（只在被抓取时读取，不占用热路径）"""
+
+    name = "eye_remote_thread_cpu_seconds_total"
+
+    def __init__(self, task_dir="/proc/self/task"):
+        self.task_dir = task_dir
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def read(self):
+        """返回 [(线程名, tid, 用户态秒数, 内核态秒数)]；不支持 /proc 的平台返回空列表"""
+        # Python 线程名比内核 comm（截断为15字节）更好辨认
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        threads = []
+        try:
+            tids = os.listdir(self.task_dir)
+        except OSError:
+            return threads
+        for tid in tids:
+            try:
+                with open(os.path.join(self.task_dir, tid, "stat")) as f:
+                    stat = f.read()
+            except OSError:
+                # 线程已退出
+                continue
+            # comm 字段在括号内且可能包含空格，从最后一个右括号之后开始分割
+            comm = stat[stat.find("(") + 1:stat.rfind(")")]
+            fields = stat[stat.rfind(")") + 2:].split()
+            utime, stime = int(fields[11]), int(fields[12])
+            threads.append((names.get(int(tid), comm), tid,
+                            utime / self.clock_ticks, stime / self.clock_ticks))
+        return threads
+
+    def render(self):
+        lines = [f"# HELP {self.name} 每个线程消耗的CPU时间（秒）",
+                 f"# TYPE {self.name} counter"]
+        for name, tid, user, system in sorted(self.read()):
+            for mode, seconds in (("user", user), ("system", system)):
+                labels = _format_labels(("thread", "tid", "mode"), (name, tid, mode))
+                lines.append(f"{self.name}{labels} {_format_value(seconds)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._collectors = []
+
+    def register(self, collector):
+        """注册带 render() 方法的指标或采集器，返回该对象"""
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for collector in self._collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# 各处理阶段的耗时：capture / detection / decision / command / render / encode / paint（Qt 窗口采集到显示）
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "eye_remote_stage_seconds", "各处理阶段的耗时（秒）", ("stage",)))
+FRAMES_PROCESSED = REGISTRY.register(Counter(
+    "eye_remote_frames_processed_total", "完成识别的帧数（rate() 即当前识别帧率）"))
+FRAMES_DROPPED = REGISTRY.register(Counter(
+    "eye_remote_frames_dropped_total",
+    "被丢弃的帧数：capture 未被识别就被新帧覆盖，encode 编码器忙时跳过，preview 预览时钟落后时跳过，"
+    "gui Qt 界面线程来不及显示被新帧覆盖",
+    ("stage",)))
+for _stage in ("capture", "encode", "preview", "gui"):
+    FRAMES_DROPPED.labels(_stage)
+VIEWERS = REGISTRY.register(Gauge(
+    "eye_remote_viewers", "当前的 MJPEG 推流观看者数"))
+JPEG_BYTES_SENT = REGISTRY.register(Counter(
+    "eye_remote_jpeg_bytes_sent_total", "发送给观看者的JPEG字节数（含 /video_feed 快照）"))
+COMMANDS = REGISTRY.register(Counter(
+    "eye_remote_commands_total", "执行完成的命令数", ("kind", "name", "source", "ok")))
+THREAD_CPU = REGISTRY.register(ThreadCpuCollector())
+MEDIA_OPERATIONS = REGISTRY.register(Counter(
+    "eye_remote_media_operations_total", "媒体执行器结束的操作数：done / failed / timeout / cancelled",
+    ("operation", "state")))
+PREVIEW_BYTES = REGISTRY.register(Gauge(
+    "eye_remote_preview_bytes", "视频预览预读缓冲中JPEG占用的字节数（与视频长度无关）"))
@@ -0,0 +1,377 @@
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+from media_controller_simple_fallback import SimpleMediaController
+
+
+class MpvIpcError(Exception):
+    """mpv JSON IPC 命令失败、超时或连接断开"""
+
+
+class MpvIpcClient:
+    """mpv --input-ipc-server 的 JSON IPC 客户端
+
+    命令按 request_id 匹配回复，可在多个线程中同时调用；事件（property-change 等）在读取线程中交给 on_event。
+    on_event 中不能调用 command()，否则读取线程会等待自己。
+    """
+
+    def __init__(self, socket_path, on_event=None, on_disconnect=None, timeout=1.0):
+        self.socket_path = socket_path
+        self.on_event = on_event
+        self.on_disconnect = on_disconnect
+        self.timeout = timeout
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.connected = True
+        self.cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._replies = {}
+        self._next_request_id = 1
+        self._next_observe_id = 1
+        self._reader = threading.Thread(target=self._read_loop, name="mpv-ipc", daemon=True)
+        self._reader.start()
+
+    def command(self, *args, timeout=None):
+        """发送命令并等待回复，返回 data 字段；失败抛出 MpvIpcError"""
+        with self.cond:
+            if not self.connected:
+                raise MpvIpcError("未连接到 mpv")
+            request_id = self._next_request_id
+            self._next_request_id += 1
+        payload = json.dumps({'command': list(args), 'request_id': request_id}) + "\n"
+        try:
+            with self._send_lock:
+                self.sock.sendall(payload.encode('utf-8'))
+        except OSError as e:
+            self._disconnected()
+            raise MpvIpcError(f"发送失败: {e}")
+
+        with self.cond:
+            self.cond.wait_for(lambda: request_id in self._replies or not self.connected,
+                               timeout if timeout is not None else self.timeout)
+            reply = self._replies.pop(request_id, None)
+        if reply is None:
+            raise MpvIpcError(f"{args[0]} 无回复" if self.connected else "mpv 连接已断开")
+        if reply.get('error') != "success":
+            raise MpvIpcError(f"{args[0]}: {reply.get('error')}")
+        return reply.get('data')
+
+    def get_property(self, name):
+        return self.command("get_property", name)
+
+    def set_property(self, name, value):
+        return self.command("set_property", name, value)
+
+    def observe_property(self, name):
+        """订阅属性变化，mpv 会立即推送一次当前值，之后每次变化推送 property-change 事件"""
+        with self.cond:
+            observe_id = self._next_observe_id
+            self._next_observe_id += 1
+        self.command("observe_property", observe_id, name)
+        return observe_id
+
+    def _read_loop(self):
+        buffer = b""
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    if not line.strip():
+                        continue
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'event' in message:
+                        if self.on_event:
+                            try:
+                                self.on_event(message)
+                            except Exception as e:
+                                print(f"处理 mpv 事件出错: {e}")
+                    elif 'request_id' in message:
+                        with self.cond:
+                            self._replies[message['request_id']] = message
+                            self.cond.notify_all()
+        except OSError:
+            pass
+        self._disconnected()
+
+    def _disconnected(self):
+        with self.cond:
+            if not self.connected:
+                return
+            self.connected = False
+            self.cond.notify_all()
+        if self.on_disconnect:
+            self.on_disconnect()
+
+    def close(self):
+        with self.cond:
+            self.connected = False
+            self.cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class MpvMediaController(SimpleMediaController):
+    """常驻 mpv 进程 + JSON IPC 的媒体控制器
+
+    mpv 只启动一次（--idle，播放结束或 stop 后进程保留），播放、暂停、跳转、加载都通过 Unix 套接字发送命令，
+    暂停只是设置 pause 属性，音频输出和窗口不受影响，耗时为毫秒级。播放状态通过订阅属性变化由 mpv 推送。
+    warm_start 为 True 时 load_video/load_playlist 立即启动 mpv 并暂停在第一帧，之后的播放只是取消暂停；
+    播放列表的下一项由 mpv 预先打开（--prefetch-playlist），切换时没有停顿。
+    文档控制沿用 SimpleMediaController。
+
+    socket_path 可指定为测试用的模拟 IPC 服务器；spawn 为 False 时不启动 mpv，只连接 socket_path。
+    """
+
+    OBSERVED_PROPERTIES = ("pause", "idle-active", "eof-reached", "path")
+    START_TIMEOUT = 3.0  # 等待 mpv 创建 IPC 套接字（秒）
+
+    def __init__(self, socket_path=None, spawn=True, mpv_args=None, warm_start=True):
+        super().__init__()
+        print("使用 mpv IPC 媒体控制器")
+        self.socket_path = socket_path or os.path.join(tempfile.gettempdir(),
+                                                       f"ai-eye-remote-mpv-{os.getpid()}.sock")
+        self.spawn = spawn
+        self.warm_start = warm_start
+        self.mpv_args = list(mpv_args) if mpv_args is not None else ['--vf=scale=480:360']
+        self.client = None
+        self.properties = {}  # mpv 推送的属性当前值
+        self.status_listeners = []  # 播放状态变化回调 callback(playing)
+        self._lock = threading.Lock()
+        self._last_status = False
+
+    def add_status_listener(self, callback):
+        """注册播放状态变化回调，在 IPC 读取线程中调用，需尽快返回"""
+        self.status_listeners.append(callback)
+
+    def _start_mpv(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        try:
+            self.video_process = subprocess.Popen([
+                'mpv',
+                '--no-terminal',
+                '--idle=yes',
+                '--keep-open=yes',
+                '--force-window=yes',
+                '--prefetch-playlist=yes',
+                '--gapless-audio=weak',
+                f'--input-ipc-server={self.socket_path}',
+            ] + self.mpv_args)
+        except FileNotFoundError:
+            print("请安装mpv: sudo apt install mpv")
+            return False
+        print(f"mpv 已启动 (pid={self.video_process.pid})")
+        return True
+
+    def _ensure_connected(self):
+        """确保 mpv 在运行且 IPC 已连接（mpv 被关闭后自动重新启动）"""
+        with self._lock:
+            if self.client is not None and self.client.connected:
+                return True
+            if self.spawn and (self.video_process is None or self.video_process.poll() is not None):
+                if not self._start_mpv():
+                    return False
+            deadline = time.time() + self.START_TIMEOUT
+            while True:
+                try:
+                    self.client = MpvIpcClient(self.socket_path, on_event=self._on_event,
+                                               on_disconnect=self._on_disconnect)
+                    break
+                except OSError:
+                    if time.time() > deadline or (self.video_process is not None and
+                                                  self.video_process.poll() is not None):
+                        print(f"无法连接 mpv IPC: {self.socket_path}")
+                        self.client = None
+                        return False
+                    time.sleep(0.02)
+            self.properties = {}
+            try:
+                for name in self.OBSERVED_PROPERTIES:
+                    self.client.observe_property(name)
+            except MpvIpcError as e:
+                print(f"订阅 mpv 属性失败: {e}")
+            return True
+
+    def _on_event(self, message):
+        if message.get('event') == "property-change":
+            name, value = message.get('name'), message.get('data')
+            self.properties[name] = value
+            if name == "path" and value in self.playlist:
+                # 播放列表自动前进或 playlist-next 后跟踪当前项
+                self.current_video = value
+            self._status_changed()
+
+    def _on_disconnect(self):
+        # mpv 退出或窗口被关闭
+        self.properties = {}
+        self.video_playing = False
+        self.video_paused = False
+        self._status_changed()
+
+    def _status_changed(self):
+        playing = self.get_video_status()
+        if playing == self._last_status:
+            return
+        self._last_status = playing
+        for callback in list(self.status_listeners):
+            try:
+                callback(playing)
+            except Exception as e:
+                print(f"播放状态回调出错: {e}")
+
+    def _command(self, *args):
+        """发送 IPC 命令，失败时打印原因并返回 None"""
+        if not self._ensure_connected():
+            return None
+        try:
+            result = self.client.command(*args)
+            return True if result is None else result
+        except MpvIpcError as e:
+            print(f"mpv 命令失败: {e}")
+            return None
+
+    def _load_into_player(self):
+        """把播放列表交给 mpv，从 current_video 开始，保持暂停"""
+        # pause 属性在切换文件后保持，先暂停再加载（不用 loadfile 的选项参数，其位置随 mpv 版本变化）
+        if self._command("set_property", "pause", True) is None:
+            return False
+        for index, path in enumerate(self.playlist):
+            if self._command("loadfile", path, "replace" if index == 0 else "append") is None:
+                return False
+        start = self.playlist.index(self.current_video)
+        if start > 0:
+            self._command("set_property", "playlist-pos", start)
+        return True
+
+    def _preload(self):
+        """预热：mpv 已在运行或开启 warm_start 时立即加载，暂停在第一帧"""
+        if self.warm_start or (self.client is not None and self.client.connected):
+            start = time.perf_counter()
+            if self._load_into_player():
+                print(f"视频已预加载，暂停在第一帧 ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def load_video(self, video_path):
+        """记录视频路径并预加载"""
+        if not super().load_video(video_path):
+            return False
+        self._preload()
+        return True
+
+    def load_playlist(self, video_paths):
+        """加载播放列表并预加载第一项，mpv 会在播放时预先打开下一项"""
+        if not super().load_playlist(video_paths):
+            return False
+        self._preload()
+        return True
+
+    def next_video(self):
+        """播放列表下一项（保持当前的播放/暂停状态）"""
+        return self._command("playlist-next") is not None
+
+    def previous_video(self):
+        """播放列表上一项"""
+        return self._command("playlist-prev") is not None
+
+    def play_video(self):
+        """播放视频：已预加载时只是取消暂停；当前文件不在播放列表中（或已停止）时先加载"""
+        if not self.current_video:
+            return False
+        if not self._ensure_connected():
+            return False
+        if self.properties.get('path') not in self.playlist or self.properties.get('idle-active'):
+            if not self._load_into_player():
+                return False
+        if self._command("set_property", "pause", False) is None:
+            return False
+        self.video_playing = True
+        self.video_paused = False
+        print("开始播放视频 (mpv IPC)")
+        return True
+
+    def pause_video(self):
+        """暂停视频（只设置 pause 属性，进程、音频设备和窗口保持不变）"""
+        if self.client is None or not self.client.connected:
+            self.video_playing = False
+            return True
+        if self._command("set_property", "pause", True) is None:
+            return False
+        self.video_paused = True
+        print("视频已暂停")
+        return True
+
+    def resume_video(self):
+        """恢复视频播放"""
+        if self.client is None or not self.client.connected:
+            return self.play_video()
+        if self._command("set_property", "pause", False) is None:
+            return False
+        self.video_playing = True
+        self.video_paused = False
+        print("视频已恢复播放")
+        return True
+
+    def stop_video(self):
+        """停止播放，mpv 进程保留（回到空闲状态），下次播放无需重新启动"""
+        if self.client is not None and self.client.connected:
+            self._command("stop")
+        self.video_playing = False
+        self.video_paused = False
+        print("视频停止")
+        return True
+
+    def seek(self, seconds, mode="relative"):
+        """跳转：mode 为 relative（相对当前位置，秒）、absolute（绝对时间，秒）或 absolute-percent"""
+        return self._command("seek", seconds, mode) is not None
+
+    def get_property(self, name):
+        """查询 mpv 属性，例如 time-pos、duration；失败返回 None"""
+        if self.client is None or not self.client.connected:
+            return None
+        try:
+            return self.client.get_property(name)
+        except MpvIpcError:
+            return None
+
+    def get_video_status(self):
+        """播放状态：由 mpv 推送的属性得出，不查询进程"""
+        if self.client is None or not self.client.connected:
+            return False
+        props = self.properties
+        return (props.get('path') is not None and not props.get('pause', True) and
+                not props.get('idle-active', False) and not props.get('eof-reached', False))
+
+    def close(self):
+        """退出 mpv 并清理套接字，然后释放文档和 X 连接"""
+        if self.client is not None and self.client.connected:
+            try:
+                self.client.command("quit", timeout=0.5)
+            except MpvIpcError:
+                pass
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        if self.video_process is not None:
+            try:
+                self.video_process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.video_process.kill()
+                self.video_process.wait()
+            self.video_process = None
+        if self.spawn and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._close_documents()
@@ -0,0 +1,190 @@
+import queue
+import re
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+
+class PdfRenderError(Exception):
+    """pdftoppm/pdfinfo 不可用或渲染失败"""
+
+
+def pdf_page_count(path, timeout=5.0):
+    """用 pdfinfo 读取页数"""
+    try:
+        result = subprocess.run(['pdfinfo', path], capture_output=True, timeout=timeout)
+    except FileNotFoundError:
+        raise PdfRenderError("未找到 pdfinfo，请安装: sudo apt install poppler-utils")
+    except subprocess.TimeoutExpired:
+        raise PdfRenderError(f"pdfinfo 超时: {path}")
+    match = re.search(rb'^Pages:\s+(\d+)', result.stdout, re.MULTILINE)
+    if result.returncode != 0 or match is None:
+        raise PdfRenderError(f"无法读取PDF: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return int(match.group(1))
+
+
+def render_pdf_page(path, page, scale_to=1280, timeout=10.0):
+    """用 pdftoppm 渲染一页（页码从1开始），返回 BGR 图像；scale_to 为长边像素数
+
+    输出 PPM 到标准输出，不经过临时文件，也不做 PNG 压缩。
+    """
+    command = ['pdftoppm', '-f', str(page), '-l', str(page), '-singlefile',
+               '-scale-to', str(scale_to), path, '-']
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout)
+    except FileNotFoundError:
+        raise PdfRenderError("未找到 pdftoppm，请安装: sudo apt install poppler-utils")
+    except subprocess.TimeoutExpired:
+        raise PdfRenderError(f"渲染第 {page} 页超时")
+    if result.returncode != 0 or not result.stdout:
+        raise PdfRenderError(f"渲染第 {page} 页失败: {result.stderr.decode('utf-8', 'replace').strip()}")
+    image = cv2.imdecode(np.frombuffer(result.stdout, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise PdfRenderError(f"无法解码第 {page} 页")
+    return image
+
+
+class PdfDocument:
+    """进程内的PDF文档：渲染的页面保存在 LRU 缓存中，后台线程预先渲染当前页前后的页面
+
+    翻页在缓存命中时只是取出已渲染的图像；页面变化后通知监听者（Qt 窗口、流媒体服务器）显示。
+    """
+
+    def __init__(self, path, cache_pages=12, prefetch=2, scale_to=1280, renderer=render_pdf_page):
+        self.path = path
+        self.cache_pages = max(cache_pages, 2 * prefetch + 1)
+        self.prefetch = prefetch
+        self.scale_to = scale_to
+        self.renderer = renderer
+        self.page_count = pdf_page_count(path)
+        self.current_page = 1
+
+        self.cond = threading.Condition()
+        self._cache = OrderedDict()  # 页码 -> 图像，最近使用的在末尾
+        self._rendering = set()  # 正在渲染的页码，避免翻页和预取重复渲染同一页
+        self._listeners = []
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.render_times = deque(maxlen=100)  # 最近的渲染耗时（毫秒）
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._prefetch_loop, name="pdf-prefetch", daemon=True)
+        self._thread.start()
+        print(f"已打开PDF: {path} ({self.page_count} 页)")
+
+    def add_page_listener(self, callback):
+        """注册页面变化回调 callback(页码, 图像)，在翻页的线程中调用"""
+        self._listeners.append(callback)
+
+    def _render(self, page):
+        start = time.perf_counter()
+        image = self.renderer(self.path, page, self.scale_to)
+        self.render_times.append((time.perf_counter() - start) * 1000)
+        return image
+
+    def _store(self, page, image):
+        with self.cond:
+            self._cache[page] = image
+            self._cache.move_to_end(page)
+            while len(self._cache) > self.cache_pages:
+                # 淘汰最久未使用的页面，但保留当前页
+                oldest = next(iter(self._cache))
+                if oldest == self.current_page:
+                    self._cache.move_to_end(oldest)
+                    oldest = next(iter(self._cache))
+                del self._cache[oldest]
+
+    def get_page(self, page):
+        """返回页面图像：缓存命中直接返回；该页正在预取时等待；否则在当前线程渲染"""
+        with self.cond:
+            if page in self._cache:
+                self._cache.move_to_end(page)
+                self.hits += 1
+                return self._cache[page]
+            self.misses += 1
+            if page in self._rendering:
+                self.cond.wait_for(lambda: page not in self._rendering)
+                if page in self._cache:
+                    return self._cache[page]
+            self._rendering.add(page)
+        try:
+            image = self._render(page)
+            self._store(page, image)
+            return image
+        finally:
+            with self.cond:
+                self._rendering.discard(page)
+                self.cond.notify_all()
+
+    def _prefetch_loop(self):
+        while True:
+            page = self._queue.get()
+            if page is None:
+                break
+            with self.cond:
+                if page in self._cache or page in self._rendering:
+                    continue
+                # 用户已翻过去的页面不再预取
+                if abs(page - self.current_page) > self.prefetch:
+                    continue
+                self._rendering.add(page)
+            try:
+                self._store(page, self._render(page))
+            except PdfRenderError as e:
+                print(f"预渲染第 {page} 页失败: {e}")
+            finally:
+                with self.cond:
+                    self._rendering.discard(page)
+                    self.cond.notify_all()
+
+    def _schedule_prefetch(self, page, direction):
+        # 按距离由近到远预取，同一距离先预取翻页方向上的页面（直接跳转时 direction 为 0，先向后）
+        step = -1 if direction < 0 else 1
+        for distance in range(1, self.prefetch + 1):
+            for neighbor in (page + step * distance, page - step * distance):
+                if 1 <= neighbor <= self.page_count:
+                    self._queue.put(neighbor)
+
+    def goto(self, page, direction=0):
+        """跳转到指定页并通知监听者，返回页面图像；页码越界时返回 None，渲染失败抛出 PdfRenderError
+
+        渲染成功后才更新 current_page，失败时仍停留在正在显示的页面。
+        """
+        if not 1 <= page <= self.page_count:
+            return None
+        image = self.get_page(page)
+        with self.cond:
+            self.current_page = page
+        self._schedule_prefetch(page, direction)
+        for callback in list(self._listeners):
+            try:
+                callback(page, image)
+            except Exception as e:
+                print(f"页面显示回调出错: {e}")
+        return image
+
+    def page_down(self):
+        return self.goto(self.current_page + 1, direction=1)
+
+    def page_up(self):
+        return self.goto(self.current_page - 1, direction=-1)
+
+    def stats(self):
+        renders = list(self.render_times)
+        return {
+            'pages': self.page_count,
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'renders': len(renders),
+            'render_avg_ms': sum(renders) / len(renders) if renders else 0.0,
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
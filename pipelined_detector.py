@@ -0,0 +1,160 @@
+import queue
+import threading
+
+from eye_detector_mediapipe import MediaPipeEyeDetector, empty_measurement
+
+
+class PipelinedEyeDetector:
+    """多实例流水线检测：K 个检测实例各自持有独立的 Face Mesh 图，帧按轮询分发并行测量
+
+    测量结果按提交顺序重新排序后，才逐帧交给唯一的状态实例（眼睛状态机、历史记录），
+    因此下游的 update_eye_state、SimpleActionController 看到的帧顺序与采集顺序一致。
+    worker_type 为 "thread" 时每个实例运行在本进程的工作线程中；为 "process" 时每个实例运行在独立子进程中。
+    """
+
+    def __init__(self, workers=2, worker_type="thread", **detector_kwargs):
+        if detector_kwargs.get('keyframe_interval', 1) > 1:
+            # 光流传播依赖相邻帧，轮询分发后每个实例看到的帧不连续
+            print("流水线模式不支持关键帧光流传播，已改为每帧推理")
+            detector_kwargs['keyframe_interval'] = 1
+        self.workers = max(1, workers)
+        self.worker_type = worker_type
+
+        if worker_type == "process":
+            from detector_worker import ProcessEyeDetector
+            self.detectors = [ProcessEyeDetector(**detector_kwargs) for _ in range(self.workers)]
+            # 状态部分在本进程中更新
+            self.state = MediaPipeEyeDetector(**detector_kwargs)
+        else:
+            self.detectors = [MediaPipeEyeDetector(**detector_kwargs) for _ in range(self.workers)]
+            # 第一个实例同时负责状态更新（测量与状态使用的字段互不重叠）
+            self.state = self.detectors[0]
+
+        self.cond = threading.Condition()
+        self._inputs = [queue.Queue() for _ in range(self.workers)]
+        self._done = {}  # 提交序号 -> 测量结果
+        self._pending = {}  # 提交序号 -> (采集序号, 帧)
+        self._next_submit = 0
+        self._next_update = 0
+        self._next_worker = 0
+        self.running = True
+
+        self.threads = []
+        for index, detector in enumerate(self.detectors):
+            thread = threading.Thread(target=self._worker_loop, args=(index, detector),
+                                      name=f"eye-detector-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _worker_loop(self, index, detector):
+        """工作线程：测量分配给自己的帧"""
+        inputs = self._inputs[index]
+        while True:
+            item = inputs.get()
+            if item is None:
+                break
+            order, frame, timestamp = item
+            try:
+                measurement = detector.measure(frame, timestamp)
+            except Exception as e:
+                # 出错的帧按未检测到人脸处理，保证后续帧仍能按顺序交付
+                print(f"检测实例 {index} 出错: {e}")
+                measurement = empty_measurement('error')
+                if timestamp is not None:
+                    measurement['timestamp'] = timestamp
+            with self.cond:
+                self._done[order] = measurement
+                self.cond.notify_all()
+
+    def in_flight(self):
+        """已提交、尚未按顺序交付的帧数"""
+        with self.cond:
+            return self._next_submit - self._next_update
+
+    def submit(self, frame, seq=None, timestamp=None):
+        """按轮询把帧分发给下一个实例，不等待结果；timestamp 为采集时间，见 MediaPipeEyeDetector.measure"""
+        with self.cond:
+            order = self._next_submit
+            self._next_submit += 1
+            self._pending[order] = (seq, frame)
+        self._inputs[self._next_worker].put((order, frame, timestamp))
+        self._next_worker = (self._next_worker + 1) % self.workers
+        return order
+
+    def collect(self, block_until=None, timeout=None):
+        """按提交顺序取出已完成的帧并更新状态，返回 [(采集序号, 帧, 检测结果)]
+
+        block_until 为提交序号时，一直等到该帧及其之前的帧全部完成（或超时）。
+        """
+        def reached():
+            return (not self.running or
+                    all(order in self._done for order in range(self._next_update, block_until + 1)))
+
+        ready = []
+        with self.cond:
+            if block_until is not None:
+                self.cond.wait_for(reached, timeout=timeout)
+            while self._next_update in self._done:
+                order = self._next_update
+                measurement = self._done.pop(order)
+                seq, frame = self._pending.pop(order)
+                self._next_update += 1
+                ready.append((seq, frame, measurement))
+        # 状态更新只在调用线程中按顺序进行
+        return [(seq, frame, self.state.update(measurement)) for seq, frame, measurement in ready]
+
+    def process(self, frame, seq=None, timestamp=None):
+        """提交一帧；在途帧数达到实例数时等待最早的一帧完成。返回按顺序完成的 [(采集序号, 帧, 检测结果)]"""
+        self.submit(frame, seq, timestamp)
+        oldest = None
+        with self.cond:
+            if self._next_submit - self._next_update > self.workers:
+                oldest = self._next_update
+        return self.collect(block_until=oldest)
+
+    def flush(self, timeout=5.0):
+        """等待所有在途帧完成并返回其结果"""
+        results = []
+        with self.cond:
+            last = self._next_submit - 1
+        if last >= 0:
+            results = self.collect(block_until=last, timeout=timeout)
+        return results
+
+    def detect_eyes_state(self, frame, timestamp=None):
+        """与单实例检测器兼容的同步接口（不做流水线）"""
+        order = self.submit(frame, timestamp=timestamp)
+        results = self.collect(block_until=order)
+        return results[-1][2] if results else None
+
+    def inference_stats(self):
+        """各实例推理统计的平均值"""
+        stats = [detector.inference_stats() for detector in self.detectors]
+        merged = {
+            'pixels': sum(s['pixels'] for s in stats) / len(stats),
+            'inference_ms': sum(s['inference_ms'] for s in stats) / len(stats),
+            'roi_fallbacks': sum(s['roi_fallbacks'] for s in stats),
+            'keyframes': sum(s['keyframes'] for s in stats),
+            'tracked': 0,
+            'keyframe_interval': 1,
+            'workers': self.workers,
+        }
+        if self.worker_type == "process":
+            merged['worker_restarts'] = sum(s['worker_restarts'] for s in stats)
+        return merged
+
+    def draw_landmarks(self, frame, detection_result):
+        self.state.draw_landmarks(frame, detection_result)
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        for inputs in self._inputs:
+            inputs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=2)
+        for detector in self.detectors:
+            detector.close()
+        if self.state not in self.detectors:
+            self.state.close()
@@ -0,0 +1,163 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from metrics import FRAMES_DROPPED, PREVIEW_BYTES
+
+PREVIEW_SIZE = (640, 480)
+PREVIEW_QUALITY = 75
+PREVIEW_READ_AHEAD = 8  # 预读缓冲的帧数
+DEFAULT_FPS = 25.0  # 视频没有有效帧率信息时使用
+
+
+class PreviewError(Exception):
+    """视频文件不存在或无法打开"""
+
+
+class PreviewPlayer:
+    """视频预览的播放引擎：按视频自身的帧率和墙上时钟发布帧，与观看者数量和请求频率无关
+
+    解码线程循环解码整个文件，缩放并编码为JPEG后放入容量固定的预读缓冲（内存占用与视频长度无关）；
+    时钟线程按源帧率从缓冲中取帧交给 publish(jpeg)，所有观看者看到的是同一个按时播放的画面。
+    时钟落后（解码跟不上）时让解码线程跳过相应的帧（只 grab 不解码），而不是放慢播放。
+    未激活时时钟停止，解码线程在缓冲满后阻塞。
+    """
+
+    def __init__(self, video_path, publish, read_ahead=PREVIEW_READ_AHEAD, size=PREVIEW_SIZE,
+                 quality=PREVIEW_QUALITY):
+        if not os.path.exists(video_path):
+            raise PreviewError(f"Video file not found: {video_path}")
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise PreviewError(f"cannot open {video_path}")
+        self.video_path = video_path
+        self.publish = publish
+        self.size = size
+        self.quality = quality
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 1.0 <= fps <= 240.0 else DEFAULT_FPS
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        self.lock = threading.Lock()
+        self._buffer = queue.Queue(maxsize=max(read_ahead, 1))
+        self._skip = 0  # 时钟落后时要求解码线程跳过的帧数
+        self.active = threading.Event()
+        self.running = True
+        # 统计
+        self.buffered_bytes = 0
+        self.published = 0
+        self.dropped = 0
+        self.underruns = 0  # 到点时缓冲为空的次数
+        self.loops = 0  # 播放到结尾后从头开始的次数
+
+        self._decoder = threading.Thread(target=self._decode_loop, name="preview-decoder", daemon=True)
+        self._clock = threading.Thread(target=self._clock_loop, name="preview-clock", daemon=True)
+        self._decoder.start()
+        self._clock.start()
+
+    def set_active(self, active):
+        """开始/停止按时钟发布帧（重新开始时从缓冲中的下一帧继续）"""
+        if active:
+            self.active.set()
+        else:
+            self.active.clear()
+
+    def _reopen(self):
+        """播放到结尾后重新打开文件（比 CAP_PROP_POS_FRAMES 跳回开头更可靠）"""
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.video_path)
+        return self.cap.isOpened()
+
+    def _decode_loop(self):
+        decoded_since_open = 0
+        try:
+            while self.running:
+                with self.lock:
+                    skip = self._skip
+                    self._skip = 0
+                for _ in range(skip):
+                    # 跳过的帧只读取数据包，不解码
+                    if not self.cap.grab():
+                        break
+                ret, frame = self.cap.read()
+                if not ret:
+                    if decoded_since_open == 0 or not self._reopen():
+                        print(f"Error loading video preview: no frames in {self.video_path}")
+                        break
+                    self.loops += 1
+                    decoded_since_open = 0
+                    continue
+                decoded_since_open += 1
+                frame = cv2.resize(frame, self.size)
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ret:
+                    continue
+                jpeg = buffer.tobytes()
+                while self.running:
+                    try:
+                        self._buffer.put(jpeg, timeout=0.5)
+                    except queue.Full:
+                        continue
+                    with self.lock:
+                        self.buffered_bytes += len(jpeg)
+                    break
+        finally:
+            self.cap.release()
+
+    def _clock_loop(self):
+        interval = 1.0 / self.fps
+        next_time = None
+        while self.running:
+            if not self.active.is_set():
+                next_time = None
+                self.active.wait(0.5)
+                continue
+            try:
+                jpeg = self._buffer.get(timeout=0.5)
+            except queue.Empty:
+                self.underruns += 1
+                continue
+            with self.lock:
+                self.buffered_bytes -= len(jpeg)
+            PREVIEW_BYTES.set(self.buffered_bytes + len(jpeg))
+
+            now = time.perf_counter()
+            if next_time is None:
+                next_time = now
+            behind = int((now - next_time) / interval)
+            if behind > 0:
+                # 落后整帧：让解码线程跳过，时钟跟上墙上时间
+                with self.lock:
+                    self._skip += behind
+                self.dropped += behind
+                FRAMES_DROPPED.labels("preview").inc(behind)
+                next_time += behind * interval
+            elif next_time > now:
+                time.sleep(next_time - now)
+            if not self.running or not self.active.is_set():
+                continue
+            self.publish(jpeg)
+            self.published += 1
+            next_time += interval
+
+    def stats(self):
+        return {
+            'fps': self.fps,
+            'frame_count': self.frame_count,
+            'published': self.published,
+            'dropped': self.dropped,
+            'underruns': self.underruns,
+            'loops': self.loops,
+            'buffered_frames': self._buffer.qsize(),
+            'buffered_bytes': self.buffered_bytes,
+        }
+
+    def close(self):
+        self.running = False
+        self.active.set()
+        self._clock.join(timeout=1)
+        self._decoder.join(timeout=1)
+        PREVIEW_BYTES.set(0)
@@ -0,0 +1,250 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from action_controller_simple import SimpleActionController, ControlMode
+from eye_detector_mediapipe import MediaPipeEyeDetector
+
+# 会话目录中的文件：
+#   meta.json     - 帧尺寸、检测器配置、帧数、丢弃帧数
+#   frames.bin    - 原始 BGR 帧按顺序首尾相接，可直接 np.memmap
+#   index.bin     - 每帧一条 (采集序号, 采集时间) 定长记录，与 frames.bin 中的帧一一对应
+#   results.jsonl - 每帧一行：检测结果、动作命令、处理时的控制模式
+META_FILE = "meta.json"
+FRAMES_FILE = "frames.bin"
+INDEX_FILE = "index.bin"
+RESULTS_FILE = "results.jsonl"
+
+INDEX_DTYPE = np.dtype([('seq', '<i8'), ('timestamp', '<f8')])
+
+# 回放时逐帧比较的字段：只比较决定动作的字段，耗时、帧率等随运行环境变化的字段不比较
+COMPARED_FIELDS = ('face_detected', 'eyes_closed', 'is_blinking', 'eye_state', 'is_gazing',
+                   'vertical_movement', 'eye_center')
+EAR_FIELDS = ('left_ear', 'right_ear')
+
+
+def _json_default(value):
+    """numpy 标量（如 np.bool_）转成 Python 类型"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SessionRecorder:
+    """录制识别会话：原始帧和采集时间、每帧的检测结果和动作命令
+
+    写盘在后台线程中进行，识别线程只做入队；写盘跟不上时丢弃帧并计数（此时会话无法完整回放）。
+    """
+
+    def __init__(self, path, detector_config=None, max_pending_frames=60):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.detector_config = dict(detector_config or {})
+        self.max_pending_frames = max_pending_frames
+        self.frame_shape = None
+        self.frame_count = 0
+        self.dropped_frames = 0
+        self.started_at = time.time()
+
+        self._frames_file = open(os.path.join(path, FRAMES_FILE), "wb")
+        self._index_file = open(os.path.join(path, INDEX_FILE), "wb")
+        self._results_file = open(os.path.join(path, RESULTS_FILE), "w", encoding="utf-8")
+        self._queue = queue.Queue()
+        self._pending_frames = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer_loop, name="session-recorder", daemon=True)
+        self._thread.start()
+        print(f"正在录制会话: {path}")
+
+    def record_frame(self, seq, timestamp, frame):
+        """录制一帧原始画面（在检测之前调用）"""
+        if self.frame_shape is None:
+            self.frame_shape = frame.shape
+        elif frame.shape != self.frame_shape:
+            print(f"帧尺寸变化 {self.frame_shape} -> {frame.shape}，不再录制")
+            self.dropped_frames += 1
+            return
+        with self._lock:
+            if self._pending_frames >= self.max_pending_frames:
+                self.dropped_frames += 1
+                return
+            self._pending_frames += 1
+        # 写盘在后台进行，复制一份避免帧在写入前被修改
+        self._queue.put(("frame", (seq, timestamp, frame.copy())))
+
+    def record_result(self, seq, detection_result, command, mode):
+        """录制一帧的检测结果、动作命令和当时的控制模式"""
+        record = {'seq': seq, 'mode': mode, 'command': command, 'result': detection_result}
+        self._queue.put(("result", json.dumps(record, default=_json_default, ensure_ascii=False)))
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "frame":
+                seq, timestamp, frame = payload
+                self._frames_file.write(frame.tobytes())
+                self._index_file.write(np.array([(seq, timestamp)], dtype=INDEX_DTYPE).tobytes())
+                self.frame_count += 1
+                with self._lock:
+                    self._pending_frames -= 1
+            else:
+                self._results_file.write(payload + "\n")
+
+    def close(self):
+        """写完队列中剩余的数据并保存元数据"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        for f in (self._frames_file, self._index_file, self._results_file):
+            f.close()
+        meta = {
+            'version': 1,
+            'frame_shape': list(self.frame_shape) if self.frame_shape else None,
+            'dtype': 'uint8',
+            'frames': self.frame_count,
+            'dropped_frames': self.dropped_frames,
+            'started_at': self.started_at,
+            'detector': self.detector_config,
+        }
+        with open(os.path.join(self.path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        print(f"会话录制完成: {self.frame_count} 帧，丢弃 {self.dropped_frames} 帧")
+
+
+class SessionRecording:
+    """读取录制的会话：帧通过 np.memmap 按需映射，不整体读入内存"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.index = np.fromfile(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE)
+        shape = tuple(self.meta['frame_shape'] or ())
+        frames_path = os.path.join(path, FRAMES_FILE)
+        count = len(self.index)
+        if shape and count:
+            count = min(count, os.path.getsize(frames_path) // int(np.prod(shape)))
+            self.frames = np.memmap(frames_path, dtype=np.uint8, mode="r", shape=(count,) + shape)
+        else:
+            self.frames = np.empty((0,) + shape, dtype=np.uint8)
+        self.index = self.index[:count]
+
+        self.results = {}
+        with open(os.path.join(path, RESULTS_FILE), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.results[record['seq']] = record
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def detector_config(self):
+        return dict(self.meta.get('detector') or {})
+
+
+def _diff_result(golden, result, ear_tolerance):
+    """比较一帧的检测结果，返回不一致字段的列表 [(字段, 录制值, 回放值)]"""
+    diffs = []
+    for field in COMPARED_FIELDS:
+        expected, actual = golden.get(field), result.get(field)
+        if isinstance(actual, tuple):
+            actual = list(actual)
+        if hasattr(actual, 'item'):
+            actual = actual.item()
+        if expected != actual:
+            diffs.append((field, expected, actual))
+    for field in EAR_FIELDS:
+        expected, actual = float(golden.get(field, 0)), float(result.get(field, 0))
+        if abs(expected - actual) > ear_tolerance:
+            diffs.append((field, expected, actual))
+    return diffs
+
+
+def replay_session(recording, realtime=False, detector_kwargs=None, ear_tolerance=1e-6, max_reported=20):
+    """把录制的帧按原顺序、原采集时间交给新的检测器和动作控制器，与录制时的结果逐帧比较
+
+    realtime 为 True 时按录制时的帧间隔送帧，否则尽快送帧（用于测吞吐量）。
+    detector_kwargs 覆盖录制时的检测器配置，用于比较优化前后的行为是否一致。
+    返回报告字典。
+    """
+    config = recording.detector_config
+    config.update(detector_kwargs or {})
+    detector = MediaPipeEyeDetector(**config)
+    controller = SimpleActionController()
+
+    report = {
+        'frames': len(recording),
+        'compared': 0,
+        'mismatched_frames': 0,
+        'command_mismatches': 0,
+        'first_mismatch_seq': None,
+        'mismatches': [],
+        'dropped_frames': recording.meta.get('dropped_frames', 0),
+    }
+    if report['dropped_frames']:
+        print(f"警告: 录制时丢弃了 {report['dropped_frames']} 帧，丢帧之后的结果可能无法复现")
+
+    start = time.perf_counter()
+    first_timestamp = float(recording.index['timestamp'][0]) if len(recording) else 0.0
+    try:
+        for i in range(len(recording)):
+            seq = int(recording.index['seq'][i])
+            timestamp = float(recording.index['timestamp'][i])
+            golden = recording.results.get(seq)
+
+            if realtime:
+                delay = (timestamp - first_timestamp) - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            # 录制时的模式切换发生在帧之间，回放时在处理该帧前切换
+            if golden is not None and golden['mode'] != controller.mode.value:
+                controller.switch_mode(ControlMode(golden['mode']))
+
+            result = detector.detect_eyes_state(recording.frames[i], timestamp)
+            command = controller.process_detection(result)
+            if golden is None:
+                continue
+
+            report['compared'] += 1
+            diffs = _diff_result(golden['result'], result, ear_tolerance)
+            if command != golden['command']:
+                report['command_mismatches'] += 1
+                diffs.append(('command', golden['command'], command))
+            if diffs:
+                report['mismatched_frames'] += 1
+                if report['first_mismatch_seq'] is None:
+                    report['first_mismatch_seq'] = seq
+                if len(report['mismatches']) < max_reported:
+                    report['mismatches'].append({'seq': seq, 'diffs': diffs})
+    finally:
+        detector.close()
+
+    elapsed = time.perf_counter() - start
+    report['elapsed'] = elapsed
+    report['fps'] = len(recording) / elapsed if elapsed > 0 else 0.0
+    return report
+
+
+def print_replay_report(report):
+    print(f"回放 {report['frames']} 帧，比较 {report['compared']} 帧，"
+          f"用时 {report['elapsed']:.2f}s ({report['fps']:.1f} fps)")
+    if not report['mismatched_frames']:
+        print("结果与录制时完全一致")
+        return
+    print(f"不一致: {report['mismatched_frames']} 帧（命令不一致 {report['command_mismatches']} 帧），"
+          f"首次出现在帧 {report['first_mismatch_seq']}")
+    for mismatch in report['mismatches']:
+        details = ", ".join(f"{field}: {expected!r} -> {actual!r}" for field, expected, actual in mismatch['diffs'])
+        print(f"  帧 {mismatch['seq']}: {details}")
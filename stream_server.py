@@ -1,33 +1,24 @@
 import cv2
 import threading
 import time
+import socket
+import select
+import struct
+import hashlib
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from socketserver import ThreadingMixIn
-import os
+from urllib.parse import unquote, urlsplit
 
-class StreamHandler(BaseHTTPRequestHandler):
-    latest_frame = None
-    frame_lock = threading.Lock()
-    video_frames = []  # 存储测试视频帧
-    video_frame_index = 0
-    show_video_preview = False  # 是否显示视频预览
-    show_video_playback = False  # 是否显示视频播放内容
-    current_mode = "video"  # 当前模式: "video" 或 "document"
-    pending_video_command = None  # 待处理的视频命令
-    pending_document_command = None  # 待处理的文档命令
-    pending_mode_switch = None  # 待处理的模式切换
-    pending_open_pdf = None  # 待处理的打开PDF命令
-    
-    def log_message(self, format, *args):
-        """覆盖默认的日志消息方法，禁止打印HTTP请求日志"""
-        pass
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            
-            html_content = '''<!DOCTYPE html>
+from command_bus import CommandBus
+import metrics
+from metrics import STAGE_SECONDS, FRAMES_DROPPED, VIEWERS, JPEG_BYTES_SENT
+from preview_player import PreviewPlayer, PreviewError, PREVIEW_READ_AHEAD
+from thumbnail_index import ThumbnailIndex
+
+INDEX_HTML = '''<!DOCTYPE html>
 <html lang="zh">
 <head>
     <meta charset="UTF-8">
@@ -95,6 +86,20 @@ class StreamHandler(BaseHTTPRequestHandler):
         .control-button:hover {
             background: #0a0;
         }
+        .seek-strip {
+            display: flex;
+            overflow-x: auto;
+            margin-top: 15px;
+        }
+        .seek-strip img {
+            width: 80px;
+            margin: 0 1px;
+            border: 1px solid #0a0;
+            cursor: pointer;
+        }
+        .seek-strip img:hover {
+            border-color: #fff;
+        }
         .pdf-input {
             padding: 5px;
             margin: 5px;
@@ -119,7 +124,12 @@ class StreamHandler(BaseHTTPRequestHandler):
                 <button class="control-button" onclick="sendVideoCommand('play')">播放视频</button>
                 <button class="control-button" onclick="sendVideoCommand('pause')">暂停视频</button>
                 <button class="control-button" onclick="sendVideoCommand('stop')">停止视频</button>
+                <br><br>
+                <button class="control-button" onclick="sendVideoCommand('prev')">上一个视频</button>
+                <button class="control-button" onclick="sendVideoCommand('next')">下一个视频</button>
             </div>
+            <!-- 缩略图跳转条：点击缩略图跳转到对应时间 -->
+            <div id="seekStrip" class="seek-strip"></div>
         </div>
         
         <!-- 文档控制面板 -->
@@ -134,18 +144,99 @@ class StreamHandler(BaseHTTPRequestHandler):
             </div>
         </div>
         
-        <img id="stream" src="/video_feed" />
+        <img id="stream" src="/stream" />
+        <!-- 通过 WebSocket 推送的检测状态 -->
+        <div class="info">
+            <p>
+                连接: <span id="ws-state">未连接</span> |
+                模式: <span id="st-mode">-</span> |
+                人脸: <span id="st-face_detected">-</span> |
+                EAR: <span id="st-avg_ear">-</span> |
+                眼睛: <span id="st-eye_state">-</span> |
+                注视: <span id="st-is_gazing">-</span> |
+                FPS: <span id="st-fps">-</span> |
+                命令: <span id="st-command">-</span>
+            </p>
+            <p>最近确认: <span id="last-ack">-</span></p>
+        </div>
         <div class="info">
             <p>实时监控中... 按 Ctrl+C 停止程序</p>
             <p>在其他设备上访问: http://YOUR_IP:8080</p>
         </div>
     </div>
     <script>
-        // 自动刷新图像
+        // 图像通过 /stream 长连接推送 (multipart/x-mixed-replace)，连接断开后自动重连
         const img = document.getElementById('stream');
-        setInterval(() => {
-            img.src = '/video_feed?t=' + new Date().getTime();
-        }, 50);
+        img.onerror = () => {
+            setTimeout(() => {
+                img.src = '/stream?t=' + new Date().getTime();
+            }, 1000);
+        };
+        
+        // WebSocket 控制与状态通道，断开时回退到 HTTP 请求
+        let ws = null;
+        let nextCommandId = 1;
+        const pendingCommands = {};
+        
+        function connectWebSocket() {
+            const protocol = location.protocol === 'https:' ? 'wss://' : 'ws://';
+            ws = new WebSocket(protocol + location.host + '/ws');
+            ws.onopen = () => {
+                document.getElementById('ws-state').textContent = '已连接';
+            };
+            ws.onclose = () => {
+                ws = null;
+                document.getElementById('ws-state').textContent = '未连接';
+                setTimeout(connectWebSocket, 2000);
+            };
+            ws.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                if (message.type === 'telemetry') {
+                    updateStatus(message.data);
+                } else if (message.type === 'ack') {
+                    handleAck(message);
+                }
+            };
+        }
+        
+        // 只更新变化的字段
+        function updateStatus(data) {
+            Object.keys(data).forEach(key => {
+                const element = document.getElementById('st-' + key);
+                if (element) {
+                    const value = data[key];
+                    element.textContent = (value === null) ? '-' : String(value);
+                }
+            });
+        }
+        
+        function handleAck(message) {
+            const name = pendingCommands[message.id] || message.id;
+            let text = name + ': ' + message.status;
+            if (message.latency_ms !== undefined) {
+                text += ' (' + message.latency_ms + ' ms)';
+            }
+            if (message.status !== 'queued') {
+                delete pendingCommands[message.id];
+            }
+            document.getElementById('last-ack').textContent = text;
+        }
+        
+        // 发送命令：优先使用 WebSocket，未连接时使用 HTTP
+        function sendCommand(type, command, fallbackUrl) {
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                const id = nextCommandId++;
+                pendingCommands[id] = type + '/' + command;
+                ws.send(JSON.stringify({id: id, type: type, command: command}));
+                return;
+            }
+            fetch(fallbackUrl)
+                .then(response => response.text())
+                .then(data => console.log(data))
+                .catch(error => console.error('Error:', error));
+        }
+        
+        connectWebSocket();
         
         // 切换选项卡
         function switchTab(tabName) {
@@ -162,160 +253,632 @@ class StreamHandler(BaseHTTPRequestHandler):
             document.getElementById(tabName).classList.add('active');
             
             // 发送模式切换命令
-            fetch('/switch_mode?mode=' + tabName)
-                .then(response => response.text())
-                .then(data => console.log(data))
-                .catch(error => console.error('Error:', error));
+            sendCommand('mode', tabName, '/switch_mode?mode=' + tabName);
         }
         
         // 发送视频控制命令
         function sendVideoCommand(command) {
-            fetch('/video_control?command=' + command)
-                .then(response => response.text())
-                .then(data => console.log(data))
-                .catch(error => console.error('Error:', error));
+            sendCommand('video', command, '/video_control?command=' + command);
         }
         
         // 发送文档控制命令
         function sendDocumentCommand(command) {
-            fetch('/document_control?command=' + command)
-                .then(response => response.text())
-                .then(data => console.log(data))
-                .catch(error => console.error('Error:', error));
+            sendCommand('document', command, '/document_control?command=' + command);
         }
         
+        // 跳转到指定时间（秒）
+        function seekTo(seconds) {
+            sendCommand('seek', String(seconds), '/seek?t=' + seconds);
+        }
+        
+        // 加载缩略图索引，索引在后台生成时稍后重试
+        function loadThumbnails() {
+            fetch('/thumbnails')
+                .then(response => response.json())
+                .then(index => {
+                    if (!index.ready) {
+                        setTimeout(loadThumbnails, 2000);
+                        return;
+                    }
+                    const strip = document.getElementById('seekStrip');
+                    strip.innerHTML = '';
+                    index.thumbnails.forEach(item => {
+                        const thumb = document.createElement('img');
+                        thumb.src = '/thumbnails/' + item.index + '.jpg';
+                        const minutes = Math.floor(item.time / 60);
+                        const seconds = Math.floor(item.time % 60);
+                        thumb.title = minutes + ':' + String(seconds).padStart(2, '0');
+                        thumb.onclick = () => seekTo(item.time);
+                        strip.appendChild(thumb);
+                    });
+                })
+                .catch(() => setTimeout(loadThumbnails, 5000));
+        }
+        
+        loadThumbnails();
+        
         // 打开PDF文档
         function openPDF() {
             const pdfPath = document.getElementById('pdfPath').value;
-            fetch('/open_pdf?path=' + encodeURIComponent(pdfPath))
-                .then(response => response.text())
-                .then(data => console.log(data))
-                .catch(error => console.error('Error:', error));
+            sendCommand('open_pdf', pdfPath, '/open_pdf?path=' + encodeURIComponent(pdfPath));
         }
     </script>
 </body>
 </html>'''
-            self.wfile.write(html_content.encode('utf-8'))
-        elif self.path.startswith('/video_feed'):
+
+
+class JpegFrameCache:
+    """共享JPEG缓存：每个发布的帧最多编码一次，所有观看者共用编码结果"""
+    
+    def __init__(self, quality=70, workers=2):
+        self.quality = quality
+        self.workers = workers
+        # cv2.imencode 会释放GIL，用小线程池并行编码
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jpeg-encoder")
+        self.cond = threading.Condition()
+        self._next_seq = 0  # 已分配的最大序号
+        self._in_flight = 0  # 正在编码的任务数
+        self._pending = None  # 编码器忙时等待的最新帧 (seq, frame)
+        self.seq = 0  # 当前缓存JPEG对应的帧序号
+        self.jpeg = None  # 当前缓存的JPEG字节
+        self._listeners = []  # 新帧编码完成后的回调
+        # 统计
+        self.encoded_count = 0
+        self.skipped_count = 0
+        
+    def add_listener(self, callback):
+        """注册新帧回调 callback(seq)，在编码线程中调用，回调需尽快返回"""
+        self._listeners.append(callback)
+        
+    def remove_listener(self, callback):
+        """注销新帧回调"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+        
+    def publish(self, frame):
+        """发布新帧并分配单调递增的序号，编码在线程池中异步完成"""
+        with self.cond:
+            self._next_seq += 1
+            seq = self._next_seq
+            if self._in_flight >= self.workers:
+                # 编码器全忙：只保留最新一帧，旧的待编码帧直接丢弃
+                if self._pending is not None:
+                    self.skipped_count += 1
+                    FRAMES_DROPPED.labels("encode").inc()
+                self._pending = (seq, frame)
+                return seq
+            self._in_flight += 1
+        self._executor.submit(self._encode_loop, seq, frame)
+        return seq
+    
+    def publish_jpeg(self, jpeg):
+        """发布已编码的JPEG（视频预览在解码线程中编码），不经过编码线程池"""
+        with self.cond:
+            self._next_seq += 1
+            seq = self._next_seq
+            self.seq = seq
+            self.jpeg = jpeg
+            self.cond.notify_all()
+        for callback in list(self._listeners):
+            callback(seq)
+        return seq
+    
+    def _encode_loop(self, seq, frame):
+        """编码一帧，完成后继续处理等待中的最新帧"""
+        encode_seconds = STAGE_SECONDS.labels("encode")
+        while True:
+            start = time.perf_counter()
+            jpeg = encode_jpeg(frame, self.quality)
+            encode_seconds.observe(time.perf_counter() - start)
+            updated = False
+            with self.cond:
+                if jpeg is not None:
+                    self.encoded_count += 1
+                    # 并行编码可能乱序完成，只接受更新的帧
+                    if seq > self.seq:
+                        self.seq = seq
+                        self.jpeg = jpeg
+                        self.cond.notify_all()
+                        updated = True
+                if self._pending is None:
+                    self._in_flight -= 1
+                    next_item = None
+                else:
+                    next_item = self._pending
+                    self._pending = None
+            if updated:
+                for callback in list(self._listeners):
+                    callback(seq)
+            if next_item is None:
+                return
+            seq, frame = next_item
+    
+    def latest(self):
+        """返回 (seq, jpeg)，只在锁内交换引用"""
+        with self.cond:
+            return self.seq, self.jpeg
+    
+    def wait_newer(self, seq, timeout=1.0):
+        """等待比 seq 更新的帧，超时或被 wake() 唤醒时返回当前缓存（缓存为空时同样等待）"""
+        with self.cond:
+            if self.seq == seq or self.jpeg is None:
+                self.cond.wait(timeout)
+            return self.seq, self.jpeg
+    
+    def wake(self):
+        """唤醒所有等待者（模式切换或服务器停止时使用）"""
+        with self.cond:
+            self.cond.notify_all()
+        for callback in list(self._listeners):
+            callback(self.seq)
+    
+    def reset(self):
+        """清空缓存"""
+        with self.cond:
+            self._pending = None
+            self.seq = self._next_seq
+            self.jpeg = None
+            self.cond.notify_all()
+
+
+def encode_jpeg(frame, quality=70):
+    """编码JPEG图像，失败返回 None"""
+    try:
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ret:
+            return buffer.tobytes()
+    except Exception as e:
+        print(f"Error encoding image: {e}")
+    return None
+
+
+# WebSocket 协议常量 (RFC 6455)
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_OPCODE_TEXT = 0x1
+WS_OPCODE_CLOSE = 0x8
+WS_OPCODE_PING = 0x9
+WS_OPCODE_PONG = 0xA
+
+
+def websocket_accept_key(key):
+    """根据客户端的 Sec-WebSocket-Key 计算握手响应"""
+    digest = hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def websocket_handshake_response(key):
+    """101 握手响应（WebSocket 要求 HTTP/1.1 状态行）"""
+    return ("HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept_key(key)}\r\n\r\n").encode('ascii')
+
+
+def encode_websocket_frame(payload, opcode=WS_OPCODE_TEXT):
+    """编码服务端到客户端的单帧消息（不加掩码）"""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 65536:
+        header.append(126)
+        header.extend(struct.pack('>H', length))
+    else:
+        header.append(127)
+        header.extend(struct.pack('>Q', length))
+    return bytes(header) + payload
+
+
+def parse_websocket_frames(buffer):
+    """从接收缓冲区解析完整的帧，返回 [(opcode, payload)]，已解析的字节从 buffer 中移除"""
+    frames = []
+    while len(buffer) >= 2:
+        opcode = buffer[0] & 0x0F
+        masked = buffer[1] & 0x80
+        length = buffer[1] & 0x7F
+        pos = 2
+        if length == 126:
+            if len(buffer) < 4:
+                break
+            length = struct.unpack('>H', buffer[2:4])[0]
+            pos = 4
+        elif length == 127:
+            if len(buffer) < 10:
+                break
+            length = struct.unpack('>Q', buffer[2:10])[0]
+            pos = 10
+        mask_len = 4 if masked else 0
+        end = pos + mask_len + length
+        if len(buffer) < end:
+            break
+        payload = bytes(buffer[pos + mask_len:end])
+        if masked:
+            mask = buffer[pos:pos + 4]
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        del buffer[:end]
+        frames.append((opcode, payload))
+    return frames
+
+
+class TelemetryState:
+    """检测状态快照，每次有字段变化时版本号递增"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.state = {}
+        
+    def update(self, **fields):
+        """合并字段，只有值变化时才递增版本号"""
+        with self.lock:
+            changed = False
+            for key, value in fields.items():
+                if self.state.get(key) != value:
+                    self.state[key] = value
+                    changed = True
+            if changed:
+                self.version += 1
+    
+    def snapshot(self):
+        """返回 (version, state副本)"""
+        with self.lock:
+            return self.version, dict(self.state)
+    
+    def reset(self):
+        with self.lock:
+            self.state = {}
+            self.version += 1
+
+
+class WebSocketSession:
+    """WebSocket 会话逻辑（与传输方式无关）：处理命令、发送执行确认和合并后的状态增量"""
+    
+    def __init__(self, send_text):
+        self.send_text = send_text  # 线程安全的发送函数 send_text(str)
+        self.closed = False
+        self._last_sent = {}
+        self._last_version = -1
+        self._next_telemetry_time = 0
+    
+    def send_json(self, message):
+        if self.closed:
+            return
+        try:
+            self.send_text(json.dumps(message, ensure_ascii=False))
+        except (OSError, RuntimeError):
+            # 连接已断开
+            self.closed = True
+    
+    def handle_message(self, text):
+        """处理客户端消息: {"id": 1, "type": "video", "command": "play"}"""
+        try:
+            message = json.loads(text)
+            command_id = message.get('id')
+            kind = message['type']
+            command = message['command']
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.send_json({'type': 'error', 'error': 'invalid message'})
+            return
+        
+        def on_done(bus_command):
+            self.send_json({'type': 'ack', 'id': command_id, 'status': 'done' if bus_command.ok else 'failed',
+                            'latency_ms': round(bus_command.latency() * 1000, 1)})
+        
+        # 先发送 queued，保证它总在 done 之前到达客户端
+        self.send_json({'type': 'ack', 'id': command_id, 'status': 'queued'})
+        if submit_web_command(kind, command, on_done) is None:
+            self.send_json({'type': 'ack', 'id': command_id, 'status': 'rejected'})
+    
+    def poll_telemetry(self, now):
+        """按限速发送自上次发送以来变化的字段"""
+        if now < self._next_telemetry_time:
+            return
+        version, state = StreamHandler.telemetry.snapshot()
+        if version == self._last_version:
+            return
+        delta = {key: value for key, value in state.items() if self._last_sent.get(key) != value}
+        self._last_sent = state
+        self._last_version = version
+        self._next_telemetry_time = now + StreamHandler.telemetry_interval
+        if delta:
+            self.send_json({'type': 'telemetry', 'data': delta})
+
+
+def fit_document_page(image, max_size=(960, 960)):
+    """缩小文档页面以便推流（保持宽高比，不放大）"""
+    h, w = image.shape[:2]
+    scale = min(max_size[0] / w, max_size[1] / h, 1.0)
+    if scale < 1.0:
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+
+def current_frame_cache():
+    """当前画面来源的JPEG缓存：文档页面 > 视频播放/预览（已加载视频时）> 摄像头帧"""
+    with StreamHandler.frame_lock:
+        if StreamHandler.show_document:
+            return StreamHandler.document_cache
+        if ((StreamHandler.show_video_playback or StreamHandler.show_video_preview)
+                and StreamHandler.video_preview_loaded):
+            return StreamHandler.preview_cache
+    return StreamHandler.jpeg_cache
+
+
+def mjpeg_part_header(jpeg):
+    """multipart 分块头"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'Content-Length: ' + str(len(jpeg)).encode('ascii') + b'\r\n\r\n')
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    frame_lock = threading.Lock()
+    jpeg_cache = JpegFrameCache()  # 摄像头帧的共享JPEG缓存
+    streaming = True  # 服务器停止时置为 False，结束所有推流连接
+    stream_keepalive_interval = 2.0  # 画面没有变化（例如文档页面）时重发当前帧的间隔（秒）
+    preview_cache = JpegFrameCache()  # 视频预览帧（由 PreviewPlayer 按视频帧率发布）
+    thumbnail_index = None  # 当前视频的缩略图索引（跳转条）
+    video_preview_loaded = False
+    show_video_preview = False  # 是否显示视频预览
+    show_video_playback = False  # 是否显示视频播放内容
+    current_mode = "video"  # 当前模式: "video" 或 "document"
+    document_cache = JpegFrameCache()  # 内置渲染器当前页面的JPEG（翻页时发布）
+    show_document = False  # 是否显示文档页面（优先于视频预览）
+    command_bus = CommandBus()  # Web命令与检测命令共用的命令总线
+    telemetry = TelemetryState()  # 推送给 WebSocket 客户端的检测状态
+    telemetry_interval = 0.1  # 每个客户端的状态推送最小间隔（秒）
+    
+    def log_message(self, format, *args):
+        """覆盖默认的日志消息方法，禁止打印HTTP请求日志"""
+        pass
+    
+    def _write_mjpeg_part(self, jpeg):
+        """写入一个 multipart 分块"""
+        self.wfile.write(mjpeg_part_header(jpeg))
+        self.wfile.write(jpeg)
+        self.wfile.write(b'\r\n')
+        JPEG_BYTES_SENT.inc(len(jpeg))
+    
+    def _serve_mjpeg_stream(self):
+        """multipart/x-mixed-replace 推流：每个观看者保持一个连接，只在有新帧时推送"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+        self.send_header('Cache-Control', 'no-cache, private')
+        self.send_header('Pragma', 'no-cache')
+        self.end_headers()
+        
+        # 写超时，避免死连接永久占用线程
+        self.connection.settimeout(10)
+        last_seq = -1
+        last_sent = 0
+        cache = None
+        VIEWERS.inc()
+        try:
+            while StreamHandler.streaming:
+                # 画面来源（摄像头/视频预览/文档）切换后序号重新开始比较
+                current = current_frame_cache()
+                if current is not cache:
+                    cache, last_seq = current, -1
+                # 等待新帧；只取最新一帧，慢速客户端写入期间发布的旧帧被直接跳过
+                seq, jpeg = cache.wait_newer(last_seq)
+                if jpeg is None:
+                    continue
+                if seq == last_seq and time.time() - last_sent < StreamHandler.stream_keepalive_interval:
+                    # 画面没有变化：只按较长间隔重发，保持连接并让浏览器显示最后一帧
+                    continue
+                last_seq = seq
+                self._write_mjpeg_part(jpeg)
+                last_sent = time.time()
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            # 观看者断开连接
+            pass
+        finally:
+            VIEWERS.dec()
+    
+    def _serve_websocket(self):
+        """/ws：WebSocket 控制与状态通道"""
+        key = self.headers.get('Sec-WebSocket-Key')
+        if not key or 'websocket' not in self.headers.get('Upgrade', '').lower():
+            self.send_error(400)
+            return
+        self.wfile.write(websocket_handshake_response(key))
+        self.close_connection = True
+        
+        sock = self.connection
+        send_lock = threading.Lock()
+        
+        def send_text(text):
+            # 确认可能由命令执行线程发送，需要加锁
+            with send_lock:
+                sock.sendall(encode_websocket_frame(text.encode('utf-8')))
+        
+        session = WebSocketSession(send_text)
+        buffer = bytearray()
+        try:
+            while StreamHandler.streaming and not session.closed:
+                readable, _, _ = select.select([sock], [], [], StreamHandler.telemetry_interval)
+                if readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    buffer.extend(data)
+                    for opcode, payload in parse_websocket_frames(buffer):
+                        if opcode == WS_OPCODE_TEXT:
+                            session.handle_message(payload.decode('utf-8', 'replace'))
+                        elif opcode == WS_OPCODE_PING:
+                            with send_lock:
+                                sock.sendall(encode_websocket_frame(payload, WS_OPCODE_PONG))
+                        elif opcode == WS_OPCODE_CLOSE:
+                            with send_lock:
+                                sock.sendall(encode_websocket_frame(b'', WS_OPCODE_CLOSE))
+                            session.closed = True
+                            break
+                session.poll_telemetry(time.time())
+        except (OSError, ValueError):
+            # 客户端断开连接
+            pass
+        finally:
+            session.closed = True
+    
+    def do_GET(self):
+        if self.path == '/':
             self.send_response(200)
-            self.send_header('Content-Type', 'image/jpeg')
-            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Content-type', 'text/html; charset=utf-8')
             self.end_headers()
             
-            # 获取最新帧
-            with StreamHandler.frame_lock:
-                frame_to_send = None
-                
-                # 优先级: 视频播放 > 视频预览 > 摄像头实时画面
-                if StreamHandler.show_video_playback and len(StreamHandler.video_frames) > 0:
-                    # 显示视频播放内容
-                    frame_to_send = StreamHandler.video_frames[StreamHandler.video_frame_index]
-                    StreamHandler.video_frame_index = (StreamHandler.video_frame_index + 1) % len(StreamHandler.video_frames)
-                elif StreamHandler.show_video_preview and len(StreamHandler.video_frames) > 0:
-                    # 显示视频预览
-                    frame_to_send = StreamHandler.video_frames[StreamHandler.video_frame_index]
-                    StreamHandler.video_frame_index = (StreamHandler.video_frame_index + 1) % len(StreamHandler.video_frames)
-                elif StreamHandler.latest_frame is not None:
-                    # 显示摄像头实时画面
-                    frame_to_send = StreamHandler.latest_frame
-                
-                if frame_to_send is not None:
-                    try:
-                        # 编码JPEG图像
-                        ret, buffer = cv2.imencode('.jpg', frame_to_send, 
-                                                  [cv2.IMWRITE_JPEG_QUALITY, 70])
-                        if ret:
-                            self.wfile.write(buffer.tobytes())
-                    except Exception as e:
-                        print(f"Error encoding image: {e}")
-        elif self.path.startswith('/switch_mode'):
+            self.wfile.write(INDEX_HTML.encode('utf-8'))
+        elif self.path.startswith('/stream'):
+            self._serve_mjpeg_stream()
+        elif self.path.startswith('/ws'):
+            self._serve_websocket()
+        elif self.path.startswith('/video_feed'):
             self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Cache-Control', 'no-cache')
             self.end_headers()
             
-            # 处理模式切换
-            if 'mode=video' in self.path:
-                with StreamHandler.frame_lock:
-                    StreamHandler.pending_mode_switch = "video"
-                self.wfile.write(b"Switched to video mode")
-            elif 'mode=document' in self.path:
-                with StreamHandler.frame_lock:
-                    StreamHandler.pending_mode_switch = "document"
-                self.wfile.write(b"Switched to document mode")
-        elif self.path.startswith('/video_control'):
+            # 获取最新帧：各画面来源都已编码，直接使用共享缓存
+            _, jpeg = current_frame_cache().latest()
+            if jpeg is not None:
+                self.wfile.write(jpeg)
+                JPEG_BYTES_SENT.inc(len(jpeg))
+        elif self.path.startswith('/metrics'):
+            body = metrics.REGISTRY.render().encode('utf-8')
             self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-            
-            # 处理视频控制命令
-            command = None
-            if 'command=play' in self.path:
-                command = "play"
-            elif 'command=pause' in self.path:
-                command = "pause"
-            elif 'command=stop' in self.path:
-                command = "stop"
-                
-            if command:
-                with StreamHandler.frame_lock:
-                    StreamHandler.pending_video_command = command
-                self.wfile.write(f"Video command {command} sent".encode('utf-8'))
-            else:
-                self.wfile.write(b"Invalid video command")
-        elif self.path.startswith('/document_control'):
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.wfile.write(body)
+        elif self.path.startswith(THUMBNAIL_ROUTE):
+            status, content_type, body = handle_thumbnail_request(self.path)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
             self.end_headers()
-            
-            # 处理文档控制命令
-            command = None
-            if 'command=page_up' in self.path:
-                command = "page_up"
-            elif 'command=page_down' in self.path:
-                command = "page_down"
-                
-            if command:
-                with StreamHandler.frame_lock:
-                    StreamHandler.pending_document_command = command
-                self.wfile.write(f"Document command {command} sent".encode('utf-8'))
-            else:
-                self.wfile.write(b"Invalid document command")
-        elif self.path.startswith('/open_pdf'):
+            self.wfile.write(body)
+        elif self.path.startswith(CONTROL_ROUTES):
+            body = handle_control_request(self.path)
             self.send_response(200)
             self.send_header('Content-Type', 'text/plain; charset=utf-8')
             self.end_headers()
-            
-            # 处理打开PDF命令
-            if 'path=' in self.path:
-                with StreamHandler.frame_lock:
-                    StreamHandler.pending_open_pdf = self.path.split('path=')[1]
-                self.wfile.write(b"Open PDF command sent")
-            else:
-                self.wfile.write(b"Invalid PDF path")
+            self.wfile.write(body)
         else:
             self.send_error(404)
-        
+
+
+# 控制类路由（线程版和 asyncio 版服务器共用）
+CONTROL_ROUTES = ('/switch_mode', '/video_control', '/document_control', '/open_pdf', '/seek')
+# 缩略图索引: /thumbnails 返回 JSON，/thumbnails/<序号>.jpg 返回缩略图
+THUMBNAIL_ROUTE = '/thumbnails'
+
+
+def submit_web_command(kind, command, on_done=None):
+    """把来自Web界面的命令提交到命令总线，命令无效时返回 None"""
+    bus = StreamHandler.command_bus
+    if kind == "video" and command in ("play", "pause", "stop", "next", "prev"):
+        return bus.submit("video", command, on_done=on_done)
+    elif kind == "document" and command in ("page_up", "page_down"):
+        return bus.submit("document", command, on_done=on_done)
+    elif kind == "mode" and command in ("video", "document"):
+        return bus.submit("mode", command, on_done=on_done)
+    elif kind == "open_pdf" and command:
+        return bus.submit("document", "open_pdf", arg=command, on_done=on_done)
+    elif kind == "seek":
+        try:
+            seconds = float(command)
+        except (TypeError, ValueError):
+            return None
+        if seconds >= 0:
+            return bus.submit("video", "seek", arg=seconds, on_done=on_done)
+    return None
+
+
+def handle_thumbnail_request(path):
+    """缩略图索引请求，返回 (状态码, Content-Type, 正文)"""
+    index = StreamHandler.thumbnail_index
+    route = urlsplit(path).path.rstrip('/')
+    if route == THUMBNAIL_ROUTE:
+        summary = index.summary() if index is not None else {'ready': False, 'duration': 0, 'thumbnails': []}
+        return 200, 'application/json', json.dumps(summary).encode('utf-8')
+    name = route[len(THUMBNAIL_ROUTE) + 1:]
+    if index is not None and name.endswith('.jpg') and name[:-4].isdigit():
+        jpeg = index.thumbnail(int(name[:-4]))
+        if jpeg is not None:
+            return 200, 'image/jpeg', jpeg
+    return 404, 'text/plain; charset=utf-8', b"Not Found"
+
+
+def handle_control_request(path):
+    """处理控制类请求，写入待处理命令并返回响应正文"""
+    if path.startswith('/switch_mode'):
+        # 处理模式切换
+        if 'mode=video' in path:
+            submit_web_command("mode", "video")
+            return b"Switched to video mode"
+        elif 'mode=document' in path:
+            submit_web_command("mode", "document")
+            return b"Switched to document mode"
+        return b""
+    elif path.startswith('/video_control'):
+        # 处理视频控制命令
+        command = None
+        if 'command=play' in path:
+            command = "play"
+        elif 'command=pause' in path:
+            command = "pause"
+        elif 'command=stop' in path:
+            command = "stop"
+        elif 'command=next' in path:
+            command = "next"
+        elif 'command=prev' in path:
+            command = "prev"
+            
+        if command:
+            submit_web_command("video", command)
+            return f"Video command {command} sent".encode('utf-8')
+        return b"Invalid video command"
+    elif path.startswith('/document_control'):
+        # 处理文档控制命令
+        command = None
+        if 'command=page_up' in path:
+            command = "page_up"
+        elif 'command=page_down' in path:
+            command = "page_down"
+            
+        if command:
+            submit_web_command("document", command)
+            return f"Document command {command} sent".encode('utf-8')
+        return b"Invalid document command"
+    elif path.startswith('/open_pdf'):
+        # 处理打开PDF命令（浏览器端使用 encodeURIComponent 编码路径）
+        if 'path=' in path:
+            submit_web_command("open_pdf", unquote(path.split('path=')[1]))
+            return b"Open PDF command sent"
+        return b"Invalid PDF path"
+    elif path.startswith('/seek'):
+        # 处理跳转命令: /seek?t=秒
+        if 't=' in path and submit_web_command("seek", path.split('t=')[1].split('&')[0]) is not None:
+            return b"Seek command sent"
+        return b"Invalid seek time"
+    return b""
+
+
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     daemon_threads = True
 
 class StreamServer:
-    def __init__(self, port=8080):
+    def __init__(self, port=8080, command_bus=None, preview_read_ahead=PREVIEW_READ_AHEAD):
         self.port = port
+        self.command_bus = command_bus if command_bus is not None else CommandBus()
         self.server = None
         self.thread = None
         self.video_loaded = False
+        self.preview_read_ahead = preview_read_ahead
+        self.preview_player = None
         
     def start(self):
-        StreamHandler.latest_frame = None
-        StreamHandler.video_frames = []
-        StreamHandler.video_frame_index = 0
-        StreamHandler.show_video_preview = False
-        StreamHandler.show_video_playback = False
-        StreamHandler.current_mode = "video"
-        StreamHandler.pending_video_command = None
-        StreamHandler.pending_document_command = None
-        StreamHandler.pending_mode_switch = None
-        StreamHandler.pending_open_pdf = None
+        self._reset_state()
         
         # 尝试绑定端口，如果失败则尝试其他端口
         ports_to_try = [self.port, 8081, 8082, 9000]
@@ -339,44 +902,78 @@ class StreamServer:
         print(f"Stream server started on port {self.port}")
         print(f"Please open http://<device_ip>:{self.port} in browser to view real-time video")
         
+    def _reset_state(self):
+        """重置共享的流媒体状态"""
+        StreamHandler.jpeg_cache.reset()
+        StreamHandler.preview_cache.reset()
+        StreamHandler.streaming = True
+        StreamHandler.video_preview_loaded = self.preview_player is not None
+        StreamHandler.show_video_preview = False
+        StreamHandler.show_video_playback = False
+        StreamHandler.current_mode = "video"
+        StreamHandler.document_cache.reset()
+        StreamHandler.show_document = False
+        StreamHandler.command_bus = self.command_bus
+        StreamHandler.telemetry.reset()
+        
     def update_frame(self, frame):
-        with StreamHandler.frame_lock:
-            StreamHandler.latest_frame = frame
+        # 编码在线程池中完成，完成后唤醒所有等待新帧的推流连接
+        return StreamHandler.jpeg_cache.publish(frame)
         
-    def load_video_preview(self, video_path, max_frames=50):
-        """加载视频预览帧"""
-        if not os.path.exists(video_path):
-            print(f"Video file not found: {video_path}")
-            return False
-            
+    def update_detection(self, detection_result, command=None, mode=None):
+        """更新推送给 WebSocket 客户端的检测状态（只有变化的字段会被推送）"""
+        fields = {
+            'face_detected': bool(detection_result['face_detected']),
+            'avg_ear': round(float(detection_result['avg_ear']), 3),
+            'eye_state': detection_result['eye_state'],
+            'is_gazing': bool(detection_result['is_gazing']),
+            'fps': round(float(detection_result['fps']), 1),
+        }
+        if command:
+            fields['command'] = command
+        if mode:
+            fields['mode'] = mode
+        StreamHandler.telemetry.update(**fields)
+    
+    def load_video_preview(self, video_path):
+        """加载视频预览：PreviewPlayer 在后台按视频帧率循环播放整个文件，显示预览时发布到预览帧缓存"""
         try:
-            cap = cv2.VideoCapture(video_path)
-            frames = []
-            
-            frame_count = 0
-            while True:
-                ret, frame = cap.read()
-                if not ret or frame_count >= max_frames:
-                    break
-                    
-                # 调整帧大小以适应显示
-                frame = cv2.resize(frame, (640, 480))
-                frames.append(frame)
-                frame_count += 1
-                
-            cap.release()
-            
-            with StreamHandler.frame_lock:
-                StreamHandler.video_frames = frames
-                StreamHandler.video_frame_index = 0
-                
-            print(f"Loaded {len(frames)} frames for video preview")
-            self.video_loaded = True
-            return True
-            
-        except Exception as e:
+            player = PreviewPlayer(video_path, StreamHandler.preview_cache.publish_jpeg,
+                                   read_ahead=self.preview_read_ahead)
+        except PreviewError as e:
             print(f"Error loading video preview: {e}")
             return False
+        if self.preview_player is not None:
+            self.preview_player.close()
+        self.preview_player = player
+        StreamHandler.preview_cache.reset()
+        with StreamHandler.frame_lock:
+            StreamHandler.video_preview_loaded = True
+        self._update_preview_clock()
+        self.video_loaded = True
+        print(f"Loaded video preview: {video_path} ({player.frame_count} frames, {player.fps:.1f} fps)")
+        # 跳转条的缩略图索引：已缓存时立即读取，否则在后台生成，不影响启动
+        index = ThumbnailIndex(video_path)
+        StreamHandler.thumbnail_index = index
+        if index.ensure():
+            print(f"Loaded thumbnail index from cache: {len(index.thumbnails)} thumbnails")
+        return True
+    
+    @property
+    def preview_stats(self):
+        """预览播放统计，未加载视频时为 None"""
+        return self.preview_player.stats() if self.preview_player is not None else None
+    
+    def _update_preview_clock(self):
+        """只在显示视频播放/预览时运行预览时钟"""
+        if self.preview_player is not None:
+            self.preview_player.set_active(StreamHandler.show_video_playback or StreamHandler.show_video_preview)
+    
+    def _wake_viewers(self):
+        # 唤醒推流连接以切换画面来源
+        StreamHandler.jpeg_cache.wake()
+        StreamHandler.preview_cache.wake()
+        StreamHandler.document_cache.wake()
     
     def set_video_playback_mode(self, enabled):
         """设置视频播放模式"""
@@ -384,11 +981,43 @@ class StreamServer:
             StreamHandler.show_video_playback = enabled
             if enabled:
                 StreamHandler.show_video_preview = False
+        self._update_preview_clock()
+        self._wake_viewers()
+    
+    def set_video_preview_mode(self, enabled):
+        """设置视频预览模式（未播放时在推流页面上预览视频）"""
+        with StreamHandler.frame_lock:
+            StreamHandler.show_video_preview = enabled
+        self._update_preview_clock()
+        self._wake_viewers()
+    
+    def set_document_page(self, image):
+        """显示内置渲染器的文档页面（页面变化时调用，只在这里编码一次）"""
+        jpeg = encode_jpeg(fit_document_page(image), quality=85)
+        if jpeg is None:
+            return
+        with StreamHandler.frame_lock:
+            StreamHandler.show_document = True
+        # 观看者等待文档缓存的新序号，翻页时推送一次
+        StreamHandler.document_cache.publish_jpeg(jpeg)
+        self._wake_viewers()
+    
+    def set_document_mode(self, enabled):
+        """文档模式下推流显示文档页面，视频模式下恢复摄像头/视频画面"""
+        with StreamHandler.frame_lock:
+            StreamHandler.current_mode = "document" if enabled else "video"
+            StreamHandler.show_document = enabled and StreamHandler.document_cache.jpeg is not None
+        self._wake_viewers()
     
     def is_video_loaded(self):
         """检查是否已加载视频"""
         return self.video_loaded
         
     def stop(self):
+        # 结束所有推流连接
+        StreamHandler.streaming = False
+        self._wake_viewers()
+        if self.preview_player is not None:
+            self.preview_player.close()
         if self.server:
             self.server.shutdown()
\ No newline at end of file
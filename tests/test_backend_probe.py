@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+import backend_probe
+from backend_probe import load_cached_backend, machine_id, select_backend
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "detector_backend.json")
+
+
+@pytest.fixture
+def without_mediapipe(monkeypatch):
+    # 模拟没有安装 mediapipe：只有 opencv 后端可用
+    monkeypatch.setattr(backend_probe, "backend_available", lambda name, options=None: name == "opencv")
+
+
+def no_frames():
+    return []
+
+
+def test_insufficient_frames_fall_back_to_available_backend(cache_path, without_mediapipe):
+    assert select_backend(no_frames, cache_path=cache_path) == "opencv"
+
+
+def test_inconclusive_probe_falls_back_to_available_backend(cache_path, without_mediapipe, monkeypatch):
+    monkeypatch.setattr(backend_probe, "probe_backends", lambda frames, backend_options=None: (None, []))
+    frames = [np.zeros((48, 64, 3), dtype=np.uint8)] * 10
+    assert select_backend(lambda: frames, cache_path=cache_path) == "opencv"
+
+
+def test_inconclusive_result_is_reused_until_retry(cache_path, without_mediapipe, monkeypatch):
+    select_backend(no_frames, cache_path=cache_path)
+    with open(cache_path, encoding="utf-8") as f:
+        assert json.load(f)[machine_id()]['inconclusive'] is True
+
+    def record_frames():
+        raise AssertionError("不应重新探测")
+
+    # 下次启动直接使用保存的回退后端
+    assert select_backend(record_frames, cache_path=cache_path) == "opencv"
+
+    # 超过重试间隔后重新探测
+    monkeypatch.setattr(backend_probe, "INCONCLUSIVE_RETRY_SECONDS", -1)
+    assert load_cached_backend(cache_path) is None
+
+
+def test_no_backend_available(cache_path, monkeypatch):
+    monkeypatch.setattr(backend_probe, "backend_available", lambda name, options=None: False)
+    with pytest.raises(backend_probe.BackendUnavailable):
+        select_backend(no_frames, cache_path=cache_path)
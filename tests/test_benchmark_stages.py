@@ -0,0 +1,43 @@
+import json
+
+from benchmark import _check_stage_baseline
+
+
+def make_result(p50=1.0, frames=300):
+    return {
+        'source': "benchmark_face.jpg",
+        'frames': frames,
+        'frame_shape': [480, 640, 3],
+        'fps': 100.0,
+        'platform': "test",
+        'stages': {'cv2.imencode': {'p50_ms': p50, 'p95_ms': 2.0, 'alloc_kb': None}},
+    }
+
+
+def write_baseline(tmp_path, baseline):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(baseline), encoding="utf-8")
+    return str(path)
+
+
+def test_missing_baseline_is_reported(tmp_path):
+    assert _check_stage_baseline(make_result(), str(tmp_path / "none.json"), 0.2) == ("missing", [])
+
+
+def test_unreadable_baseline_is_reported(tmp_path):
+    path = tmp_path / "baseline.json"
+    path.write_text("{", encoding="utf-8")
+    assert _check_stage_baseline(make_result(), str(path), 0.2) == ("invalid", [])
+
+
+def test_baseline_from_other_source_is_not_compared(tmp_path):
+    path = write_baseline(tmp_path, make_result(frames=50))
+    assert _check_stage_baseline(make_result(p50=10.0), path, 0.2) == ("mismatch", [])
+
+
+def test_regression_and_ok(tmp_path):
+    path = write_baseline(tmp_path, make_result())
+    assert _check_stage_baseline(make_result(p50=1.1), path, 0.2) == ("ok", [])
+    status, regressions = _check_stage_baseline(make_result(p50=1.5), path, 0.2)
+    assert status == "regressed"
+    assert regressions == [("cv2.imencode", "p50_ms", 1.0, 1.5)]
@@ -0,0 +1,11 @@
+import pytest
+
+from detector_backends import EyeDetectorBackend
+
+
+def test_backend_without_measure_fails_at_construction():
+    class Incomplete(EyeDetectorBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
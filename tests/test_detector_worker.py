@@ -0,0 +1,20 @@
+import numpy as np
+
+from detector_worker import ProcessEyeDetector
+
+
+def test_unavailable_worker_reports_error_separately_from_inference_mode():
+    detector = ProcessEyeDetector(inference_mode="roi")
+    detector.closed = True  # 已关闭：不启动子进程，直接返回空结果
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    measurement = detector.measure(frame, timestamp=1.0)
+    assert measurement['inference_mode'] == "roi"
+    assert measurement['worker_error'] == "worker_error"
+    assert measurement['face_found'] is False
+    assert measurement['timestamp'] == 1.0
+
+    result = detector.detect_eyes_state(frame, timestamp=2.0)
+    assert result['inference_mode'] == "roi"
+    assert result['eye_state'] == "worker_error"
+    assert result['worker_error'] == "worker_error"
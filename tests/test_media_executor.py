@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from media_executor import MediaExecutor, CANCELLED, DONE, FAILED, TIMED_OUT
+
+
+class FakeController:
+    """记录调用和同时执行的调用数；hang() 阻塞到 release 被设置"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.release = threading.Event()
+
+    def _enter(self, name):
+        with self.lock:
+            self.calls.append(name)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self):
+        with self.lock:
+            self.active -= 1
+
+    def hang(self):
+        self._enter("hang")
+        try:
+            self.release.wait(5)
+            return True
+        finally:
+            self._exit()
+
+    def play_video(self):
+        self._enter("play_video")
+        self._exit()
+        return True
+
+    def fail(self):
+        raise RuntimeError("boom")
+
+
+@pytest.fixture
+def controller():
+    controller = FakeController()
+    yield controller
+    controller.release.set()
+
+
+@pytest.fixture
+def executor(controller):
+    executor = MediaExecutor(controller, timeouts={'hang': 0.2, 'play_video': 2.0})
+    yield executor
+    executor.close()
+
+
+def test_hanging_operation_times_out_without_running_next_concurrently(controller, executor):
+    hung = executor.submit("hang")
+    queued = executor.submit("play_video")
+
+    assert hung.wait(1.0)
+    assert hung.state == TIMED_OUT
+    # 超时的调用还没返回：下一个操作不能在同一控制器上开始
+    time.sleep(0.2)
+    assert queued.state == "pending"
+    assert controller.calls == ["hang"]
+
+    controller.release.set()
+    assert queued.wait(1.0)
+    assert queued.state == DONE
+    assert controller.calls == ["hang", "play_video"]
+    assert controller.max_active == 1
+    assert executor.hung_count == 1
+
+
+def test_queued_operation_expires_while_worker_is_hung(controller, executor):
+    hung = executor.submit("hang")
+    queued = executor.submit("play_video", timeout=0.4)
+    done = []
+    called = threading.Event()
+    queued.add_done_callback(lambda op: (done.append(op), called.set()))
+
+    assert queued.wait(1.5)
+    assert queued.state == TIMED_OUT
+    # 回调在 _done 设置之后、锁外执行
+    assert called.wait(1.0)
+    assert done == [queued]
+
+    controller.release.set()
+    assert hung.wait(1.0)
+    time.sleep(0.1)
+    # 已超时的排队操作在调用返回后也不再执行
+    assert controller.calls == ["hang"]
+
+
+def test_timed_out_cancellable_operation_sees_cancel(controller):
+    seen = threading.Event()
+
+    def wait_cancel(cancelled):
+        cancelled.wait(2)
+        if cancelled.is_set():
+            seen.set()
+        return False
+
+    controller.wait_cancel = wait_cancel
+    executor = MediaExecutor(controller, timeouts={'wait_cancel': 0.2})
+    try:
+        operation = executor.submit("wait_cancel", cancellable=True)
+        assert operation.wait(1.0)
+        assert operation.state == TIMED_OUT
+        assert seen.wait(1.0)
+    finally:
+        executor.close()
+
+
+def test_group_supersedes_pending_and_failure_is_reported(controller, executor):
+    blocker = executor.submit("hang", timeout=2.0)
+    first = executor.submit("play_video", group="video")
+    second = executor.submit("play_video", group="video")
+    assert first.state == CANCELLED
+    controller.release.set()
+    assert blocker.wait(1.0) and second.wait(1.0)
+    assert second.state == DONE and second.ok
+
+    failed = executor.submit("fail")
+    assert failed.wait(1.0)
+    assert failed.state == FAILED and not failed.ok
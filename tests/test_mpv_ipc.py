@@ -0,0 +1,257 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+from mpv_ipc import MpvIpcClient, MpvMediaController
+
+
+class FakeMpvServer:
+    """模拟 mpv JSON IPC 服务器（只实现 MpvMediaController 用到的命令），依次接受连接"""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen(4)
+        self.properties = {'pause': True, 'idle-active': True, 'eof-reached': False, 'path': None,
+                           'time-pos': 0.0, 'duration': 60.0}
+        self.playlist = []
+        self.commands = []
+        self.conn = None
+        self.thread = threading.Thread(target=self._serve, name="fake-mpv", daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.conn = conn
+            self._serve_connection(conn)
+
+    def _serve_connection(self, conn):
+        observed = {}
+        buffer = b""
+
+        def send(message):
+            conn.sendall(json.dumps(message).encode('utf-8') + b"\n")
+
+        def set_property(name, value):
+            if self.properties.get(name) != value:
+                self.properties[name] = value
+                for observe_id, observed_name in observed.items():
+                    if observed_name == name:
+                        send({'event': 'property-change', 'id': observe_id, 'name': name, 'data': value})
+
+        def play_entry(index):
+            if not 0 <= index < len(self.playlist):
+                return False
+            self.properties['playlist-pos'] = index
+            set_property('path', self.playlist[index])
+            set_property('idle-active', False)
+            set_property('eof-reached', False)
+            return True
+
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                request = json.loads(line)
+                command = request['command']
+                self.commands.append(command)
+                reply = {'request_id': request.get('request_id', 0), 'error': 'success', 'data': None}
+                if command[0] == "get_property":
+                    reply['data'] = self.properties.get(command[1])
+                elif command[0] == "set_property" and command[1] == "playlist-pos":
+                    if not play_entry(command[2]):
+                        reply['error'] = 'property unavailable'
+                elif command[0] == "set_property":
+                    set_property(command[1], command[2])
+                elif command[0] == "observe_property":
+                    observed[command[1]] = command[2]
+                    send(reply)
+                    send({'event': 'property-change', 'id': command[1], 'name': command[2],
+                          'data': self.properties.get(command[2])})
+                    continue
+                elif command[0] == "loadfile" and len(command) > 2 and command[2] == "append":
+                    self.playlist.append(command[1])
+                elif command[0] == "loadfile":
+                    self.playlist = [command[1]]
+                    play_entry(0)
+                elif command[0] in ("playlist-next", "playlist-prev"):
+                    step = 1 if command[0] == "playlist-next" else -1
+                    if not play_entry(self.properties.get('playlist-pos', 0) + step):
+                        reply['error'] = 'error running command'
+                elif command[0] == "stop":
+                    self.playlist = []
+                    set_property('path', None)
+                    set_property('idle-active', True)
+                elif command[0] == "seek":
+                    self.properties['time-pos'] = float(command[1])
+                elif command[0] == "quit":
+                    send(reply)
+                    conn.close()
+                    return
+                send(reply)
+        conn.close()
+
+    def disconnect(self):
+        """模拟 mpv 退出：关闭当前连接"""
+        self.conn.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self.server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def socket_path():
+    path = os.path.join(tempfile.gettempdir(), f"ai-eye-remote-test-mpv-{os.getpid()}.sock")
+    yield path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+@pytest.fixture
+def fake(socket_path):
+    server = FakeMpvServer(socket_path)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def controller(fake, socket_path):
+    controller = MpvMediaController(socket_path=socket_path, spawn=False)
+    statuses = []
+    controller.add_status_listener(statuses.append)
+    controller.statuses = statuses
+    yield controller
+    controller.close()
+
+
+VIDEOS = [os.path.abspath(__file__), os.path.abspath(os.path.join(os.path.dirname(__file__), "conftest.py"))]
+
+
+def test_preload_pauses_on_first_frame(controller, fake):
+    assert controller.load_playlist(VIDEOS)
+    assert fake.properties['path'] == VIDEOS[0]
+    assert fake.properties['pause'] is True
+    assert not controller.get_video_status()
+
+
+def test_pause_resume_status_is_pushed(controller):
+    controller.load_video(VIDEOS[0])
+    assert controller.play_video()
+    assert wait_for(lambda: controller.statuses[-1:] == [True])
+    assert controller.get_video_status()
+
+    assert controller.pause_video()
+    assert wait_for(lambda: controller.statuses[-1:] == [False])
+    assert not controller.get_video_status()
+
+    assert controller.resume_video()
+    assert wait_for(lambda: controller.statuses[-1:] == [True])
+    assert controller.statuses == [True, False, True]
+
+
+def test_disconnect_resets_status(controller, fake):
+    controller.load_video(VIDEOS[0])
+    controller.play_video()
+    assert wait_for(lambda: controller.statuses[-1:] == [True])
+
+    fake.disconnect()
+    assert wait_for(lambda: controller.statuses[-1:] == [False])
+    assert controller.properties == {}
+    assert not controller.video_playing
+    assert not controller.get_video_status()
+
+
+def test_playlist_next_tracks_current_video(controller):
+    controller.load_playlist(VIDEOS)
+    controller.play_video()
+    assert controller.next_video()
+    assert wait_for(lambda: controller.current_video == VIDEOS[1])
+    assert not controller.next_video()
+
+
+def test_replies_are_matched_by_request_id(socket_path):
+    """回复乱序到达、中间夹着事件时，每个调用拿到自己的回复"""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        buffer = b""
+        requests = []
+        while len(requests) < 2:
+            buffer += conn.recv(65536)
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                requests.append(json.loads(line))
+        conn.sendall(json.dumps({'event': 'property-change', 'name': 'pause', 'data': True}).encode() + b"\n")
+        for request in reversed(requests):
+            reply = {'request_id': request['request_id'], 'error': 'success', 'data': request['command'][1]}
+            conn.sendall(json.dumps(reply).encode() + b"\n")
+        conn.recv(1)
+        conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    events = []
+    client = MpvIpcClient(socket_path, on_event=events.append)
+    results = {}
+
+    def query(name):
+        results[name] = client.get_property(name)
+
+    threads = [threading.Thread(target=query, args=(name,)) for name in ("time-pos", "duration")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    client.close()
+    server.close()
+    assert results == {'time-pos': 'time-pos', 'duration': 'duration'}
+    assert events and events[0]['name'] == 'pause'
+
+
+def test_close_releases_documents(controller):
+    closed = []
+
+    class Closable:
+        def __init__(self, name):
+            self.name = name
+
+        def close(self):
+            closed.append(self.name)
+
+    controller.pdf_document = Closable("pdf")
+    controller.document_input = Closable("input")
+    controller.close()
+    # 覆盖的 close() 也要释放基类持有的PDF预取线程和 X 连接
+    assert closed == ["pdf", "input"]
+    assert controller.pdf_document is None and controller.document_input is None
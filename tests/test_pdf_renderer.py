@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+import pytest
+
+import pdf_renderer
+from pdf_renderer import PdfDocument, PdfRenderError
+
+
+class FakeRenderer:
+    """记录渲染顺序，failing 中的页码渲染失败"""
+
+    def __init__(self):
+        self.rendered = []
+        self.failing = set()
+
+    def __call__(self, path, page, scale_to):
+        if page in self.failing:
+            raise PdfRenderError(f"渲染第 {page} 页失败")
+        self.rendered.append(page)
+        return np.full((4, 4, 3), page, dtype=np.uint8)
+
+
+@pytest.fixture
+def document(monkeypatch):
+    monkeypatch.setattr(pdf_renderer, "pdf_page_count", lambda path: 10)
+    renderer = FakeRenderer()
+    doc = PdfDocument("test.pdf", prefetch=2, renderer=renderer)
+    yield doc, renderer
+    doc.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_failed_render_keeps_current_page(document):
+    doc, renderer = document
+    doc.goto(1)
+    renderer.failing.add(2)
+    shown = []
+    doc.add_page_listener(lambda page, image: shown.append(page))
+
+    with pytest.raises(PdfRenderError):
+        doc.page_down()
+    assert doc.current_page == 1
+    assert shown == []
+
+    renderer.failing.clear()
+    image = doc.page_down()
+    assert image[0, 0, 0] == 2
+    assert doc.current_page == 2
+    assert shown == [2]
+
+
+def test_prefetch_starts_in_turn_direction(document):
+    doc, renderer = document
+    doc.goto(5, direction=-1)
+    assert wait_for(lambda: len(renderer.rendered) == 5)
+    assert renderer.rendered == [5, 4, 6, 3, 7]
+
+
+def test_prefetch_after_jump_goes_forward_first(document):
+    doc, renderer = document
+    doc.goto(5)
+    assert wait_for(lambda: len(renderer.rendered) == 5)
+    assert renderer.rendered == [5, 6, 4, 7, 3]
@@ -0,0 +1,90 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from async_stream_server import AsyncStreamServer
+from stream_server import JpegFrameCache, StreamServer, StreamHandler
+
+
+def count_parts(port, duration):
+    """读取 /stream duration 秒，返回收到的 multipart 分块数"""
+    sock = socket.create_connection(("127.0.0.1", port), timeout=1)
+    sock.sendall(b"GET /stream HTTP/1.0\r\n\r\n")
+    data = b""
+    deadline = time.time() + duration
+    try:
+        while time.time() < deadline:
+            sock.settimeout(max(deadline - time.time(), 0.01))
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+    return data.count(b"--frame\r\n")
+
+
+@pytest.fixture(params=[StreamServer, AsyncStreamServer], ids=["thread", "asyncio"])
+def server(request, monkeypatch):
+    monkeypatch.setattr(StreamHandler, "stream_keepalive_interval", 0.5)
+    server = request.param(port=18380)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_document_page_is_pushed_once_per_turn(server):
+    server.set_document_mode(True)
+    server.set_document_page(np.zeros((200, 150, 3), dtype=np.uint8))
+    # 页面不变：初始一帧 + 每 0.5 秒一次保活重发，而不是每 50 毫秒重复推送
+    parts = count_parts(server.port, 1.2)
+    assert 1 <= parts <= 4
+
+
+def test_page_turn_reaches_waiting_viewer(server, monkeypatch):
+    monkeypatch.setattr(StreamHandler, "stream_keepalive_interval", 5.0)
+    server.set_document_mode(True)
+    server.set_document_page(np.zeros((200, 150, 3), dtype=np.uint8))
+    turner = threading.Timer(0.3, server.set_document_page, args=(np.full((200, 150, 3), 255, dtype=np.uint8),))
+    turner.start()
+    # 当前页面一帧 + 翻页后立即推送的一帧
+    parts = count_parts(server.port, 0.8)
+    turner.join()
+    assert parts == 2
+
+
+def test_empty_cache_blocks_waiting_viewer():
+    cache = JpegFrameCache()
+    start = time.perf_counter()
+    # 缓存中还没有帧（启动时、reset() 之后）：序号不同也要等待，而不是立即返回
+    assert cache.wait_newer(-1, timeout=0.3) == (0, None)
+    assert time.perf_counter() - start >= 0.25
+    cache.reset()
+    start = time.perf_counter()
+    assert cache.wait_newer(-1, timeout=0.3)[1] is None
+    assert time.perf_counter() - start >= 0.25
+
+
+def test_viewer_of_empty_cache_does_not_spin(monkeypatch):
+    calls = []
+    wait_newer = JpegFrameCache.wait_newer
+
+    def counting_wait_newer(self, seq, timeout=1.0):
+        calls.append(seq)
+        return wait_newer(self, seq, timeout)
+
+    monkeypatch.setattr(JpegFrameCache, "wait_newer", counting_wait_newer)
+    server = StreamServer(port=18380)
+    server.start()
+    try:
+        # 还没有发布任何帧：观看者应阻塞在缓存上（每次最多等待 1 秒），没有收到任何分块
+        assert count_parts(server.port, 0.8) == 0
+    finally:
+        server.stop()
+    assert len(calls) <= 3
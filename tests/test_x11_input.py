@@ -0,0 +1,118 @@
+import os
+import select
+import shutil
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip("Xlib", reason="未安装 python-xlib")
+if shutil.which("Xvfb") is None:
+    pytest.skip("未安装 Xvfb", allow_module_level=True)
+
+from Xlib import X, display
+
+from x11_input import X11DocumentInput
+
+
+@pytest.fixture
+def xvfb():
+    """启动 Xvfb（没有窗口管理器），返回 DISPLAY 名称"""
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", "640x480x24",
+                                "-nolisten", "tcp"], pass_fds=(write_fd,),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    number = b""
+    try:
+        while not number.endswith(b"\n"):
+            ready, _, _ = select.select([read_fd], [], [], 10)
+            chunk = os.read(read_fd, 16) if ready else b""
+            if not chunk:
+                pytest.fail("Xvfb 启动失败")
+            number += chunk
+    finally:
+        os.close(read_fd)
+    yield f":{int(number)}"
+    process.terminate()
+    process.wait(timeout=5)
+
+
+@pytest.fixture
+def client(xvfb):
+    """模拟阅读器的另一个 X 客户端"""
+    conn = display.Display(xvfb)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def document_input(xvfb):
+    document_input = X11DocumentInput(xvfb)
+    yield document_input
+    document_input.close()
+
+
+def wait_for_event(conn, predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        while conn.pending_events():
+            ev = conn.next_event()
+            if predicate(ev):
+                return ev
+        select.select([conn], [], [], 0.05)
+    return None
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def open_reader_window(conn, title="evince - test.pdf"):
+    """创建并映射一个标题像阅读器的窗口，等待映射完成"""
+    root = conn.screen().root
+    window = root.create_window(0, 0, 200, 150, 0, conn.screen().root_depth,
+                                event_mask=X.KeyPressMask | X.StructureNotifyMask)
+    window.set_wm_name(title)
+    window.map()
+    conn.flush()
+    assert wait_for_event(conn, lambda ev: ev.type == X.MapNotify and ev.window.id == window.id)
+    return window
+
+
+def test_window_lookup_is_cached(client, document_input):
+    window = open_reader_window(client)
+    assert document_input.find_window() == window.id
+    assert document_input.find_window() == window.id
+    assert document_input.lookups == 1
+
+
+def test_page_down_reaches_reader_window(client, document_input):
+    window = open_reader_window(client)
+    assert document_input.press('page_down')
+    keycode = document_input.keycodes['page_down']
+    ev = wait_for_event(client, lambda ev: ev.type == X.KeyPress)
+    assert ev is not None
+    assert ev.window.id == window.id and ev.detail == keycode
+
+
+def test_cache_invalidated_when_window_is_recreated(client, document_input):
+    window = open_reader_window(client)
+    assert document_input.find_window() == window.id
+
+    window.destroy()
+    client.sync()
+    # 事件线程收到 DestroyNotify 后作废缓存
+    assert wait_until(lambda: document_input.window_id is None)
+
+    new_window = open_reader_window(client)
+    assert document_input.press('page_down')
+    assert document_input.window_id == new_window.id
+    assert document_input.lookups == 2
+    ev = wait_for_event(client, lambda ev: ev.type == X.KeyPress)
+    assert ev is not None and ev.window.id == new_window.id
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import cv2
+
+# 缩略图索引按视频路径保存，文件大小或修改时间变化后重新生成
+THUMBNAIL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-eye-remote", "thumbnails")
+THUMBNAIL_COUNT = 40  # 整个视频均匀取样的缩略图数
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_QUALITY = 70
+INDEX_VERSION = 1
+
+
+def video_identity(path):
+    """视频文件标识：绝对路径、大小和修改时间（纳秒）"""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ThumbnailIndex:
+    """视频的缩略图索引：整个视频均匀取样的缩略图（JPEG）及其时间点，供推流页面显示跳转条
+
+    索引保存在缓存目录中，一个视频一个文件：第一行是 JSON 头（文件标识、时长、每张缩略图的时间和位置），
+    后面依次是 JPEG 数据。文件标识一致时直接读取，否则在后台线程中重新生成。
+    生成时不需要的帧只 grab()（不做解码后的颜色转换和缩放），只有取样帧 retrieve 并编码。
+    """
+
+    def __init__(self, video_path, count=THUMBNAIL_COUNT, width=THUMBNAIL_WIDTH, cache_dir=THUMBNAIL_CACHE_DIR):
+        self.video_path = video_path
+        self.count = count
+        self.width = width
+        self.cache_dir = cache_dir
+        self.identity = video_identity(video_path)
+        self.cache_path = os.path.join(
+            cache_dir, hashlib.sha1(self.identity['path'].encode('utf-8')).hexdigest() + ".thumbs")
+        self.lock = threading.Lock()
+        self.thumbnails = []  # [(时间秒, JPEG字节)]，按时间排序
+        self.duration = 0.0
+        self.ready = False
+        self.source = None  # "cache" 或 "built"
+        self.build_ms = None
+        self.thread = None
+
+    def ensure(self, on_ready=None):
+        """缓存有效时立即读取；否则启动后台线程生成并保存，完成后调用 on_ready(index)"""
+        if self.load():
+            if on_ready:
+                on_ready(self)
+            return True
+        self.thread = threading.Thread(target=self._build_and_save, args=(on_ready,),
+                                       name="thumbnail-indexer", daemon=True)
+        self.thread.start()
+        return False
+
+    def load(self):
+        """读取缓存的索引，文件标识不一致或文件损坏时返回 False"""
+        try:
+            with open(self.cache_path, "rb") as f:
+                header = json.loads(f.readline())
+                data = f.read()
+        except (OSError, ValueError):
+            return False
+        if header.get('version') != INDEX_VERSION or header.get('identity') != self.identity:
+            return False
+        thumbnails = []
+        for entry in header['thumbnails']:
+            offset, length = entry['offset'], entry['length']
+            if offset + length > len(data):
+                return False
+            thumbnails.append((entry['time'], data[offset:offset + length]))
+        with self.lock:
+            self.thumbnails = thumbnails
+            self.duration = header['duration']
+            self.source = "cache"
+            self.ready = True
+        return True
+
+    def _build_and_save(self, on_ready):
+        try:
+            self.build()
+        except Exception as e:
+            print(f"生成缩略图索引失败: {e}")
+            return
+        self.save()
+        print(f"缩略图索引已生成: {len(self.thumbnails)} 张 ({self.build_ms:.0f} ms)")
+        if on_ready:
+            on_ready(self)
+
+    def build(self):
+        """解码视频并均匀取样缩略图"""
+        start = time.perf_counter()
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise OSError(f"无法打开视频: {self.video_path}")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            fps = fps if 1.0 <= fps <= 240.0 else 25.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            # 帧数未知时每秒取一张
+            step = max(1, frame_count // self.count) if frame_count > 0 else max(1, round(fps))
+            thumbnails = []
+            position = 0
+            while frame_count <= 0 or len(thumbnails) < self.count:
+                if not cap.grab():
+                    break
+                if position % step == step // 2:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        thumbnail = self._encode(frame)
+                        if thumbnail is not None:
+                            thumbnails.append((round(position / fps, 3), thumbnail))
+                position += 1
+            # 帧数未知时扫描到结尾，position 即总帧数
+            duration = (frame_count if frame_count > 0 else position) / fps
+        finally:
+            cap.release()
+        with self.lock:
+            self.thumbnails = thumbnails
+            self.duration = duration
+            self.source = "built"
+            self.ready = True
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def _encode(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, round(h * self.width / w))
+        frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+        return buffer.tobytes() if ret else None
+
+    def save(self):
+        """写入缓存文件（先写临时文件再替换，不会留下写了一半的索引）"""
+        with self.lock:
+            thumbnails = list(self.thumbnails)
+            duration = self.duration
+        entries = []
+        offset = 0
+        for timestamp, jpeg in thumbnails:
+            entries.append({'time': timestamp, 'offset': offset, 'length': len(jpeg)})
+            offset += len(jpeg)
+        header = {'version': INDEX_VERSION, 'identity': self.identity, 'duration': duration,
+                  'thumbnails': entries}
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(header).encode('utf-8') + b"\n")
+                for _, jpeg in thumbnails:
+                    f.write(jpeg)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存缩略图索引失败: {e}")
+
+    def summary(self):
+        """跳转条使用的索引信息（不含图像数据）"""
+        with self.lock:
+            return {
+                'ready': self.ready,
+                'duration': self.duration,
+                'thumbnails': [{'index': i, 'time': timestamp} for i, (timestamp, _) in enumerate(self.thumbnails)],
+            }
+
+    def thumbnail(self, index):
+        """返回第 index 张缩略图的JPEG，不存在时返回 None"""
+        with self.lock:
+            if 0 <= index < len(self.thumbnails):
+                return self.thumbnails[index][1]
+        return None
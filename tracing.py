@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class TraceContext:
+    """一帧及其产生的命令共用的跟踪上下文：trace_id 为帧的采集序号，origin 为该帧 cap.read() 返回的时间"""
+
+    def __init__(self, trace_id, origin):
+        self.trace_id = trace_id
+        self.origin = origin
+
+    def __repr__(self):
+        return f"TraceContext({self.trace_id}, origin={self.origin:.3f})"
+
+
+class _Span:
+    def __init__(self, tracer, name, context, args):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add_span(self.name, self.context, self.start, time.time(), self.args)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """记录“看一眼到动作生效”路径上的各段耗时，导出为 Chrome trace-event JSON（chrome://tracing、Perfetto 可打开）
+
+    未启用时所有记录方法立即返回。事件保存在定长环形缓冲区中，长时间运行只保留最近的事件。
+    """
+
+    def __init__(self, max_events=200000, max_samples=1000):
+        self.enabled = False
+        self.pid = os.getpid()
+        self._events = deque(maxlen=max_events)
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        self._thread_names = {}
+        # 命令 -> deque[(端到端, 采集到入队, 排队, 执行)] 秒
+        self._command_samples = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def _thread(self):
+        tid = threading.get_native_id()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def add_span(self, name, context, start, end, args=None, tid=None):
+        """记录一段已完成的区间（时间为 time.time() 秒）"""
+        if not self.enabled:
+            return
+        event = {'name': name, 'ph': 'X', 'pid': self.pid, 'tid': tid or self._thread(),
+                 'ts': start * 1e6, 'dur': max(0.0, end - start) * 1e6}
+        event_args = dict(args or {})
+        if context is not None:
+            event_args['trace_id'] = context.trace_id
+        if event_args:
+            event['args'] = event_args
+        with self._lock:
+            self._events.append(event)
+
+    def span(self, name, context=None, args=None):
+        """with tracer.span("detect_eyes_state", context): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, context, args)
+
+    def flow(self, phase, context, timestamp=None):
+        """跨线程的箭头：帧所在线程 phase="s"，命令执行线程 phase="f"，同一 trace_id 相连"""
+        if not self.enabled or context is None:
+            return
+        event = {'name': 'command', 'cat': 'command', 'ph': phase, 'id': context.trace_id, 'pid': self.pid,
+                 'tid': self._thread(), 'ts': (timestamp or time.time()) * 1e6}
+        if phase == 'f':
+            event['bp'] = 'e'
+        with self._lock:
+            self._events.append(event)
+
+    def command_completed(self, command):
+        """命令执行完成（CommandBus.complete 调用）：记录排队、执行区间和端到端延迟"""
+        context = command.trace
+        if not self.enabled or context is None:
+            return
+        args = {'command': command.key, 'ok': command.ok}
+        self.add_span(f"queue {command.key}", context, command.enqueue_time, command.start_time, args)
+        self.add_span(f"execute {command.key}", context, command.start_time, command.done_time, args)
+        sample = (command.done_time - context.origin, command.enqueue_time - context.origin,
+                  command.start_time - command.enqueue_time, command.done_time - command.start_time)
+        with self._lock:
+            self._command_samples.setdefault(command.key, deque(maxlen=self._max_samples)).append(sample)
+
+    def summary(self):
+        """每种命令的端到端延迟分布（毫秒）"""
+        with self._lock:
+            samples = {key: np.array(values) * 1000 for key, values in self._command_samples.items()}
+        stats = {}
+        for key, values in samples.items():
+            total = values[:, 0]
+            stats[key] = {
+                'count': len(total),
+                'p50_ms': float(np.percentile(total, 50)),
+                'p95_ms': float(np.percentile(total, 95)),
+                'p99_ms': float(np.percentile(total, 99)),
+                'max_ms': float(total.max()),
+                # 分段平均：采集 -> 入队（检测 + 判断），排队，执行（媒体控制）
+                'to_enqueue_avg_ms': float(values[:, 1].mean()),
+                'queue_avg_ms': float(values[:, 2].mean()),
+                'execute_avg_ms': float(values[:, 3].mean()),
+            }
+        return stats
+
+    def export_chrome(self, path):
+        """写出 Chrome trace-event JSON，附带端到端延迟汇总"""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in thread_names.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                       'summary': self.summary()}, f, ensure_ascii=False)
+        return len(events)
+
+
+def print_trace_summary(stats):
+    if not stats:
+        print("没有记录到由检测产生的命令")
+        return
+    print(f"{'command':<20} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'to-queue':>9} {'queue':>7} {'execute':>8}")
+    for key, s in sorted(stats.items()):
+        print(f"{key:<20} {s['count']:>6} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} "
+              f"{s['max_ms']:>8.1f} {s['to_enqueue_avg_ms']:>9.1f} {s['queue_avg_ms']:>7.1f} "
+              f"{s['execute_avg_ms']:>8.1f}")
+
+
+TRACER = Tracer()
@@ -0,0 +1,265 @@
+import os
+import select
+import threading
+import time
+
+# 可选依赖：python-xlib（pip install python-xlib），不可用时 SimpleMediaController 回退到 xdotool 子进程
+try:
+    from Xlib import X, XK, display, error
+    from Xlib.ext import xtest
+    from Xlib.protocol import event
+except ImportError:
+    X = None
+
+# 查找阅读器窗口时匹配的名称（窗口标题或 WM_CLASS，不区分大小写）
+READER_NAMES = ('okular', 'evince', 'atril', 'xpdf')
+
+PAGE_KEYS = {'page_down': 'Page_Down', 'page_up': 'Page_Up'}
+
+
+class X11InputUnavailable(Exception):
+    """python-xlib 未安装、无法连接 X 服务器或服务器不支持 XTEST"""
+
+
+class X11DocumentInput:
+    """进程内的 X11 翻页：常驻 X 连接，按键通过 XTest 发送，阅读器窗口 id 缓存复用
+
+    与 xdotool 方案相比，每次翻页不再启动子进程、不再搜索窗口：
+    - 窗口 id 找到一次后缓存，后台线程监听根窗口事件，窗口销毁或客户端列表中不再有它时作废，
+      用户切换到另一个阅读器窗口（_NET_ACTIVE_WINDOW 变化）时改用该窗口；
+    - 窗口已是活动窗口时不再激活；需要激活时等待窗口管理器确认（事件驱动），不再固定 sleep；
+    - 没有窗口管理器（例如 Xvfb）时直接 set_input_focus。
+    两个 X 连接：一个用于发送请求（加锁，可在多个线程中调用），一个只在事件线程中读取事件。
+    """
+
+    ACTIVATE_TIMEOUT = 0.3  # 等待窗口管理器切换活动窗口（秒）
+
+    def __init__(self, display_name=None, reader_names=READER_NAMES):
+        if X is None:
+            raise X11InputUnavailable("未安装 python-xlib")
+        self.display_name = display_name or os.environ.get('DISPLAY', ':0')
+        self.reader_names = tuple(name.lower() for name in reader_names)
+        try:
+            self.display = display.Display(self.display_name)
+            self.events = display.Display(self.display_name)
+        except (error.DisplayError, error.ConnectionClosedError, OSError) as e:
+            raise X11InputUnavailable(f"无法连接 X 服务器 {self.display_name}: {e}")
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            self.events.close()
+            raise X11InputUnavailable(f"X 服务器 {self.display_name} 不支持 XTEST")
+
+        self.root = self.display.screen().root
+        self.atoms = {name: self.display.intern_atom(name) for name in
+                      ('_NET_ACTIVE_WINDOW', '_NET_CLIENT_LIST', '_NET_SUPPORTED', '_NET_WM_NAME',
+                       'UTF8_STRING')}
+        supported = self.root.get_full_property(self.atoms['_NET_SUPPORTED'], X.AnyPropertyType)
+        # 有 EWMH 窗口管理器时通过 _NET_ACTIVE_WINDOW 请求激活，否则直接设置输入焦点
+        self.ewmh = supported is not None and self.atoms['_NET_ACTIVE_WINDOW'] in supported.value
+        self.keycodes = {}
+        for command, key in PAGE_KEYS.items():
+            self.keycodes[command] = self.display.keysym_to_keycode(XK.string_to_keysym(key))
+
+        self.cond = threading.Condition()
+        self._request_lock = threading.RLock()  # 保护请求连接 self.display
+        self.window_id = None  # 缓存的阅读器窗口
+        self.active_window = None  # 事件线程跟踪的当前活动窗口
+        self.client_list_changed = False
+        self.lookups = 0  # 实际搜索窗口的次数（其余翻页命中缓存）
+
+        self.running = True
+        event_root = self.events.screen().root
+        event_root.change_attributes(event_mask=X.SubstructureNotifyMask | X.PropertyChangeMask)
+        if self.ewmh:
+            self.active_window = self._read_active_window(self.events)
+        self.events.flush()
+        self.thread = threading.Thread(target=self._event_loop, name="x11-input-events", daemon=True)
+        self.thread.start()
+        print(f"使用 XTest 翻页 (DISPLAY={self.display_name}, EWMH={'是' if self.ewmh else '否'})")
+
+    def _read_active_window(self, conn):
+        prop = conn.screen().root.get_full_property(self.atoms['_NET_ACTIVE_WINDOW'], X.AnyPropertyType)
+        return int(prop.value[0]) if prop is not None and len(prop.value) else None
+
+    def _event_loop(self):
+        """事件线程：窗口销毁、客户端列表变化、活动窗口变化"""
+        while self.running:
+            try:
+                # 先处理已读入缓冲区的事件，再等待套接字可读
+                while self.events.pending_events():
+                    self._handle_event(self.events.next_event())
+                select.select([self.events], [], [], 0.5)
+            except (error.ConnectionClosedError, OSError, ValueError):
+                break
+            except error.XError as e:
+                # 查询的窗口在处理事件时已被销毁
+                print(f"X11 事件处理出错: {e}")
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def _handle_event(self, ev):
+        if ev.type in (X.CreateNotify, X.MapNotify):
+            # 唤醒 wait_for_window
+            with self.cond:
+                self.cond.notify_all()
+        elif ev.type in (X.DestroyNotify, X.UnmapNotify):
+            with self.cond:
+                if ev.window.id == self.window_id:
+                    self.window_id = None
+        elif ev.type == X.PropertyNotify:
+            if ev.atom == self.atoms['_NET_CLIENT_LIST']:
+                with self.cond:
+                    self.client_list_changed = True
+                    self.cond.notify_all()
+            elif ev.atom == self.atoms['_NET_ACTIVE_WINDOW']:
+                active = self._read_active_window(self.events)
+                is_reader = active and self._is_reader(self.events, active)
+                with self.cond:
+                    self.active_window = active
+                    if is_reader:
+                        # 用户切换到另一个阅读器窗口
+                        self.window_id = active
+                    self.cond.notify_all()
+
+    def _is_reader(self, conn, window_id):
+        window = conn.create_resource_object('window', window_id)
+        names = []
+        prop = window.get_full_property(self.atoms['_NET_WM_NAME'], self.atoms['UTF8_STRING'])
+        if prop is not None:
+            value = prop.value
+            names.append(value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value))
+        names.append(window.get_wm_name() or "")
+        names.extend(window.get_wm_class() or ())
+        text = " ".join(str(name) for name in names).lower()
+        return any(reader in text for reader in self.reader_names)
+
+    def _candidate_windows(self):
+        """窗口管理器维护的客户端列表；没有窗口管理器时为根窗口的子窗口"""
+        prop = self.root.get_full_property(self.atoms['_NET_CLIENT_LIST'], X.AnyPropertyType)
+        if prop is not None:
+            return [int(window_id) for window_id in prop.value]
+        return [child.id for child in self.root.query_tree().children]
+
+    def find_window(self):
+        """返回阅读器窗口 id：优先使用缓存，缓存作废时重新搜索（最近创建的优先）"""
+        with self._request_lock:
+            return self._find_window()
+
+    def _find_window(self):
+        with self.cond:
+            window_id = self.window_id
+            check_list = self.client_list_changed
+            self.client_list_changed = False
+        candidates = None
+        if window_id is not None and check_list:
+            candidates = self._candidate_windows()
+            if window_id not in candidates:
+                window_id = None
+        if window_id is not None:
+            return window_id
+
+        self.lookups += 1
+        if candidates is None:
+            candidates = self._candidate_windows()
+        for candidate in reversed(candidates):
+            try:
+                if self._is_reader(self.display, candidate):
+                    window_id = candidate
+                    break
+            except error.XError:
+                # 搜索过程中窗口被销毁
+                continue
+        with self.cond:
+            self.window_id = window_id
+        return window_id
+
+    def wait_for_window(self, timeout, cancelled=None, poll=0.25):
+        """等待阅读器窗口出现，返回窗口 id；超时或 cancelled（threading.Event）被设置时返回 None
+
+        窗口创建、映射和客户端列表变化时被事件唤醒；标题可能在映射之后才设置，因此最多每 poll 秒再查一次。
+        """
+        deadline = time.time() + timeout
+        while self.running:
+            window_id = self.find_window()
+            if window_id is not None:
+                return window_id
+            remaining = deadline - time.time()
+            if remaining <= 0 or (cancelled is not None and cancelled.is_set()):
+                return None
+            with self.cond:
+                self.cond.wait(min(remaining, poll))
+        return None
+
+    def activate(self, window_id):
+        """激活窗口；已是活动窗口时直接返回"""
+        with self._request_lock:
+            return self._activate(window_id)
+
+    def _activate(self, window_id):
+        window = self.display.create_resource_object('window', window_id)
+        if self.ewmh:
+            with self.cond:
+                if self.active_window == window_id:
+                    return True
+            message = event.ClientMessage(window=window, client_type=self.atoms['_NET_ACTIVE_WINDOW'],
+                                          data=(32, [2, X.CurrentTime, 0, 0, 0]))
+            self.root.send_event(message, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+            self.display.flush()
+            with self.cond:
+                return self.cond.wait_for(lambda: self.active_window == window_id or not self.running,
+                                          self.ACTIVATE_TIMEOUT) and self.active_window == window_id
+        window.configure(stack_mode=X.Above)
+        window.set_input_focus(X.RevertToParent, X.CurrentTime)
+        self.display.sync()
+        return True
+
+    def press(self, command):
+        """向阅读器窗口发送翻页键；找不到窗口或 X 请求失败时返回 False"""
+        keycode = self.keycodes.get(command)
+        if not keycode or not self.running:
+            return False
+        with self._request_lock:
+            return self._press(keycode)
+
+    def _press(self, keycode):
+        try:
+            window_id = self._find_window()
+            if window_id is None:
+                print("未找到PDF阅读器窗口")
+                return False
+            if not self._activate(window_id):
+                print(f"激活窗口 {window_id:#x} 超时")
+            xtest.fake_input(self.display, X.KeyPress, keycode)
+            xtest.fake_input(self.display, X.KeyRelease, keycode)
+            self.display.sync()
+            return True
+        except error.XError as e:
+            # 窗口在缓存之后被销毁，下次重新搜索
+            print(f"XTest 翻页失败: {e}")
+            with self.cond:
+                self.window_id = None
+            return False
+        except (error.ConnectionClosedError, OSError) as e:
+            print(f"X 连接已断开: {e}")
+            self.running = False
+            return False
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        for conn in (self.display, self.events):
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def create_document_input(display_name=None):
+    """创建 XTest 翻页后端，不可用时打印原因并返回 None"""
+    try:
+        return X11DocumentInput(display_name)
+    except X11InputUnavailable as e:
+        print(f"XTest 翻页不可用（{e}），使用 xdotool")
+        return None
+